@@ -0,0 +1,277 @@
+# app/agsi.py
+"""
+Klient pre GIE transparency API (AGSI+, a ten istý pool/stránkovanie aj pre ALSI)
+a hromadný upsert do gas_storage_daily.
+
+- jedna zdieľaná requests.Session s connection poolom (keep-alive) a retry na 429/5xx,
+- stránkovanie podľa 'last_page', každá stránka sa parsuje jedným prechodom
+  (percento + celá sada metrík naraz),
+- upsert cez INSERT … ON CONFLICT (entity_id, date) po dávkach; nemenné riadky sa neprepisujú.
+"""
+import datetime as dt
+import threading
+from time import perf_counter
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .settings import AGSI_API_KEY, AGSI_BASE_URL, AGSI_CONCURRENCY
+
+AGSI_URL = AGSI_BASE_URL
+PAGE_SIZE = 5000          # veľká strana, menej requestov
+UPSERT_BATCH = 5000
+
+# Metriky ukladané do gas_storage_metrics: názov v API/DB → kľúč v AGSI zázname
+METRIC_FIELDS = {
+    "gas_in_storage": "gasInStorage",            # TWh
+    "working_gas_volume": "workingGasVolume",    # TWh
+    "injection": "injection",                    # GWh/d
+    "withdrawal": "withdrawal",                  # GWh/d
+    "net_withdrawal": "netWithdrawal",           # GWh/d
+    "injection_capacity": "injectionCapacity",   # GWh/d
+    "withdrawal_capacity": "withdrawalCapacity", # GWh/d
+    "consumption": "consumption",                # TWh
+    "consumption_full": "consumptionFull",       # %
+    "trend": "trend",                            # %
+}
+_METRIC_ITEMS = tuple(METRIC_FIELDS.items())
+
+try:
+    import orjson as _json
+except Exception:  # orjson je v requirements, ale nie je nutný
+    import json as _json
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter, ktorý latenciu a chyby každého requestu (vrátane retry) zapíše do metrík podľa hosta."""
+
+    def send(self, request, **kwargs):
+        from .metrics import observe_http_client
+
+        host = urlparse(request.url).hostname or "?"
+        start = perf_counter()
+        try:
+            r = super().send(request, **kwargs)
+        except Exception as e:
+            observe_http_client(host, perf_counter() - start, type(e).__name__)
+            raise
+        observe_http_client(host, perf_counter() - start, f"http_{r.status_code}" if r.status_code >= 400 else None)
+        return r
+
+
+def get_session() -> requests.Session:
+    """Zdieľaná session (thread-safe pre GET) s poolom veľkosti AGSI_CONCURRENCY."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            retry = Retry(total=3, backoff_factor=1.0, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=("GET",))
+            # pool pre dva hosty: agsi.gie.eu a alsi.gie.eu (rovnaký GIE kľúč)
+            adapter = _TimedAdapter(pool_connections=2, pool_maxsize=max(AGSI_CONCURRENCY, 1), max_retries=retry)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            if AGSI_API_KEY:
+                s.headers["x-key"] = AGSI_API_KEY
+            _session = s
+        return _session
+
+
+def iter_pages(params: dict, timeout: int = 60, base_url: str | None = None):
+    """Generuje 'data' jednotlivých stránok (paginácia podľa 'last_page')."""
+    sess = get_session()
+    url = base_url or AGSI_URL
+    page = 1
+    last_page = 1
+    while page <= last_page:
+        p = dict(params)
+        p["page"] = page
+        r = sess.get(url, params=p, timeout=timeout)
+        r.raise_for_status()
+        j = _json.loads(r.content)
+        last_page = int((j.get("last_page") or 1)) if isinstance(j, dict) else 1
+        data = j.get("data") if isinstance(j, dict) else None
+        if isinstance(data, list) and data:
+            yield data
+        page += 1
+
+
+def fetch_pages(params: dict, timeout: int = 60, base_url: str | None = None) -> list[dict]:
+    """Stiahne všetky stránky pre dané parametre (paginácia podľa 'last_page')."""
+    out: list[dict] = []
+    for data in iter_pages(params, timeout, base_url):
+        out.extend(data)
+    return out
+
+
+def fetch_listing(timeout: int = 60, base_url: str | None = None) -> dict:
+    """Zoznam krajín / prevádzkovateľov / zásobníkov (AGSI /about?show=listing)."""
+    r = get_session().get(f"{base_url or AGSI_URL}/about", params={"show": "listing"}, timeout=timeout)
+    r.raise_for_status()
+    return _json.loads(r.content)
+
+
+def parse_gas_day(item: dict) -> dt.date | None:
+    """gasDayStart môže byť '2025-11-20' alebo '2025-11-20T00:00:00+00:00'."""
+    raw = item.get("gasDayStart") or item.get("gas_day") or item.get("date") or ""
+    try:
+        return dt.date.fromisoformat(str(raw)[:10])
+    except ValueError:
+        return None
+
+
+def num(v) -> float | None:
+    """AGSI posiela čísla ako stringy; '-' alebo '' znamená chýbajúcu hodnotu."""
+    if v is None or v == "" or v == "-":
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_full(item: dict) -> float | None:
+    """Percento naplnenia: 'full' | 'fullness' | 'percentage'."""
+    p = item.get("full") or item.get("fullness") or item.get("percentage")
+    return num(p)
+
+
+def parse_record(item: dict, entity_id: int) -> tuple[dict, dict] | None:
+    """Jeden prechod cez AGSI záznam → (riadok gas_storage_daily, riadok gas_storage_metrics)."""
+    d = parse_gas_day(item)
+    p = parse_full(item)
+    if d is None or p is None:
+        return None
+    metrics = {"entity_id": entity_id, "date": d}
+    get = item.get
+    for name, key in _METRIC_ITEMS:
+        metrics[name] = num(get(key))
+    return {"entity_id": entity_id, "date": d, "percent": p}, metrics
+
+
+def fetch_entity_series(entity, from_date: str, to_date: str) -> tuple[list[dict], list[dict]]:
+    """Stiahne a rozparsuje sériu pre jednu entitu → (daily riadky, metrics riadky)."""
+    from .entities import agsi_params
+
+    params = {**agsi_params(entity), "from": from_date, "to": to_date,
+              "size": PAGE_SIZE, "gas_day": "asc"}
+    daily, metrics = [], []
+    for data in iter_pages(params):
+        for item in data:
+            rec = parse_record(item, entity.id)
+            if rec is not None:
+                daily.append(rec[0])
+                metrics.append(rec[1])
+    return daily, metrics
+
+
+def fetch_eu_day(date_str: str, timeout: int = 25) -> tuple[dict, dict] | None:
+    """
+    Záznam EU agregátu pre daný gas_day (YYYY-MM-DD) → (daily, metrics), alebo None.
+    Ak presný deň chýba, použije posledný vrátený záznam (správanie pôvodného _fetch_agsi_eu_full).
+    """
+    from .models import EU_ENTITY_ID
+
+    params = {"type": "eu", "from": date_str, "to": date_str, "size": 100, "gas_day": "asc", "page": 1}
+    r = get_session().get(AGSI_URL, params=params, timeout=timeout)
+    r.raise_for_status()
+    data = _json.loads(r.content).get("data") or []
+    want = date_str[:10]
+    for item in data:
+        if str(item.get("gasDayStart") or item.get("gas_day") or "")[:10] == want:
+            rec = parse_record(item, EU_ENTITY_ID)
+            if rec is not None:
+                return rec
+    if data:
+        rec = parse_record(data[-1], EU_ENTITY_ID)
+        if rec is not None:
+            return rec
+    return None
+
+
+def upsert_daily(sess, rows: list[dict]) -> tuple[int, int]:
+    """
+    Hromadný upsert do gas_storage_daily. Vráti (inserted, updated); riadky s nezmenenou
+    hodnotou sa nezapisujú (WHERE … IS DISTINCT FROM) a nepočítajú sa. Každý zapísaný riadok
+    (nový aj opravený AGSI restatementom) dostane revíziu v gas_storage_revision
+    a prepočítajú sa ním dotknuté sloty sezónnej obálky; potom ho vyhodnotí detektor anomálií
+    a alert pravidlá (webhooky odídu až po commite).
+    Commit robí volajúci.
+    """
+    from sqlalchemy import literal_column
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from .models import GasStorageDaily
+    from .alerts import evaluate as evaluate_alerts
+    from .anomalies import observe as observe_anomalies
+    from .metrics import stage
+    from .revisions import record_changes
+    from .seasonal import refresh_envelope
+
+    if not rows:
+        return 0, 0
+    table = GasStorageDaily.__table__
+    ins = pg_insert(table)
+    stmt = ins.on_conflict_do_update(
+        index_elements=["entity_id", "date"],
+        set_={"percent": ins.excluded.percent},
+        where=table.c.percent.is_distinct_from(ins.excluded.percent),
+    ).returning(literal_column("(xmax = 0)").label("inserted"), table.c.entity_id, table.c.date, table.c.percent)
+
+    inserted = updated = 0
+    seen_at = dt.datetime.utcnow()
+    for i in range(0, len(rows), UPSERT_BATCH):
+        with stage("upsert_daily"):
+            changed = sess.execute(stmt, rows[i:i + UPSERT_BATCH]).all()
+        for was_insert, *_ in changed:
+            if was_insert:
+                inserted += 1
+            else:
+                updated += 1
+        points = [r[1:] for r in changed]
+        restated = {}
+        with stage("revisions"):
+            record_changes(sess, points, seen_at, previous=restated)
+        with stage("envelope"):
+            refresh_envelope(sess, changed=[r[1:3] for r in changed])
+        with stage("anomalies"):
+            observe_anomalies(sess, points, restated)
+        with stage("alerts"):
+            evaluate_alerts(sess, points)
+    return inserted, updated
+
+
+def upsert_values(sess, table, rows: list[dict], value_cols) -> int:
+    """
+    Hromadný upsert do tabuľky s kľúčom (entity_id, date); prepisuje len riadky, kde sa niektorá
+    z value_cols zmenila. Vráti počet zápisov. Commit robí volajúci.
+    """
+    from sqlalchemy import tuple_
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    if not rows:
+        return 0
+    ins = pg_insert(table)
+    names = list(value_cols)
+    stmt = ins.on_conflict_do_update(
+        index_elements=["entity_id", "date"],
+        set_={n: ins.excluded[n] for n in names},
+        where=tuple_(*[table.c[n] for n in names]).is_distinct_from(
+            tuple_(*[ins.excluded[n] for n in names])
+        ),
+    )
+    written = 0
+    for i in range(0, len(rows), UPSERT_BATCH):
+        written += sess.execute(stmt, rows[i:i + UPSERT_BATCH]).rowcount or 0
+    return written
+
+
+def upsert_metrics(sess, rows: list[dict]) -> int:
+    """Hromadný upsert do gas_storage_metrics; prepisuje len zmenené riadky. Vráti počet zápisov."""
+    from .models import GasStorageMetrics
+
+    return upsert_values(sess, GasStorageMetrics.__table__, rows, METRIC_FIELDS)
@@ -0,0 +1,201 @@
+# app/alerts.py
+"""
+Serverové alert pravidlá (alert_rule) a doručovanie webhookov (outbox alert_delivery).
+
+- evaluate() sa volá v tej istej transakcii ako zápis bodov (vedľa anomalies.observe) a všetky
+  pravidlá vyhodnotí jedným INSERT … SELECT: body × pravidlá entity (+ pravidlá pre všetky entity)
+  × predchádzajúci deň z gas_storage_daily. Žiadny dotaz na pravidlo; odpálenie je idempotentné
+  (rule_id, entity_id, date) a do outboxu sa dostane len s commitom ingestu.
+- Po commite (SQLAlchemy after_commit) sa zobudí doručovacie vlákno: zoberie splatné riadky
+  (FOR UPDATE SKIP LOCKED + lease, takže viac inštancií sa nebije), pošle ich paralelne
+  a neúspešné preplánuje s exponenciálnym backoffom až do ALERT_MAX_ATTEMPTS. Vlákno sa
+  budí aj každých ALERT_POLL_S sekúnd (retry, riadky z iných procesov).
+"""
+import datetime as dt
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event, text
+
+from .database import SessionLocal
+from .settings import ALERT_MAX_AGE_DAYS, ALERT_MAX_ATTEMPTS, ALERT_POLL_S, ALERT_TIMEOUT_S
+
+RULE_KINDS = ("drop", "rise", "cross_above", "cross_below")
+BATCH = 50
+LEASE = dt.timedelta(minutes=5)
+
+_EVALUATE_SQL = text("""
+    WITH p AS (
+        SELECT * FROM unnest(CAST(:ids AS integer[]), CAST(:dates AS date[]), CAST(:vals AS real[]))
+             AS p(entity_id, date, value)
+        WHERE p.date >= :min_date
+    ),
+    hits AS (
+        SELECT r.id AS rule_id, r.name, r.kind, r.threshold, p.entity_id, p.date, p.value,
+               prev.percent AS previous
+        FROM p
+        CROSS JOIN LATERAL (
+            SELECT * FROM alert_rule WHERE enabled AND entity_id = p.entity_id
+            UNION ALL
+            SELECT * FROM alert_rule WHERE enabled AND entity_id IS NULL
+        ) r
+        LEFT JOIN gas_storage_daily prev ON prev.entity_id = p.entity_id AND prev.date = p.date - 1
+        WHERE CASE r.kind
+            WHEN 'drop' THEN p.value - prev.percent <= -r.threshold
+            WHEN 'rise' THEN p.value - prev.percent >= r.threshold
+            WHEN 'cross_above' THEN prev.percent < r.threshold AND p.value >= r.threshold
+            WHEN 'cross_below' THEN prev.percent >= r.threshold AND p.value < r.threshold
+        END
+    )
+    INSERT INTO alert_delivery (rule_id, entity_id, date, payload, status, attempts, next_attempt_at, created_at)
+    SELECT h.rule_id, h.entity_id, h.date,
+           CAST(json_build_object('rule_id', h.rule_id, 'rule', h.name, 'kind', h.kind,
+                                  'threshold', h.threshold, 'entity', e.code, 'date', h.date,
+                                  'value', h.value, 'previous', h.previous) AS text),
+           'pending', 0, :now, :now
+    FROM hits h JOIN storage_entity e ON e.id = h.entity_id
+    ON CONFLICT (rule_id, entity_id, date) DO NOTHING
+""")
+
+# splatné doručenia si „prenajmeme“ posunom next_attempt_at – po páde procesu sa vrátia do fronty;
+# join na alert_rule je už vo vnútornom výbere, aby riadky bez pravidla nezaberali miesta v dávke
+_CLAIM_SQL = text("""
+    UPDATE alert_delivery a SET next_attempt_at = :lease_until
+    FROM alert_rule r
+    WHERE r.id = a.rule_id AND a.id IN (
+        SELECT d.id FROM alert_delivery d
+        JOIN alert_rule dr ON dr.id = d.rule_id
+        WHERE d.status = 'pending' AND d.next_attempt_at <= :now
+        ORDER BY d.next_attempt_at
+        LIMIT :limit
+        FOR UPDATE OF d SKIP LOCKED
+    )
+    RETURNING a.id, a.attempts, a.payload, r.webhook_url
+""")
+
+# čakajúce doručenia zmazaného pravidla – volá sa v transakcii, ktorá pravidlo maže
+_ORPHAN_SQL = text("""
+    UPDATE alert_delivery SET status = 'failed', last_error = 'rule deleted'
+    WHERE rule_id = :rule_id AND status = 'pending'
+""")
+
+
+def cancel_pending(sess, rule_id: int) -> int:
+    """Označí čakajúce doručenia pravidla ako failed (pri mazaní pravidla). Commit robí volajúci."""
+    return sess.execute(_ORPHAN_SQL, {"rule_id": rule_id}).rowcount or 0
+
+
+def evaluate(sess, points) -> int:
+    """
+    points: (entity_id, date, value) práve zapísané body. Vloží odpálené pravidlá do outboxu
+    a po commite zobudí doručovanie. Vráti počet nových doručení; commit robí volajúci.
+    """
+    points = [p for p in points if p[2] is not None]
+    if not points:
+        return 0
+    now = dt.datetime.utcnow()
+    n = sess.execute(_EVALUATE_SQL, {
+        "ids": [p[0] for p in points], "dates": [p[1] for p in points], "vals": [float(p[2]) for p in points],
+        "min_date": dt.date.today() - dt.timedelta(days=ALERT_MAX_AGE_DAYS), "now": now,
+    }).rowcount or 0
+    if n:
+        sess.info["alerts_pending"] = True
+    return n
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session):
+    if session.info.pop("alerts_pending", False):
+        wake()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("alerts_pending", None)
+
+
+# --- doručovanie ----------------------------------------------------------------
+
+_wake = threading.Event()
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+_http = None
+
+
+def _session():
+    global _http
+    if _http is None:
+        import requests
+
+        _http = requests.Session()
+    return _http
+
+
+def _post(url: str, payload: str) -> str | None:
+    """None = doručené (2xx), inak text chyby."""
+    try:
+        r = _session().post(url, data=payload.encode("utf-8"), timeout=ALERT_TIMEOUT_S,
+                            headers={"Content-Type": "application/json"})
+        return None if 200 <= r.status_code < 300 else f"HTTP {r.status_code}"
+    except Exception as e:
+        return str(e)
+
+
+def backoff(attempts: int) -> dt.timedelta:
+    """30 s, 1 min, 2 min, … najviac 1 h."""
+    return dt.timedelta(seconds=min(30 * 2 ** max(attempts - 1, 0), 3600))
+
+
+def deliver_due(limit: int = BATCH) -> int:
+    """Pošle jednu dávku splatných webhookov. Vráti počet spracovaných (0 = fronta je prázdna)."""
+    now = dt.datetime.utcnow()
+    sess = SessionLocal()
+    try:
+        claimed = sess.execute(_CLAIM_SQL, {"now": now, "lease_until": now + LEASE, "limit": limit}).all()
+        sess.commit()
+        if not claimed:
+            return 0
+        with ThreadPoolExecutor(max_workers=min(8, len(claimed)), thread_name_prefix="alert-post") as pool:
+            errors = list(pool.map(lambda c: _post(c.webhook_url, c.payload), claimed))
+        done = dt.datetime.utcnow()
+        for c, err in zip(claimed, errors):
+            attempts = c.attempts + 1
+            if err is None:
+                sess.execute(text("""
+                    UPDATE alert_delivery SET status = 'sent', attempts = :attempts, sent_at = :done, last_error = NULL
+                    WHERE id = :id
+                """), {"id": c.id, "attempts": attempts, "done": done})
+            else:
+                sess.execute(text("""
+                    UPDATE alert_delivery
+                    SET status = :status, attempts = :attempts, last_error = :err, next_attempt_at = :next_at
+                    WHERE id = :id
+                """), {"id": c.id, "attempts": attempts, "err": err[:1000],
+                       "status": "failed" if attempts >= ALERT_MAX_ATTEMPTS else "pending",
+                       "next_at": done + backoff(attempts)})
+        sess.commit()
+        return len(claimed)
+    finally:
+        sess.close()
+
+
+def _loop():
+    while True:
+        _wake.wait(ALERT_POLL_S)
+        _wake.clear()
+        try:
+            while deliver_due():
+                pass
+        except Exception as e:
+            print(f"Alert delivery failed: {e}")
+
+
+def wake():
+    """Spustí (lenivo) doručovacie vlákno a pošle mu signál, že v outboxe je práca."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_loop, name="alert-delivery", daemon=True)
+            _worker.start()
+    _wake.set()
@@ -0,0 +1,83 @@
+# app/alsi.py
+"""
+Ingest GIE ALSI (LNG terminály): zásoba v nádržiach, send-out, DTMI/DTRS.
+
+Používa rovnakú pooled session, stránkovanie a hromadný upsert ako app/agsi.py;
+líši sa len base URL (ALSI_BASE_URL – dá sa presmerovať na lokálny stand-in server)
+a tvarom záznamu (vnorené {"gwh", "lng"}).
+"""
+from . import agsi
+from .settings import ALSI_BASE_URL
+
+# Stĺpce lng_terminal_daily → cesta v ALSI zázname
+LNG_FIELDS = {
+    "inventory_gwh": ("inventory", "gwh"),
+    "inventory_lng": ("inventory", "lng"),
+    "send_out": ("sendOut",),
+    "dtmi_gwh": ("dtmi", "gwh"),
+    "dtrs": ("dtrs",),
+    "contracted_capacity": ("contractedCapacity",),
+    "available_capacity": ("availableCapacity",),
+}
+_FIELD_ITEMS = tuple(LNG_FIELDS.items())
+
+# Entity, pre ktoré má zmysel pýtať sa ALSI (EU, krajiny s terminálmi, LNG prevádzkovatelia/terminály)
+LNG_ENTITY_TYPES = ("lng_company", "lng_terminal")
+
+
+def _dig(item: dict, path: tuple):
+    v = item
+    for key in path:
+        if not isinstance(v, dict):
+            return None
+        v = v.get(key)
+    return v
+
+
+def parse_record(item: dict, entity_id: int) -> dict | None:
+    """Jeden prechod cez ALSI záznam → riadok lng_terminal_daily."""
+    d = agsi.parse_gas_day(item)
+    if d is None:
+        return None
+    row = {"entity_id": entity_id, "date": d}
+    for name, path in _FIELD_ITEMS:
+        row[name] = agsi.num(_dig(item, path))
+    return row
+
+
+def fetch_entity_series(entity, from_date: str, to_date: str) -> list[dict]:
+    """Stiahne a rozparsuje ALSI sériu pre jednu entitu."""
+    from .entities import agsi_params
+
+    params = {**agsi_params(entity), "from": from_date, "to": to_date,
+              "size": agsi.PAGE_SIZE, "gas_day": "asc"}
+    out = []
+    for data in agsi.iter_pages(params, base_url=ALSI_BASE_URL):
+        for item in data:
+            row = parse_record(item, entity.id)
+            if row is not None:
+                out.append(row)
+    return out
+
+
+def fetch_listing() -> dict:
+    return agsi.fetch_listing(base_url=ALSI_BASE_URL)
+
+
+def lng_entities(sess):
+    """EU + krajiny, ktoré majú LNG prevádzkovateľa, + samotní prevádzkovatelia a terminály."""
+    from .models import StorageEntity
+
+    lng = sess.query(StorageEntity).filter(StorageEntity.type.in_(LNG_ENTITY_TYPES)).all()
+    country_ids = {e.parent_id for e in lng if e.type == "lng_company"}
+    others = (sess.query(StorageEntity)
+              .filter((StorageEntity.type == "eu") | StorageEntity.id.in_(country_ids or {-1}))
+              .all())
+    return sorted([*others, *lng], key=lambda e: e.id)
+
+
+def upsert_lng(sess, rows: list[dict]) -> int:
+    """Hromadný upsert do lng_terminal_daily; prepisuje len zmenené riadky."""
+    from .models import LngTerminalDaily
+
+    return agsi.upsert_values(sess, LngTerminalDaily.__table__, rows, LNG_FIELDS)
@@ -0,0 +1,167 @@
+# app/anomalies.py
+"""
+Streamová detekcia anomálií v sériách gas_storage_daily.percent.
+
+observe() sa volá na tom istom mieste ako revisions.record_changes (každý zapísaný bod
+v ingest-agsi-today, denných behoch a upsert_daily pri backfille) a na dávku robí konštantný
+počet dotazov: načíta stav sérií (anomaly_state), sezónne očakávania z gas_storage_envelope,
+a zapíše stav + nájdené anomálie. Stav je O(1) na sériu, takže backfill miliónov bodov
+nepotrebuje druhý prechod.
+
+Druhy anomálií:
+- delta: denný prírastok ďaleko od očakávania (priemerný prírastok z 5-ročnej obálky, inak
+  EW priemer série); z-skóre voči EW rozptylu rezídua, po zahriatí WARMUP bodov,
+- flatline: tá istá hodnota ANOMALY_FLAT_DAYS nových dní po sebe (zaseknutý zdroj),
+- restatement: AGSI spätne zmenilo už uložený deň aspoň o ANOMALY_RESTATE_PP p.b.
+
+Body staršie ako posledný bod série (dopĺňanie dier) stav neposúvajú – kontroluje sa
+pri nich len restatement.
+"""
+import datetime as dt
+import math
+from bisect import bisect_left
+
+from sqlalchemy import text
+
+from .seasonal import gas_day_index
+from .settings import ANOMALY_FLAT_DAYS, ANOMALY_RESTATE_PP, ANOMALY_Z
+
+ALPHA = 0.1           # váha nového bodu v EW priemeroch (~ posledných 10–20 dní)
+WARMUP = 14           # bodov pred prvým skórovaním
+VAR_FLOOR = 0.05 ** 2 # min. rozptyl rezídua (p.b.²) – ploché série nemajú nekonečné z-skóre
+
+_STATE_SQL = text("""
+    SELECT entity_id, last_date, last_value, n, ew_mean, ew_var, flat_run
+    FROM anomaly_state WHERE entity_id = ANY(CAST(:ids AS integer[]))
+""")
+# očakávaný prírastok = rozdiel priemerov obálky v slote dňa a v slote predchádzajúceho dňa
+_EXPECTED_SQL = text("""
+    SELECT c.entity_id, c.date, e1.mean - e0.mean
+    FROM unnest(CAST(:ids AS integer[]), CAST(:dates AS date[]),
+                CAST(:gy AS integer[]), CAST(:di AS integer[]),
+                CAST(:pgy AS integer[]), CAST(:pdi AS integer[]))
+         AS c(entity_id, date, gy, di, pgy, pdi)
+    JOIN gas_storage_envelope e1 ON e1.entity_id = c.entity_id AND e1.gas_year = c.gy AND e1.day_index = c.di
+    JOIN gas_storage_envelope e0 ON e0.entity_id = c.entity_id AND e0.gas_year = c.pgy AND e0.day_index = c.pdi
+""")
+_SAVE_STATE_SQL = text("""
+    INSERT INTO anomaly_state (entity_id, last_date, last_value, n, ew_mean, ew_var, flat_run)
+    SELECT * FROM unnest(CAST(:ids AS integer[]), CAST(:dates AS date[]), CAST(:vals AS real[]),
+                         CAST(:ns AS integer[]), CAST(:means AS real[]), CAST(:vars AS real[]),
+                         CAST(:runs AS smallint[]))
+    ON CONFLICT (entity_id) DO UPDATE SET
+        last_date = EXCLUDED.last_date, last_value = EXCLUDED.last_value, n = EXCLUDED.n,
+        ew_mean = EXCLUDED.ew_mean, ew_var = EXCLUDED.ew_var, flat_run = EXCLUDED.flat_run
+""")
+_SAVE_ANOMALIES_SQL = text("""
+    INSERT INTO gas_storage_anomaly (entity_id, date, kind, value, expected, score, detected_at)
+    SELECT c.*, :now FROM unnest(CAST(:ids AS integer[]), CAST(:dates AS date[]), CAST(:kinds AS text[]),
+                                 CAST(:vals AS real[]), CAST(:expected AS real[]), CAST(:scores AS real[]))
+         AS c(entity_id, date, kind, value, expected, score)
+    ON CONFLICT (entity_id, date, kind) DO UPDATE SET
+        value = EXCLUDED.value, expected = EXCLUDED.expected, score = EXCLUDED.score,
+        detected_at = EXCLUDED.detected_at
+""")
+
+
+def _expected(sess, points) -> dict:
+    """{(entity_id, date): očakávaný prírastok} pre body, ktoré majú obálku v oboch slotoch."""
+    if not points:
+        return {}
+    cur = [gas_day_index(d) for _, d, _ in points]
+    prev = [gas_day_index(d - dt.timedelta(days=1)) for _, d, _ in points]
+    rows = sess.execute(_EXPECTED_SQL, {
+        "ids": [p[0] for p in points], "dates": [p[1] for p in points],
+        "gy": [c[0] for c in cur], "di": [c[1] for c in cur],
+        "pgy": [p[0] for p in prev], "pdi": [p[1] for p in prev],
+    })
+    return {(e, d): v for e, d, v in rows if v is not None}
+
+
+def observe(sess, points, previous: dict | None = None) -> list[dict]:
+    """
+    points: iterovateľné (entity_id, date, value) – nové alebo zmenené hodnoty (ako pre record_changes),
+    previous: {(entity_id, date): pôvodná hodnota} z record_changes(previous=…).
+    Posunie stav sérií, uloží anomálie a vráti ich. Commit robí volajúci.
+    """
+    points = sorted((e, d, float(v)) for e, d, v in points if v is not None)
+    found = []
+    for (e, d), old in (previous or {}).items():
+        new = _lookup(points, e, d)
+        if new is not None and old is not None and abs(new - old) >= ANOMALY_RESTATE_PP:
+            found.append({"entity_id": e, "date": d, "kind": "restatement", "value": new,
+                          "expected": float(old), "score": round(new - float(old), 3)})
+    if not points:
+        return _save(sess, found, {})
+
+    state = {r[0]: list(r[1:]) for r in sess.execute(_STATE_SQL, {"ids": sorted({p[0] for p in points})})}
+    fresh = [p for p in points if p[0] not in state or p[1] > state[p[0]][0]]
+    expected = _expected(sess, fresh)
+    dirty = {}
+    for e, d, v in fresh:
+        st = state.get(e)
+        if st is None:
+            state[e] = dirty[e] = [d, v, 1, 0.0, 0.0, 0]
+            continue
+        last_date, last_value, n, ew_mean, ew_var, flat_run = st
+        if d <= last_date:
+            continue
+        gap = (d - last_date).days
+        inc = (v - last_value) / gap
+        exp = expected.get((e, d)) if gap == 1 else None
+        if exp is None:
+            exp = ew_mean
+        resid = inc - exp
+        std = math.sqrt(max(ew_var, VAR_FLOOR))
+        z = resid / std
+        if n >= WARMUP and abs(z) >= ANOMALY_Z:
+            found.append({"entity_id": e, "date": d, "kind": "delta", "value": v,
+                          "expected": round(last_value + exp * gap, 3), "score": round(z, 2)})
+        flat_run = flat_run + 1 if v == last_value else 0
+        if flat_run == ANOMALY_FLAT_DAYS:
+            found.append({"entity_id": e, "date": d, "kind": "flatline", "value": v,
+                          "expected": None, "score": float(flat_run)})
+        # outlier do rozptylu vstúpi orezaný, aby jeden skok „neoslepil“ detektor na týždne
+        clipped = max(-ANOMALY_Z * std, min(ANOMALY_Z * std, resid))
+        ew_mean += ALPHA * (inc - ew_mean)
+        ew_var = (1 - ALPHA) * ew_var + ALPHA * clipped * clipped
+        state[e] = dirty[e] = [d, v, n + 1, ew_mean, ew_var, flat_run]
+    return _save(sess, found, dirty)
+
+
+def _lookup(points, e, d):
+    """Hodnota bodu (e, d) v zoradenom zozname points, inak None."""
+    i = bisect_left(points, (e, d))
+    if i < len(points) and points[i][0] == e and points[i][1] == d:
+        return points[i][2]
+    return None
+
+
+def _save(sess, found: list[dict], dirty: dict) -> list[dict]:
+    if dirty:
+        ids = list(dirty)
+        sess.execute(_SAVE_STATE_SQL, {
+            "ids": ids, "dates": [dirty[e][0] for e in ids], "vals": [dirty[e][1] for e in ids],
+            "ns": [dirty[e][2] for e in ids], "means": [dirty[e][3] for e in ids],
+            "vars": [dirty[e][4] for e in ids], "runs": [dirty[e][5] for e in ids],
+        })
+    if found:
+        sess.execute(_SAVE_ANOMALIES_SQL, {
+            "now": dt.datetime.utcnow(),
+            "ids": [a["entity_id"] for a in found], "dates": [a["date"] for a in found],
+            "kinds": [a["kind"] for a in found], "vals": [a["value"] for a in found],
+            "expected": [a["expected"] for a in found], "scores": [a["score"] for a in found],
+        })
+    return found
+
+
+def list_anomalies(sess, entity_id: int | None, date_from: dt.date, kinds=None) -> list:
+    return sess.execute(text("""
+        SELECT a.entity_id, e.code, a.date, a.kind, a.value, a.expected, a.score, a.detected_at
+        FROM gas_storage_anomaly a
+        JOIN storage_entity e ON e.id = a.entity_id
+        WHERE a.date >= :date_from
+          AND (CAST(:entity_id AS integer) IS NULL OR a.entity_id = :entity_id)
+          AND (CAST(:kinds AS text[]) IS NULL OR a.kind = ANY(CAST(:kinds AS text[])))
+        ORDER BY a.date DESC, a.entity_id, a.kind
+    """), {"entity_id": entity_id, "date_from": date_from, "kinds": list(kinds) if kinds else None}).all()
@@ -0,0 +1,204 @@
+# app/comment_cache.py
+"""
+Perzistentná cache vygenerovaných komentárov.
+
+Komentár je plne určený zaokrúhlenými vstupmi (percent, delta, trend7, yoy_gap),
+verziou promptu a názvom modelu – z nich sa skladá kľúč (sha256). Pred tabuľkou
+comment_cache je malá in-process LRU vrstva, takže opakovaný refresh alebo backfill
+cez ploché obdobie nestojí ani LLM volanie, ani round-trip do DB.
+
+Eviction: záznamy staršie ako COMMENT_CACHE_TTL_DAYS (podľa last_used_at) sa mažú
+a tabuľka sa orezáva na COMMENT_CACHE_MAX_ENTRIES najnovšie použitých (LRU) – raz za
+_EVICT_EVERY uložení, nie pri každom. Zásahy z pamäte sa do last_used_at/hits zapisujú
+dávkovo (_TOUCH_FLUSH kľúčov, a vždy pred eviction), aby najčastejšie kľúče nevyzerali
+v DB ako staré.
+"""
+import datetime as dt
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .settings import COMMENT_CACHE_MAX_ENTRIES, COMMENT_CACHE_TTL_DAYS
+
+_MEMORY_MAX = 512
+_TOUCH_FLUSH = 64
+_EVICT_EVERY = 50
+_memory: "OrderedDict[str, str]" = OrderedDict()
+_touched: dict[str, int] = {}   # kľúč → počet zásahov z pamäte od posledného zápisu do DB
+_puts = 0
+_lock = threading.Lock()
+
+_stats = {
+    "memory_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "evicted": 0,
+    "errors": 0,
+}
+
+
+def _r2(x) -> str:
+    return "none" if x is None else f"{round(float(x), 2):.2f}"
+
+
+def cache_key(current_percent: float, delta: float | None, trend7: float, yoy_gap: float,
+              model: str, prompt_version: int) -> str:
+    """Kľúč zo zaokrúhlených vstupov (2 desatinné miesta), verzie promptu a modelu."""
+    raw = "|".join([
+        f"v{prompt_version}", model,
+        _r2(current_percent), _r2(delta), _r2(trend7), _r2(yoy_gap),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _remember(key: str, comment: str) -> None:
+    with _lock:
+        _memory[key] = comment
+        _memory.move_to_end(key)
+        while len(_memory) > _MEMORY_MAX:
+            _memory.popitem(last=False)
+
+
+def _take_touched() -> dict[str, int]:
+    global _touched
+    with _lock:
+        out, _touched = _touched, {}
+    return out
+
+
+def _write_touched(sess, touched: dict[str, int], now: dt.datetime) -> None:
+    """Zapíše dávku zásahov z pamäte (last_used_at, hits); commit robí volajúci."""
+    from sqlalchemy import text
+
+    if touched:
+        sess.execute(text("""
+            UPDATE comment_cache SET last_used_at = :now, hits = COALESCE(hits, 0) + :n WHERE key = :key
+        """), [{"key": k, "n": n, "now": now} for k, n in touched.items()])
+
+
+def _flush_touched() -> None:
+    from .database import SessionLocal
+
+    touched = _take_touched()
+    if not touched:
+        return
+    sess = SessionLocal()
+    try:
+        _write_touched(sess, touched, dt.datetime.utcnow())
+        sess.commit()
+    except Exception as e:
+        sess.rollback()
+        with _lock:
+            _stats["errors"] += 1
+        print(f"Warning: comment cache touch failed: {e}")
+    finally:
+        sess.close()
+
+
+def get(key: str) -> str | None:
+    """Vráti komentár z cache (najprv pamäť, potom DB) alebo None."""
+    with _lock:
+        hit = _memory.get(key)
+        if hit is not None:
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+            _touched[key] = _touched.get(key, 0) + 1
+            flush = len(_touched) >= _TOUCH_FLUSH
+    if hit is not None:
+        if flush:
+            _flush_touched()
+        return hit
+
+    from .database import SessionLocal
+    from .models import CommentCache
+
+    sess = SessionLocal()
+    try:
+        row = sess.get(CommentCache, key)
+        if row is None:
+            with _lock:
+                _stats["misses"] += 1
+            return None
+        row.hits = (row.hits or 0) + 1
+        row.last_used_at = dt.datetime.utcnow()
+        comment = row.comment
+        sess.commit()
+    except Exception as e:
+        sess.rollback()
+        with _lock:
+            _stats["errors"] += 1
+            _stats["misses"] += 1
+        print(f"Warning: comment cache lookup failed: {e}")
+        return None
+    finally:
+        sess.close()
+
+    with _lock:
+        _stats["db_hits"] += 1
+    _remember(key, comment)
+    return comment
+
+
+def put(key: str, comment: str, model: str, prompt_version: int) -> None:
+    """Uloží komentár do cache; každé _EVICT_EVERY-té uloženie spustí eviction (TTL + LRU strop)."""
+    global _puts
+    _remember(key, comment)
+    with _lock:
+        evict = _puts % _EVICT_EVERY == 0
+        _puts += 1
+
+    from sqlalchemy import delete, select
+    from .database import SessionLocal
+    from .models import CommentCache
+
+    now = dt.datetime.utcnow()
+    sess = SessionLocal()
+    try:
+        row = sess.get(CommentCache, key)
+        if row is None:
+            sess.add(CommentCache(key=key, model=model, prompt_version=prompt_version,
+                                  comment=comment, created_at=now, last_used_at=now, hits=0))
+        else:
+            row.comment = comment
+            row.last_used_at = now
+        sess.flush()
+
+        evicted = 0
+        if evict:
+            # pred orezaním podľa last_used_at musia byť v DB aj zásahy z pamäte
+            _write_touched(sess, _take_touched(), now)
+            evicted = sess.execute(
+                delete(CommentCache).where(
+                    CommentCache.last_used_at < now - dt.timedelta(days=COMMENT_CACHE_TTL_DAYS)
+                )
+            ).rowcount or 0
+            overflow = (
+                select(CommentCache.key)
+                .order_by(CommentCache.last_used_at.desc())
+                .offset(COMMENT_CACHE_MAX_ENTRIES)
+            )
+            evicted += sess.execute(
+                delete(CommentCache).where(CommentCache.key.in_(overflow))
+            ).rowcount or 0
+        sess.commit()
+        with _lock:
+            _stats["stores"] += 1
+            _stats["evicted"] += evicted
+    except Exception as e:
+        sess.rollback()
+        with _lock:
+            _stats["errors"] += 1
+        print(f"Warning: comment cache store failed: {e}")
+    finally:
+        sess.close()
+
+
+def stats() -> dict:
+    """Hit/miss metriky od štartu procesu."""
+    with _lock:
+        out = dict(_stats)
+        out["memory_entries"] = len(_memory)
+    lookups = out["memory_hits"] + out["db_hits"] + out["misses"]
+    out["hit_ratio"] = round((out["memory_hits"] + out["db_hits"]) / lookups, 4) if lookups else None
+    return out
@@ -0,0 +1,29 @@
+# app/comments.py
+"""Čítanie/zápis komentárov v side-table gas_storage_comment."""
+import datetime as dt
+
+from .models import GasStorageComment
+
+
+def get_comment(sess, day: dt.date) -> str | None:
+    row = sess.get(GasStorageComment, day)
+    return row.comment if row else None
+
+
+def has_comment(sess, day: dt.date) -> bool:
+    text = get_comment(sess, day)
+    return bool(text and str(text).strip())
+
+
+def save_comment(sess, day: dt.date, text: str, model: str | None, prompt_version: int | None) -> None:
+    """Upsert komentára pre daný deň (commit robí volajúci)."""
+    now = dt.datetime.utcnow()
+    row = sess.get(GasStorageComment, day)
+    if row:
+        row.comment = text
+        row.model = model
+        row.prompt_version = prompt_version
+        row.generated_at = now
+    else:
+        sess.add(GasStorageComment(date=day, comment=text, model=model,
+                                   prompt_version=prompt_version, generated_at=now))
@@ -1,27 +1,348 @@
-from sqlalchemy import create_engine, text
+import threading
+from time import monotonic, perf_counter
+
+from sqlalchemy import create_engine, event, exc, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
-from .settings import DATABASE_URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from .settings import (ASYNC_DATABASE_URL, DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_SIZE,
+                       DB_POOL_TIMEOUT, DB_PRE_PING, DB_PRE_PING_IDLE_S, DROP_LEGACY_COMMENT_COLUMN,
+                       READ_DATABASE_URL)
 
 # Definuj Base tu (žiadny import z models!)
 Base = declarative_base()
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+
+# --- connection pool: konfigurácia + metriky ------------------------------------
+
+class PoolStats:
+    """Počítadlá jedného poolu (checkouty, nové spojenia, čakanie na voľné spojenie, timeouty)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.checkouts = self.connects = self.invalidations = self.timeouts = self.pings = 0
+        self.wait_s = self.wait_max_s = 0.0
+
+    def waited(self, seconds: float, timed_out: bool = False):
+        with self.lock:
+            self.wait_s += seconds
+            self.wait_max_s = max(self.wait_max_s, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+
+POOL_STATS: dict[str, PoolStats] = {}
+_POOLS: dict = {}
+
+
+class _TimedGet:
+    """Mixin: meria čas čakania na spojenie z poolu (_do_get blokuje, keď je pool aj overflow plný)."""
+
+    def _do_get(self):
+        t = perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self._stats.waited(perf_counter() - t, timed_out=True)
+            raise
+        self._stats.waited(perf_counter() - t)
+        return conn
+
+
+class InstrumentedQueuePool(_TimedGet, QueuePool):
+    pass
+
+
+class InstrumentedAsyncPool(_TimedGet, AsyncAdaptedQueuePool):
+    pass
+
+
+def _instrument(sync_engine, name: str):
+    """Metriky + pre-ping podľa DB_PRE_PING na engine (pre async engine jeho sync_engine)."""
+    stats = POOL_STATS[name] = PoolStats(name)
+    pool = sync_engine.pool
+    pool._stats = stats
+    _POOLS[name] = pool
+
+    @event.listens_for(pool, "connect")
+    def _connect(dbapi_conn, record):
+        stats.connects += 1
+        record.info["checkin_at"] = monotonic()
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_conn, record):
+        record.info["checkin_at"] = monotonic()
+
+    @event.listens_for(pool, "invalidate")
+    def _invalidate(dbapi_conn, record, exception):
+        stats.invalidations += 1
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        stats.checkouts += 1
+        # „idle“ pre-ping: SELECT 1 len po dlhšom ležaní v poole, nie pri každom checkoute
+        if DB_PRE_PING == "idle" and monotonic() - record.info.get("checkin_at", 0) > DB_PRE_PING_IDLE_S:
+            stats.pings += 1
+            try:
+                cur = dbapi_conn.cursor()
+                cur.execute("SELECT 1")
+                cur.close()
+            except Exception as e:
+                raise exc.DisconnectionError() from e
+
+
+def _pool_kwargs(poolclass) -> dict:
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_PRE_PING == "always",
+    }
+
+
+def pool_status() -> dict:
+    """Aktuálny stav a počítadlá všetkých poolov (primary, read, async)."""
+    out = {}
+    for name, pool in _POOLS.items():
+        st = POOL_STATS[name]
+        out[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checkouts": st.checkouts,
+            "connects": st.connects,
+            "invalidations": st.invalidations,
+            "pings": st.pings,
+            "timeouts": st.timeouts,
+            "wait_ms_total": round(st.wait_s * 1000, 1),
+            "wait_ms_max": round(st.wait_max_s * 1000, 1),
+        }
+    return out
+
+
+engine = create_engine(DATABASE_URL, **_pool_kwargs(InstrumentedQueuePool))
+_instrument(engine, "primary")
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# Čítania (today, history, export) idú na repliku, ak je nastavená; zápisy vždy na primárnu
+if READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL, **_pool_kwargs(InstrumentedQueuePool))
+    _instrument(read_engine, "read")
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+
+
+def async_database_url(url: str | None = None) -> str | None:
+    """
+    postgres(ql)[+psycopg2]://… → postgresql+asyncpg://…; sslmode asyncpg nepozná (ssl=).
+    Pre iné databázy (napr. sqlite) None – async ovládač nemajú, čítania idú cez sync session.
+    """
+    url = url or READ_DATABASE_URL or DATABASE_URL or ""
+    scheme, sep, rest = url.partition("://")
+    if scheme not in ("postgres", "postgresql", "postgresql+psycopg2", "postgresql+asyncpg"):
+        return None
+    return ("postgresql+asyncpg" + sep + rest).replace("sslmode=", "ssl=")
+
+
+_async: dict = {}
+
+
+def async_session():
+    """
+    AsyncSession nad asyncpg pre read endpointy (engine sa vytvorí lenivo pri prvom použití;
+    mieri na read repliku, ak je nastavená).
+    Existujúci sync kód (ORM dotazy, helpery) sa v nej spúšťa cez `await asess.run_sync(fn, …)` –
+    I/O ide cez event loop, nie cez threadpool.
+    Vráti None, ak URL nemá async ovládač – volajúci vtedy použije ReadSessionLocal (main.run_read).
+    """
+    if "factory" not in _async:
+        url = ASYNC_DATABASE_URL or async_database_url()
+        if not url:
+            _async["factory"] = None
+            return None
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async["engine"] = create_async_engine(url, **_pool_kwargs(InstrumentedAsyncPool))
+        _instrument(_async["engine"].sync_engine, "async")
+        _async["factory"] = async_sessionmaker(_async["engine"], autoflush=False, expire_on_commit=False)
+    factory = _async["factory"]
+    return factory() if factory is not None else None
+
+# Veľkosť dávky pri presune komentárov – krátke transakcie, žiadne dlhé zámky
+_COMMENT_MIGRATION_BATCH = 500
+
+def _migrate_comments_to_side_table():
+    """
+    Presunie gas_storage_daily.comment → gas_storage_comment bez výpadku (expand/contract):
+    1. tabuľku gas_storage_comment vytvorí create_all,
+    2. komentáre sa kopírujú po dávkach (idempotentne, ON CONFLICT DO NOTHING) – beží pri každom
+       štarte, takže dobehne aj to, čo počas rolling deployu zapísala stará inštancia,
+    3. starý stĺpec sa zmaže až s DROP_LEGACY_COMMENT_COLUMN=1, s krátkym lock_timeout.
+    """
+    cols = {c["name"] for c in inspect(engine).get_columns("gas_storage_daily")}
+    if "comment" not in cols:
+        return
+
+    moved = 0
+    after = None
+    while True:
+        with engine.begin() as conn:
+            upper = conn.execute(text("""
+                SELECT MAX(date) FROM (
+                  SELECT date FROM gas_storage_daily
+                   WHERE entity_id = 1 AND comment IS NOT NULL AND btrim(comment) <> ''
+                     AND (CAST(:after AS date) IS NULL OR date > :after)
+                   ORDER BY date
+                   LIMIT :batch
+                ) b
+            """), {"after": after, "batch": _COMMENT_MIGRATION_BATCH}).scalar()
+            if upper is None:
+                break
+            res = conn.execute(text("""
+                INSERT INTO gas_storage_comment (date, comment, model, prompt_version, generated_at)
+                SELECT date, comment, 'legacy', NULL, now()
+                  FROM gas_storage_daily
+                 WHERE entity_id = 1 AND comment IS NOT NULL AND btrim(comment) <> ''
+                   AND (CAST(:after AS date) IS NULL OR date > :after)
+                   AND date <= :upper
+                ON CONFLICT (date) DO NOTHING
+            """), {"after": after, "upper": upper})
+            moved += res.rowcount or 0
+        after = upper
+    if moved:
+        print(f"Migrated {moved} comments to gas_storage_comment")
+
+    if DROP_LEGACY_COMMENT_COLUMN:
+        with engine.begin() as conn:
+            conn.execute(text("SET LOCAL lock_timeout = '2s'"))
+            conn.execute(text("ALTER TABLE gas_storage_daily DROP COLUMN IF EXISTS comment"))
+        print("Dropped legacy column gas_storage_daily.comment")
+
+def _migrate_entity_dimension():
+    """
+    Rozšíri gas_storage_daily o entitu (EU/krajina/company/facility) bez výpadku:
+    - EU entita s pevným id 1; ADD COLUMN entity_id s konštantným defaultom je v PG11+ len metadata,
+    - nový covering PK (entity_id, date) INCLUDE (percent, delta) sa postaví CONCURRENTLY
+      a vymení sa v jednej krátkej transakcii (lock_timeout),
+    - unique index na samotný date musí preč (rovnaký deň pre viac entít),
+    - stĺpec id ostáva (bez PK) kvôli starej inštancii počas rolling deployu.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO storage_entity (id, type, code, name)
+            VALUES (1, 'eu', 'eu', 'EU')
+            ON CONFLICT (id) DO NOTHING
+        """))
+        conn.execute(text("""
+            SELECT setval(pg_get_serial_sequence('storage_entity', 'id'),
+                          GREATEST((SELECT MAX(id) FROM storage_entity), 1))
+        """))
+
+    cols = {c["name"] for c in inspect(engine).get_columns("gas_storage_daily")}
+    if "entity_id" not in cols:
+        with engine.begin() as conn:
+            conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            conn.execute(text("ALTER TABLE gas_storage_daily ADD COLUMN entity_id integer NOT NULL DEFAULT 1"))
+        print("Added gas_storage_daily.entity_id")
+
+    pk = inspect(engine).get_pk_constraint("gas_storage_daily")
+    if pk.get("constrained_columns") != ["entity_id", "date"]:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(
+                "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS gsd_entity_date_uq "
+                "ON gas_storage_daily (entity_id, date) INCLUDE (percent, delta);"
+            ))
+        with engine.begin() as conn:
+            conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            if pk.get("name"):
+                conn.execute(text(f'ALTER TABLE gas_storage_daily DROP CONSTRAINT "{pk["name"]}"'))
+            conn.execute(text("ALTER TABLE gas_storage_daily ALTER COLUMN id DROP NOT NULL"))
+            conn.execute(text(
+                "ALTER TABLE gas_storage_daily ADD CONSTRAINT gas_storage_daily_pkey "
+                "PRIMARY KEY USING INDEX gsd_entity_date_uq"
+            ))
+        print("Switched gas_storage_daily primary key to (entity_id, date)")
+
+    # staré indexy na date/id nahradil covering PK + BRIN
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for idx in ("ix_gas_storage_daily_date", "ix_gas_storage_daily_id", "idx_gsd_date_cover", "idx_gsd_date"):
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {idx};"))
+
+def _seed_revisions():
+    """
+    Prvé naplnenie gas_storage_revision z gas_storage_daily (len ak je tabuľka prázdna).
+    Kedy sme hodnotu videli prvýkrát nevieme – berieme date + 1 deň (AGSI publikuje gas day nasledujúci deň).
+    """
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT EXISTS (SELECT 1 FROM gas_storage_revision)")).scalar():
+            return
+        n = conn.execute(text("""
+            INSERT INTO gas_storage_revision (entity_id, date, first_seen_at, value)
+            SELECT entity_id, date, date + 1, percent
+            FROM gas_storage_daily
+            WHERE percent IS NOT NULL
+            ON CONFLICT DO NOTHING
+        """)).rowcount
+    print(f"Seeded {n} rows into gas_storage_revision")
+
+
+def _seed_envelope():
+    """Prvý výpočet gas_storage_envelope (len ak je tabuľka prázdna); ďalej sa prepočítava inkrementálne."""
+    from .seasonal import refresh_envelope
+
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT EXISTS (SELECT 1 FROM gas_storage_envelope)")).scalar():
+            return
+    sess = SessionLocal()
+    try:
+        n = refresh_envelope(sess)
+        sess.commit()
+        print(f"Seeded {n} rows into gas_storage_envelope")
+    finally:
+        sess.close()
+
+
 def init_db():
     """Vytvorí tabuľky podľa modelov. Pokračuje aj keď tabuľky už existujú."""
     try:
         # vytvorí tabuľky podľa modelov, ktoré importujú Base z tohto modulu
         Base.metadata.create_all(bind=engine)
 
-        # index na dátum – Postgres (bezpečné, IF NOT EXISTS)
         try:
-            with engine.connect() as conn:
-                conn.execute(text("CREATE INDEX IF NOT EXISTS idx_gsd_date ON gas_storage_daily(date);"))
-                conn.commit()
+            _migrate_entity_dimension()
+        except Exception as mig_error:
+            print(f"Warning: Entity migration failed (will retry on next start): {mig_error}")
+
+        # BRIN index na dátum – Postgres (bezpečné, IF NOT EXISTS, bez blokovania zápisov)
+        try:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_gsd_date_brin "
+                    "ON gas_storage_daily USING brin (date);"
+                ))
         except Exception as idx_error:
             # Index možno už existuje alebo nie je dostupná databáza
             print(f"Note: Could not create index (may already exist): {idx_error}")
+
+        try:
+            _seed_revisions()
+        except Exception as mig_error:
+            print(f"Warning: Revision seed failed (will retry on next start): {mig_error}")
+
+        try:
+            _seed_envelope()
+        except Exception as mig_error:
+            print(f"Warning: Envelope seed failed (will retry on next start): {mig_error}")
+
+        try:
+            _migrate_comments_to_side_table()
+        except Exception as mig_error:
+            print(f"Warning: Comment migration failed (will retry on next start): {mig_error}")
     except Exception as e:
         print(f"Warning: Database initialization error: {e}")
         raise
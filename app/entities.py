@@ -0,0 +1,126 @@
+# app/entities.py
+"""
+Entity dimenzia pre série GIE: AGSI (EU agregát, krajiny, prevádzkovatelia, zásobníky)
+a ALSI (prevádzkovatelia LNG terminálov, terminály).
+
+Kód entity je to, čo používa API (?entity=eu | DE | <EIC>); interné id je kľúč
+v gas_storage_daily. Mapovanie kód → id sa drží v malej in-process cache.
+"""
+import threading
+
+from .models import EU_ENTITY_ID, StorageEntity
+
+ENTITY_TYPES = ("eu", "country", "company", "facility", "lng_company", "lng_terminal")
+AGSI_ENTITY_TYPES = ("eu", "country", "company", "facility")
+
+_code_cache: dict[str, int] = {"eu": EU_ENTITY_ID}
+_lock = threading.Lock()
+
+
+def _norm(code: str) -> str:
+    return (code or "").strip().lower()
+
+
+def resolve_entity_id(sess, code: str | None) -> int | None:
+    """Vráti id entity podľa kódu (case-insensitive); None/'' = EU. Neznámy kód → None."""
+    key = _norm(code) or "eu"
+    with _lock:
+        hit = _code_cache.get(key)
+    if hit is not None:
+        return hit
+    from sqlalchemy import func
+    row = sess.query(StorageEntity.id).filter(func.lower(StorageEntity.code) == key).first()
+    if row is None:
+        return None
+    with _lock:
+        _code_cache[key] = row.id
+    return row.id
+
+
+def agsi_params(entity: StorageEntity) -> dict:
+    """Parametre AGSI/ALSI dotazu pre danú entitu."""
+    if entity.type == "eu":
+        return {"type": "eu"}
+    params = {"country": entity.country}
+    if entity.type in ("company", "facility", "lng_company", "lng_terminal"):
+        params["company"] = entity.company
+    if entity.type in ("facility", "lng_terminal"):
+        params["facility"] = entity.code
+    return params
+
+
+def _upsert_entity(sess, existing: dict, type_: str, code: str, name: str | None,
+                   country: str | None = None, company: str | None = None,
+                   parent_id: int | None = None) -> tuple[StorageEntity, bool]:
+    row = existing.get(_norm(code))
+    if row is not None:
+        row.name = name or row.name
+        row.country = country or row.country
+        row.company = company or row.company
+        row.parent_id = parent_id or row.parent_id
+        return row, False
+    row = StorageEntity(type=type_, code=code, name=name, country=country,
+                        company=company, parent_id=parent_id)
+    sess.add(row)
+    sess.flush()
+    existing[_norm(code)] = row
+    return row, True
+
+
+# Koreň listingu a typy entít podľa zdroja: AGSI (zásobníky) / ALSI (LNG terminály)
+LISTING_KINDS = {
+    "agsi": ("SSO", "company", "facility"),
+    "alsi": ("LSO", "lng_company", "lng_terminal"),
+}
+
+
+def sync_entities(sess, listing, source: str = "agsi") -> dict:
+    """
+    Zosynchronizuje storage_entity podľa GIE listingu (/api/about?show=listing).
+    Tvar: {"SSO"|"LSO": {"<región>": {"<krajina>": [{"eic", "name", "facilities": [{"eic", "name"}, ...]}, ...]}}}.
+    Parsuje sa defenzívne – neznáme uzly sa preskočia. Krajiny zakladá len AGSI listing; ALSI
+    prevádzkovatelia sa pripoja k existujúcej krajine, inak priamo k EU. Commit robí volajúci.
+    """
+    root, company_type, facility_type = LISTING_KINDS[source]
+    existing = {_norm(e.code): e for e in sess.query(StorageEntity).all()}
+    created = 0
+    regions = (listing or {}).get(root) if isinstance(listing, dict) else None
+    if not isinstance(regions, dict):
+        return {"created": 0, "total": len(existing)}
+
+    for countries in regions.values():
+        if not isinstance(countries, dict):
+            continue
+        for country_code, companies in countries.items():
+            cc = str(country_code).upper()
+            if source == "agsi":
+                country_row, new = _upsert_entity(sess, existing, "country", cc, cc,
+                                                  country=cc, parent_id=EU_ENTITY_ID)
+                created += new
+                parent_id = country_row.id
+            else:
+                # krajina len s LNG (bez zásobníkov) nesmie vzniknúť ako AGSI entita – backfill aj
+                # find_gaps by ju potom márne dopytovali; LNG prevádzkovateľ visí na EU
+                country_row = existing.get(_norm(cc))
+                parent_id = country_row.id if country_row is not None and country_row.type == "country" else EU_ENTITY_ID
+            for comp in companies if isinstance(companies, list) else []:
+                comp_eic = comp.get("eic") if isinstance(comp, dict) else None
+                if not comp_eic:
+                    continue
+                comp_row, new = _upsert_entity(sess, existing, company_type, comp_eic,
+                                               comp.get("name") or comp.get("short_name"),
+                                               country=cc, company=comp_eic, parent_id=parent_id)
+                created += new
+                for fac in comp.get("facilities") or []:
+                    fac_eic = fac.get("eic") if isinstance(fac, dict) else None
+                    if not fac_eic:
+                        continue
+                    _, new = _upsert_entity(sess, existing, facility_type, fac_eic, fac.get("name"),
+                                            country=cc, company=comp_eic, parent_id=comp_row.id)
+                    created += new
+
+    with _lock:
+        for k, e in existing.items():
+            if e.id is not None:
+                _code_cache[k] = e.id
+    return {"created": created, "total": len(existing)}
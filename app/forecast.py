@@ -0,0 +1,112 @@
+# app/forecast.py
+"""
+Predpoveď naplnenia k cieľovému dňu (EU cieľ 90 % k 1. novembru) Monte Carlo simuláciou.
+
+Profil vtláčania: denné prírastky percent z gas_storage_daily v tom istom úseku sezóny
+minulých rokov (posun podľa app/seasonal.shift_years, takže prestupné roky nedriftujú).
+Každá cesta skladá prírastky po 7-dňových blokoch z náhodne vybraných rokov (block bootstrap
+zachová týždennú autokoreláciu počasia/toku), všetky cesty naraz ako matica paths × dni v NumPy.
+Diery v histórii sa pred výpočtom prírastkov doplnia poslednou známou hodnotou.
+"""
+import datetime as dt
+
+from sqlalchemy import text
+
+from .seasonal import shift_years
+
+TARGET_MONTH_DAY = (11, 1)
+TARGET_PCT = 90.0
+BLOCK_DAYS = 7
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def target_date(after: dt.date, month_day: tuple[int, int] = TARGET_MONTH_DAY) -> dt.date:
+    """Najbližší cieľový deň po `after` (po 1. 11. už ten v ďalšom roku)."""
+    t = dt.date(after.year, *month_day)
+    return t if t > after else dt.date(after.year + 1, *month_day)
+
+
+def load_series(sess, entity_id: int):
+    """(prvý dátum, súvislé pole percent po dňoch, diery doplnené forward-fillom)."""
+    import numpy as np
+
+    rows = sess.execute(text("""
+        SELECT date, percent FROM gas_storage_daily
+        WHERE entity_id = :entity_id AND percent IS NOT NULL
+        ORDER BY date
+    """), {"entity_id": entity_id}).all()
+    if not rows:
+        return None, np.empty(0)
+    first = rows[0][0]
+    offsets = np.fromiter(((d - first).days for d, _ in rows), dtype=np.int64, count=len(rows))
+    series = np.full(int(offsets[-1]) + 1, np.nan)
+    series[offsets] = [float(v) for _, v in rows]
+    # forward-fill: index poslednej známej hodnoty pre každý deň
+    idx = np.where(np.isnan(series), 0, np.arange(series.size))
+    np.maximum.accumulate(idx, out=idx)
+    return first, series[idx]
+
+
+def profiles(first: dt.date, series, start: dt.date, horizon: int, max_years: int):
+    """Matica rokov × horizon denných prírastkov z rovnakého úseku minulých rokov (len úplné roky)."""
+    import numpy as np
+
+    inc = np.diff(series, prepend=series[0])
+    years, rows = [], []
+    for k in range(1, max_years + 1):
+        d = shift_years(start, k) or shift_years(start - dt.timedelta(days=1), k)
+        off = (d - first).days
+        if off < 0:
+            break
+        if off + horizon < series.size:
+            years.append(d.year)
+            rows.append(inc[off + 1: off + 1 + horizon])
+    return years, (np.vstack(rows) if rows else np.empty((0, horizon)))
+
+
+def simulate(start_value: float, prof, n_paths: int, seed: int = 0, block: int = BLOCK_DAYS):
+    """Cesty n_paths × horizon: start + kumulatívny súčet prírastkov z náhodných rokov po blokoch."""
+    import numpy as np
+
+    n_years, horizon = prof.shape
+    rng = np.random.default_rng(seed)
+    n_blocks = -(-horizon // block)
+    pick = np.repeat(rng.integers(0, n_years, size=(n_paths, n_blocks)), block, axis=1)[:, :horizon]
+    steps = prof[pick, np.arange(horizon)]
+    paths = start_value + np.cumsum(steps, axis=1)
+    return np.clip(paths, 0.0, 100.0, out=paths)
+
+
+def forecast(sess, entity_id: int, n_paths: int = 5000, max_years: int = 10,
+             target_pct: float = TARGET_PCT, seed: int = 0) -> dict | None:
+    """Percentilové pásma po dňoch do cieľového dňa a pravdepodobnosť dosiahnutia target_pct."""
+    import numpy as np
+
+    first, series = load_series(sess, entity_id)
+    if first is None:
+        return None
+    last_date = first + dt.timedelta(days=series.size - 1)
+    start_value = float(series[-1])
+    target = target_date(last_date)
+    horizon = (target - last_date).days
+    years, prof = profiles(first, series, last_date, horizon, max_years)
+    if not years:
+        return {"as_of": last_date, "value": start_value, "target_date": target, "target_pct": target_pct,
+                "years": [], "paths": 0, "p_hit": None, "p_hit_any": None, "final": None, "bands": None}
+
+    paths = simulate(start_value, prof, n_paths, seed=seed)
+    bands = np.percentile(paths, PERCENTILES, axis=0).round(3)
+    final = paths[:, -1]
+    return {
+        "as_of": last_date,
+        "value": round(start_value, 3),
+        "target_date": target,
+        "target_pct": target_pct,
+        "years": years,
+        "paths": n_paths,
+        "p_hit": round(float((final >= target_pct).mean()), 4),
+        "p_hit_any": round(float((paths.max(axis=1) >= target_pct).mean()), 4),
+        "final": {f"p{p}": float(v) for p, v in zip(PERCENTILES, bands[:, -1])},
+        "bands": {"dates": [last_date + dt.timedelta(days=i + 1) for i in range(horizon)],
+                  **{f"p{p}": bands[j].tolist() for j, p in enumerate(PERCENTILES)}},
+    }
@@ -0,0 +1,81 @@
+# app/gaps.py
+"""
+Hľadanie dier v gas_storage_daily jedným SQL dotazom (generate_series + anti-join na PK)
+a ich zlúčenie do čo najmenšieho počtu AGSI requestov.
+
+EU sa kontroluje od date_from (sezónne porovnanie potrebuje históriu od 2021), ostatné entity
+až od svojho prvého dňa v DB – zásobník, ktorý začal reportovať neskôr, nemá „dieru“ pred tým.
+Entita bez jediného riadku sa preskočí, pokiaľ nie je výslovne v entity_ids.
+"""
+import datetime as dt
+
+from sqlalchemy import text
+
+from .entities import AGSI_ENTITY_TYPES
+from .models import EU_ENTITY_ID
+
+# Súvislé chýbajúce dni → jeden riadok (trik date - row_number() je pre súvislý úsek konštantný)
+_GAPS_SQL = text("""
+    WITH ents AS (
+        SELECT e.id AS entity_id,
+               CASE WHEN e.id = :eu_id THEN CAST(:date_from AS date)
+                    ELSE (SELECT CASE WHEN MIN(g.date) IS NOT NULL
+                                      THEN GREATEST(CAST(:date_from AS date), MIN(g.date))
+                                      -- entita bez dát: len ak ju volajúci vyžiadal cez entity_ids
+                                      WHEN CAST(:entity_ids AS integer[]) IS NOT NULL
+                                      THEN CAST(:date_from AS date)
+                                 END
+                          FROM gas_storage_daily g WHERE g.entity_id = e.id)
+               END AS start_date
+        FROM storage_entity e
+        WHERE e.type = ANY(CAST(:types AS text[]))
+          AND (CAST(:entity_ids AS integer[]) IS NULL OR e.id = ANY(CAST(:entity_ids AS integer[])))
+    ),
+    missing AS (
+        SELECT e.entity_id, d::date AS date
+        FROM ents e
+        CROSS JOIN LATERAL generate_series(e.start_date, CAST(:date_to AS date), interval '1 day') AS d
+        WHERE e.start_date IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM gas_storage_daily g
+            WHERE g.entity_id = e.entity_id AND g.date = d::date
+        )
+    ),
+    grouped AS (
+        SELECT entity_id, date,
+               date - CAST(ROW_NUMBER() OVER (PARTITION BY entity_id ORDER BY date) AS integer) AS grp
+        FROM missing
+    )
+    SELECT entity_id, MIN(date) AS date_from, MAX(date) AS date_to, COUNT(*) AS days
+    FROM grouped
+    GROUP BY entity_id, grp
+    ORDER BY entity_id, date_from
+""")
+
+
+def find_gaps(sess, date_from: dt.date, date_to: dt.date, entity_ids: list[int] | None = None,
+              types=AGSI_ENTITY_TYPES) -> list[dict]:
+    """Chýbajúce úseky [date_from, date_to] po entitách: [{"entity_id", "from", "to", "days"}, …]."""
+    rows = sess.execute(_GAPS_SQL, {
+        "eu_id": EU_ENTITY_ID, "date_from": date_from, "date_to": date_to,
+        "types": list(types), "entity_ids": entity_ids,
+    }).all()
+    return [{"entity_id": r.entity_id, "from": r.date_from, "to": r.date_to, "days": r.days} for r in rows]
+
+
+def coalesce(gaps: list[dict], merge_within_days: int = 7) -> list[dict]:
+    """
+    Zlúči diery tej istej entity, medzi ktorými je najviac `merge_within_days` existujúcich dní –
+    stiahnuť pár dní navyše je lacnejšie ako ďalší request. Vstup musí byť zoradený ako z find_gaps.
+    """
+    out: list[dict] = []
+    for g in gaps:
+        last = out[-1] if out else None
+        if (last and last["entity_id"] == g["entity_id"]
+                and (g["from"] - last["to"]).days - 1 <= merge_within_days):
+            last["to"] = g["to"]
+            last["missing"] += g["days"]
+            last["gaps"] += 1
+        else:
+            out.append({"entity_id": g["entity_id"], "from": g["from"], "to": g["to"],
+                        "missing": g["days"], "gaps": 1})
+    return out
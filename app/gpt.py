@@ -1,11 +1,14 @@
 # app/gpt.py
 import os
 from datetime import date
+from time import perf_counter
 
-try:
-    from openai import OpenAI
-except Exception:  # openai lib nemusí byť dostupná pri lokálnom teste
-    OpenAI = None
+from . import comment_cache
+from .metrics import OPENAI
+from .settings import OPENAI_MODEL
+
+# Zvýš pri každej zmene textu promptu – staré záznamy v comment_cache sa tým zneplatnia
+PROMPT_VERSION = 1
 
 def _fallback_comment(current_percent: float, delta: float | None, trend7: float, yoy_gap: float) -> str:
     d = "—" if delta is None else f"{delta:+.2f} p.b."
@@ -18,12 +21,35 @@ def _fallback_comment(current_percent: float, delta: float | None, trend7: float
         f"Vývoj zodpovedá sezóne; riziká: počasie, LNG prílevy, neplánované odstávky."
     )
 
+# Provenance pre komentáre vygenerované bez modelu
+FALLBACK_MODEL = "fallback"
+
 def generate_comment(current_percent: float, delta: float | None, trend7: float, yoy_gap: float) -> str:
-    """Vráti krátky komentár. Ak nie je OPENAI_API_KEY alebo model nedostupný, použije fallback."""
+    """
+    Vráti krátky komentár. Ak nie je OPENAI_API_KEY alebo model nedostupný, použije fallback.
+    Výsledky z modelu sa memoizujú v comment_cache (kľúč = zaokrúhlené vstupy + PROMPT_VERSION + model),
+    takže rovnaké vstupy nestoja ďalšie LLM volanie. Fallback sa necachuje.
+    """
+    return generate_comment_with_meta(current_percent, delta, trend7, yoy_gap)[0]
+
+def generate_comment_with_meta(current_percent: float, delta: float | None, trend7: float,
+                               yoy_gap: float) -> tuple[str, str, int | None]:
+    """Ako generate_comment, ale vráti aj provenance: (text, model, prompt_version)."""
+    fallback = (_fallback_comment(current_percent, delta, trend7, yoy_gap), FALLBACK_MODEL, None)
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or OpenAI is None:
-        return _fallback_comment(current_percent, delta, trend7, yoy_gap)
+    if not api_key:
+        return fallback
 
+    key = comment_cache.cache_key(current_percent, delta, trend7, yoy_gap, OPENAI_MODEL, PROMPT_VERSION)
+    cached = comment_cache.get(key)
+    if cached:
+        return cached, OPENAI_MODEL, PROMPT_VERSION
+
+    # SDK (~0,5 s importu) sa načíta až pri prvom volaní modelu, nie pri štarte aplikácie
+    try:
+        from openai import OpenAI
+    except Exception:  # openai lib nemusí byť dostupná pri lokálnom teste
+        return fallback
     client = OpenAI(api_key=api_key)
     prompt = (
         "Napíš 2–3 vety k situácii zásobníkov plynu v EÚ v slovenčine. "
@@ -32,12 +58,19 @@ def generate_comment(current_percent: float, delta: float | None, trend7: float,
         f"7-dňový trend: {trend7:+.2f} p.b., medziročný rozdiel vs. 2024: {yoy_gap:+.2f} p.b. "
         "Buď vecný, bez prehnaných varovaní; uveď kľúčové riziká (počasie, LNG, odstávky)."
     )
+    start = perf_counter()
     try:
         resp = client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=OPENAI_MODEL,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=200
         )
-        return resp.choices[0].message.content.strip()
+        text = resp.choices[0].message.content.strip()
     except Exception:
-        return _fallback_comment(current_percent, delta, trend7, yoy_gap)
+        OPENAI.labels(OPENAI_MODEL, "error").observe(perf_counter() - start)
+        return fallback
+    OPENAI.labels(OPENAI_MODEL, "ok").observe(perf_counter() - start)
+    if not text:
+        return fallback
+    comment_cache.put(key, text, OPENAI_MODEL, PROMPT_VERSION)
+    return text, OPENAI_MODEL, PROMPT_VERSION
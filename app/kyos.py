@@ -0,0 +1,138 @@
+# app/kyos.py
+"""
+Zdroj KYOS (gas.kyos.com) – EU naplnenie zásobníkov v %.
+
+1. Priamy HTTP fetch (KYOS_DATA_URL, inak HTML stránka KYOS_URL) cez zdieľanú pooled
+   session z app/agsi.py; JSON aj HTML sa parsujú bez prehliadača.
+2. Až keď to zlyhá, záložný headless Chromium: jeden dlhožijúci prehliadač + kontext
+   na proces (spúšťa sa lenivo, pri prvom použití), čaká na KYOS_SELECTOR namiesto
+   pevného sleepu. Sync Playwright je viazaný na vlákno, ktoré ho vytvorilo, preto
+   všetky volania idú cez jednovláknový executor.
+"""
+import atexit
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .settings import KYOS_DATA_URL, KYOS_SELECTOR, KYOS_TIMEOUT_MS, KYOS_URL
+
+_PERCENT_RE = re.compile(r"(\d{2,3}\.\d)\s?%")
+_JSON_KEYS = ("full", "fullness", "percentage", "percent")
+
+
+def extract_percent_from_html(html: str) -> float | None:
+    m = _PERCENT_RE.search(html)
+    if m:
+        return float(m.group(1))
+    return None
+
+
+def extract_percent_from_json(data) -> float | None:
+    """Prvá číselná hodnota pod kľúčom full/fullness/percentage/percent (do hĺbky)."""
+    if isinstance(data, dict):
+        for key in _JSON_KEYS:
+            v = data.get(key)
+            try:
+                if v is not None and not isinstance(v, (dict, list)):
+                    return float(v)
+            except (TypeError, ValueError):
+                pass
+        children = data.values()
+    elif isinstance(data, list):
+        children = data
+    else:
+        return None
+    for child in children:
+        v = extract_percent_from_json(child)
+        if v is not None:
+            return v
+    return None
+
+
+def fetch_percent_http(url: str | None = None, timeout: int = 15) -> float | None:
+    """Priamy HTTP fetch + parsovanie; None ak odpoveď neobsahuje hodnotu."""
+    from .agsi import _json, get_session
+
+    # GIE kľúč zo session hlavičiek sa tretej strane neposiela
+    r = get_session().get(url or KYOS_DATA_URL or KYOS_URL, headers={"x-key": None}, timeout=timeout)
+    r.raise_for_status()
+    if "json" in (r.headers.get("Content-Type") or ""):
+        return extract_percent_from_json(_json.loads(r.content))
+    return extract_percent_from_html(r.text)
+
+
+# --- záložný prehliadač ------------------------------------------------------
+
+_browser_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kyos-browser")
+_browser_state: dict = {}
+
+
+def _browser_context():
+    if "context" not in _browser_state:
+        from playwright.sync_api import sync_playwright
+
+        pw = sync_playwright().start()
+        browser = pw.chromium.launch(headless=True)
+        _browser_state.update(pw=pw, browser=browser, context=browser.new_context())
+    return _browser_state["context"]
+
+
+def _browser_fetch(url: str, selector: str, timeout_ms: int) -> str:
+    page = _browser_context().new_page()
+    try:
+        page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+        page.wait_for_selector(selector, timeout=timeout_ms)
+        return page.content()
+    finally:
+        page.close()
+
+
+def _browser_shutdown():
+    state = dict(_browser_state)
+    _browser_state.clear()
+    try:
+        if "browser" in state:
+            state["browser"].close()
+        if "pw" in state:
+            state["pw"].stop()
+    except Exception:
+        pass
+
+
+def fetch_percent_browser(url: str | None = None, selector: str | None = None,
+                          timeout_ms: int | None = None) -> float | None:
+    """Render cez zdieľaný prehliadač; po chybe sa prehliadač zahodí a pri ďalšom volaní spustí nanovo."""
+    args = (url or KYOS_URL, selector or KYOS_SELECTOR, timeout_ms or KYOS_TIMEOUT_MS)
+    try:
+        html = _browser_exec.submit(_browser_fetch, *args).result()
+    except Exception:
+        _browser_exec.submit(_browser_shutdown).result()
+        raise
+    return extract_percent_from_html(html)
+
+
+def close_browser():
+    """Zavrie zdieľaný prehliadač (ak beží)."""
+    if not _browser_state:
+        return
+    try:
+        _browser_exec.submit(_browser_shutdown).result()
+    except RuntimeError:  # executor je už pri ukončení interpretera zastavený
+        pass
+
+
+atexit.register(close_browser)
+
+
+def fetch_kyos_percent() -> float:
+    """Najprv HTTP, potom záložný prehliadač. Chyba, ak hodnotu nevráti ani jeden."""
+    try:
+        value = fetch_percent_http()
+        if value is not None:
+            return value
+        print("KYOS: HTTP odpoveď bez hodnoty, skúšam prehliadač")
+    except Exception as e:
+        print(f"KYOS: HTTP fetch zlyhal ({e}), skúšam prehliadač")
+    value = fetch_percent_browser()
+    if value is None:
+        raise RuntimeError("Nepodarilo sa extrahovať percento zo stránky KYOS.")
+    return value
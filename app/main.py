@@ -4,28 +4,33 @@ from __future__ import annotations
 import os
 import io
 import csv
+import json
+import asyncio
+import functools
+import contextvars
 import datetime as dt
 from datetime import timedelta as TD
 from typing import Optional
 from functools import lru_cache
 from time import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
-from fastapi import FastAPI, Query
+from fastapi import Body, FastAPI, Header, Query
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
-from jinja2 import Template
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from sqlalchemy import func, text, inspect
 from sqlalchemy.exc import SQLAlchemyError
 
-# Optional Excel support
-try:
-    import openpyxl  # type: ignore
-except Exception:
-    openpyxl = None
-
-from .database import SessionLocal, init_db
-from .models import GasStorageDaily
+from .database import ReadSessionLocal, SessionLocal, async_session, init_db, pool_status
+from .settings import BLOCKING_WORKERS, PROFILE_MAX_SECONDS
+from . import metrics as prom
+from . import profiler
+from .models import (EU_ENTITY_ID, AlertDelivery, AlertRule, CommentCache, GasStorageComment, GasStorageDaily,
+                     GasStorageMetrics, GasStorageEnvelope, GasStorageSourceValue, LngTerminalDaily, StorageEntity)
+from .entities import resolve_entity_id
+from .comments import get_comment, has_comment, save_comment
+from .seasonal import align as align_seasons
 
 # -----------------------------------------------------------------------------
 # JSON with explicit UTF-8 to avoid mojibake
@@ -36,11 +41,75 @@ class JSONUTF8Response(JSONResponse):
 
 app = FastAPI(title="Powergy Analytics – Alfa", default_response_class=JSONUTF8Response)
 app.add_middleware(GZipMiddleware, minimum_size=512)
+# posledný pridaný = vonkajší → latencia vrátane gzip
+app.add_middleware(prom.MetricsMiddleware)
+prom.instrument_sqlalchemy()
+if profiler.enabled():
+    # vonkajší – profil jedného requestu zahŕňa aj metriky a gzip
+    app.add_middleware(profiler.ProfileMiddleware)
+
+
+# Blokujúce endpointy (AGSI/ALSI/OpenAI, backfilly trvajúce minúty) bežia na vlastnom malom pool-e,
+# aby nezaberali threadpool, na ktorom FastAPI spúšťa sync read endpointy.
+_blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+
+def offload(fn):
+    """
+    Zabalí sync endpoint do async, ktorý ho spustí na _blocking_pool (signatúru FastAPI vidí cez __wrapped__).
+    Kontext (contextvars – počítadlo SQL requestu) sa prenesie do vlákna ako pri FastAPI threadpoole.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            _blocking_pool, functools.partial(ctx.run, fn, *args, **kwargs))
+    return wrapper
+
+
+async def run_read(fn, *args):
+    """
+    Spustí read helper fn(sess, *args) v AsyncSession (asyncpg). Ak URL async ovládač nemá
+    (napr. sqlite), beží ten istý helper nad ReadSessionLocal vo FastAPI threadpoole.
+    Chyba pri vytváraní engine je JSON 500 ako chyby v helperoch, nie holý traceback.
+    """
+    try:
+        asess = async_session()
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": "db_error", "detail": str(e)}, status_code=500)
+    if asess is None:
+        def _sync():
+            sess = ReadSessionLocal()
+            try:
+                return fn(sess, *args)
+            finally:
+                sess.close()
+        return await run_in_threadpool(_sync)
+    async with asess:
+        return await asess.run_sync(fn, *args)
 
 
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
+# Ťažké voliteľné závislosti (openpyxl ťahá numpy, jinja2 + kompilácia ~50 kB šablóny) sa
+# načítajú až pri prvom použití – studený štart (Render po nečinnosti) na nich nečaká.
+def _openpyxl():
+    """openpyxl pre export do Excelu, alebo None ak nie je nainštalovaný (export padne na CSV)."""
+    try:
+        import openpyxl  # type: ignore
+    except Exception:
+        return None
+    return openpyxl
+
+
+@lru_cache(maxsize=None)
+def _render_page(source: str) -> str:
+    """Skompiluje a vyrenderuje jinja šablónu stránky pri prvom requeste; výsledok je statický, drží sa v pamäti."""
+    from jinja2 import Template
+
+    return Template(source).render()
+
 def fix_mojibake(s: str) -> str:
     """Repair UTF-8 text that was decoded as Latin-1 (e.g., 'ZĂĄsobnĂ­ky')."""
     if not s:
@@ -85,6 +154,62 @@ def _format_date(date_obj) -> str:
     return str(date_obj)
 
 
+def _unknown_entity(entity: str):
+    return JSONUTF8Response({"ok": False, "error": "Unknown entity", "entity": entity}, status_code=404)
+
+
+_ENTITY_QUERY = Query("eu", description="Kód entity: eu | krajina (napr. DE) | EIC prevádzkovateľa/zásobníka")
+
+# Metriky vyberateľné cez ?metrics=: percent/delta z gas_storage_daily, zvyšok z gas_storage_metrics
+_DAILY_METRICS = ("percent", "delta")
+METRIC_NAMES = _DAILY_METRICS + tuple(
+    c.name for c in GasStorageMetrics.__table__.columns if c.name not in ("entity_id", "date")
+)
+_METRICS_QUERY = Query(None, description="Čiarkou oddelené metriky, napr. percent,injection,withdrawal")
+
+
+def _parse_metrics(metrics: str | None, default: tuple = ()) -> list[str]:
+    """'injection, withdrawal' → ['injection', 'withdrawal']; neznámy názov → ValueError."""
+    if not metrics:
+        return list(default)
+    names = [m.strip().lower() for m in metrics.split(",") if m.strip()]
+    unknown = [m for m in names if m not in METRIC_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def _metric_query(sess, entity_id: int, names):
+    """SELECT date + vybrané metriky; gas_storage_metrics sa pripojí len ak je treba."""
+    cols = [GasStorageDaily.date]
+    extra = False
+    for n in names:
+        if n in _DAILY_METRICS:
+            cols.append(getattr(GasStorageDaily, n))
+        else:
+            cols.append(getattr(GasStorageMetrics, n))
+            extra = True
+    q = sess.query(*cols).filter(GasStorageDaily.entity_id == entity_id)
+    if extra:
+        q = q.outerjoin(GasStorageMetrics, (GasStorageMetrics.entity_id == GasStorageDaily.entity_id)
+                        & (GasStorageMetrics.date == GasStorageDaily.date))
+    return q
+
+
+def _round_metric(name: str, value):
+    v = _to_float(value)
+    if v is None:
+        return None
+    return round(v, 2 if name in _DAILY_METRICS else 3)
+
+
+def _fmt_metric(name: str, value) -> str:
+    v = _round_metric(name, value)
+    if v is None:
+        return ""
+    return f"{v:.2f}" if name in _DAILY_METRICS else f"{v:.3f}"
+
+
 def _fallback_comment(percent: float, delta: Optional[float], yoy_gap: Optional[float]) -> str:
     d_text = "bez dennej zmeny" if (delta is None or abs(delta) < 0.005) else (
         f"denná zmena +{delta:.2f} p.b." if delta > 0 else f"denná zmena {delta:.2f} p.b."
@@ -99,31 +224,33 @@ def _fallback_comment(percent: float, delta: Optional[float], yoy_gap: Optional[
 
 # External generator (if present)
 try:
-    from .gpt import generate_comment as _generate_comment_inner  # type: ignore
+    from .gpt import generate_comment_with_meta as _generate_comment_inner  # type: ignore
 except Exception:
     _generate_comment_inner = None  # type: ignore
 
+_FALLBACK_MODEL = "fallback"
+
 
-def generate_comment_safe(percent: float, delta: Optional[float], yoy_gap: Optional[float], trend7: Optional[float] = None) -> str:
-    """Generate short comment; uses fallback if GPT not configured/failed."""
+def generate_comment_safe(percent: float, delta: Optional[float], yoy_gap: Optional[float], trend7: Optional[float] = None) -> tuple[str, str, Optional[int]]:
+    """Generate short comment; uses fallback if GPT not configured/failed. Returns (text, model, prompt_version)."""
     if _generate_comment_inner is None:
-        return _fallback_comment(percent, delta, yoy_gap or 0.0)
+        return _fallback_comment(percent, delta, yoy_gap or 0.0), _FALLBACK_MODEL, None
     try:
         # trend7 default je 0.0 ak nie je poskytnutý
         trend7_val = trend7 if trend7 is not None else 0.0
         yoy_gap_val = yoy_gap if yoy_gap is not None else 0.0
-        txt = _generate_comment_inner(percent, delta, trend7_val, yoy_gap_val)
+        txt, model, prompt_version = _generate_comment_inner(percent, delta, trend7_val, yoy_gap_val)
         if not txt or not str(txt).strip():
-            return _fallback_comment(percent, delta, yoy_gap_val)
-        return str(txt).strip()
+            return _fallback_comment(percent, delta, yoy_gap_val), _FALLBACK_MODEL, None
+        return str(txt).strip(), model, prompt_version
     except Exception:
-        return _fallback_comment(percent, delta, yoy_gap or 0.0)
+        return _fallback_comment(percent, delta, yoy_gap or 0.0), _FALLBACK_MODEL, None
 
 
 # -----------------------------------------------------------------------------
 # HTML (kept minimal; focuses on API correctness in this patch)
 # -----------------------------------------------------------------------------
-INDEX_HTML = Template("""<!doctype html>
+INDEX_HTML = """<!doctype html>
 <html lang="sk">
 <head>
 <meta charset="utf-8" />
@@ -544,7 +671,7 @@ tr:hover { background:#f9fafb; }
     });
 
     // Vypočítame min/max pre všetky roky
-    const allValues = [...cur, ...(ref.length?ref:[]), ...Object.values(yearsPercent).flat()];
+    const allValues = [...cur, ...(ref.length?ref:[]), ...Object.values(yearsPercent).flat()].filter(v => v !== null && v !== undefined);
     const max = Math.max(...allValues, -Infinity);
     const min = Math.min(...allValues, Infinity);
     const range = max - min;
@@ -600,9 +727,12 @@ tr:hover { background:#f9fafb; }
       if(dashed) g.setLineDash([6,6]);
       g.strokeStyle = color;
       g.beginPath();
+      // chýbajúce dni (null) prerušia čiaru
+      let started = false;
       data.forEach((v,i)=>{
+        if(v === null || v === undefined){ started = false; return; }
         const x = X(i,n), y = Y(v);
-        if(i===0) g.moveTo(x,y); else g.lineTo(x,y);
+        if(!started){ g.moveTo(x,y); started = true; } else g.lineTo(x,y);
       });
       g.stroke();
       g.restore();
@@ -833,7 +963,7 @@ tr:hover { background:#f9fafb; }
         vCur = cur[hoverIdx];
         // Použijeme rovnakú logiku ako pri kreslení čiar - len dáta do actualRecords.length
         const refActual = ref.length > 0 ? ref.slice(0, actualRecords.length) : [];
-        vPrev = refActual.length > hoverIdx ? refActual[hoverIdx] : null;
+        vPrev = refActual.length > hoverIdx && refActual[hoverIdx] !== undefined ? refActual[hoverIdx] : null;
         date = actualRecords[hoverIdx].date;
         isForecast = false;
         
@@ -848,7 +978,7 @@ tr:hover { background:#f9fafb; }
           if (yearsPercent[key] && yearsPercent[key].length > 0) {
             // Použijeme len dáta do actualRecords.length, rovnako ako pri kreslení čiar
             const yearData = yearsPercent[key].slice(0, actualRecords.length);
-            if (yearData.length > hoverIdx) {
+            if (yearData.length > hoverIdx && yearData[hoverIdx] !== null) {
               const yearNum = parseInt(key.replace('year_', ''));
               hoverYearValues[yearNum] = yearData[hoverIdx];
             }
@@ -1299,7 +1429,7 @@ tr:hover { background:#f9fafb; }
 </script>
 </body>
 </html>
-""")
+"""
 
 
 @app.on_event("startup")
@@ -1309,6 +1439,12 @@ def _startup():
     except Exception as e:
         print(f"Warning: Database initialization failed: {e}")
         # Pokračujeme aj keď init_db zlyhá - možno tabuľky už existujú
+    try:
+        # doručovanie webhookov, ktoré zostali v outboxe (retry, pád procesu, iné procesy)
+        from .alerts import wake
+        wake()
+    except Exception as e:
+        print(f"Warning: Alert delivery worker not started: {e}")
 
 
 # ---------------------------- Diagnostics ----------------------------
@@ -1362,15 +1498,22 @@ def api_db_tables():
 
 
 @app.get("/api/db-stats", response_class=JSONUTF8Response)
-def api_db_stats():
+def api_db_stats(entity: str = _ENTITY_QUERY):
     sess = SessionLocal()
     try:
-        total = sess.query(func.count(GasStorageDaily.id)).scalar() or 0
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        total = sess.query(func.count()).select_from(GasStorageDaily).scalar() or 0
+        entities = sess.query(func.count(StorageEntity.id)).scalar() or 0
         last = sess.query(GasStorageDaily.date, GasStorageDaily.percent)\
+                   .filter(GasStorageDaily.entity_id == entity_id)\
                    .order_by(GasStorageDaily.date.desc()).first()
         return {
             "ok": True,
             "rows": int(total),
+            "entities": int(entities),
+            "entity": entity,
             "last_date": (str(last[0]) if last else None),
             "last_percent": (float(last[1]) if last else None),
         }
@@ -1380,12 +1523,131 @@ def api_db_stats():
         sess.close()
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = prom.render()
+    return Response(content=body, media_type=content_type)
+
+
+def _profile_denied(token: str | None):
+    """None = povolené; inak odpoveď (404 ak je profilovanie vypnuté, aby endpoint nebolo vidno)."""
+    if not profiler.enabled():
+        return JSONUTF8Response({"ok": False, "error": "not found"}, status_code=404)
+    if not profiler.authorized(token):
+        return JSONUTF8Response({"ok": False, "error": "unauthorized"}, status_code=401)
+    return None
+
+
+@app.get("/api/_profile/cpu", include_in_schema=False)
+async def api_profile_cpu(seconds: float = Query(10, gt=0), interval_ms: float = Query(5, ge=1, le=1000),
+                    x_profile_token: str | None = Header(None)):
+    """
+    Sampling profil celého procesu na `seconds` sekúnd (všetky vlákna) ako collapsed stacky
+    pre flamegraph.pl / speedscope. Jeden request: ľubovoľný endpoint s hlavičkou X-Profile: 1.
+    """
+    denied = _profile_denied(x_profile_token)
+    if denied:
+        return denied
+    body, samples = await profiler.sample_for(min(seconds, PROFILE_MAX_SECONDS), interval_ms / 1000)
+    return Response(content=body, media_type="text/plain; charset=utf-8",
+                    headers={"X-Profile-Samples": str(samples)})
+
+
+@app.post("/api/_profile/memory", include_in_schema=False)
+def api_profile_memory_start(frames: int = Query(25, ge=1, le=100), x_profile_token: str | None = Header(None)):
+    """Zapne tracemalloc a uloží baseline snapshot (kým beží, alokácie sú pomalšie)."""
+    return _profile_denied(x_profile_token) or profiler.memory_start(frames)
+
+
+@app.get("/api/_profile/memory", include_in_schema=False)
+def api_profile_memory_diff(top: int = Query(30, ge=1, le=500),
+                            key: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+                            x_profile_token: str | None = Header(None)):
+    """Rast pamäte od baseline: top alokačné miesta podľa rozdielu veľkosti."""
+    denied = _profile_denied(x_profile_token)
+    if denied:
+        return denied
+    try:
+        return Response(content=profiler.memory_diff(top, key), media_type="text/plain; charset=utf-8")
+    except RuntimeError as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=409)
+
+
+@app.delete("/api/_profile/memory", include_in_schema=False)
+def api_profile_memory_stop(x_profile_token: str | None = Header(None)):
+    return _profile_denied(x_profile_token) or profiler.memory_stop()
+
+
+@app.get("/api/pool-stats", response_class=JSONUTF8Response)
+def api_pool_stats():
+    """Connection pooly (primary / read / async): obsadenosť, overflow, čakanie na spojenie, timeouty."""
+    return {"pools": pool_status()}
+
+
+@app.get("/api/entities", response_class=JSONUTF8Response)
+def api_entities(type: str | None = Query(None, description="eu | country | company | facility"),
+                 country: str | None = Query(None)):
+    """Zoznam entít (sérií), ktoré sa dajú použiť ako ?entity= v read endpointoch."""
+    sess = SessionLocal()
+    try:
+        q = sess.query(StorageEntity).order_by(StorageEntity.id)
+        if type:
+            q = q.filter(StorageEntity.type == type)
+        if country:
+            q = q.filter(func.upper(StorageEntity.country) == country.upper())
+        return {"ok": True, "entities": [
+            {"code": e.code, "type": e.type, "name": e.name, "country": e.country, "parent_id": e.parent_id, "id": e.id}
+            for e in q.all()
+        ]}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": "exception", "detail": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.api_route("/api/sync-entities", methods=["GET", "POST"], response_class=JSONUTF8Response)
+@offload
+def api_sync_entities(source: str = Query("agsi", description="agsi (zásobníky) | alsi (LNG terminály)")):
+    """Doplní storage_entity o krajiny, prevádzkovateľov a zásobníky / LNG terminály z GIE listingu."""
+    if not os.getenv("AGSI_API_KEY"):
+        return JSONUTF8Response({"ok": False, "error": "AGSI_API_KEY missing"}, status_code=400)
+    if source not in ("agsi", "alsi"):
+        return JSONUTF8Response({"ok": False, "error": "source must be agsi or alsi"}, status_code=400)
+    from . import agsi, alsi
+    from .entities import sync_entities
+    sess = SessionLocal()
+    try:
+        listing = agsi.fetch_listing() if source == "agsi" else alsi.fetch_listing()
+        result = sync_entities(sess, listing, source=source)
+        sess.commit()
+        return {"ok": True, **result}
+    except Exception as e:
+        sess.rollback()
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.get("/api/comment-cache", response_class=JSONUTF8Response)
+def api_comment_cache():
+    """Hit/miss metriky cache komentárov + počet záznamov v tabuľke comment_cache."""
+    from . import comment_cache
+    sess = SessionLocal()
+    try:
+        entries = sess.query(func.count(CommentCache.key)).scalar() or 0
+        return {"ok": True, "entries": int(entries), **comment_cache.stats()}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": "exception", "detail": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
 # ---------------------------- UI Root ----------------------------
 @app.get("/", response_class=HTMLResponse)
 def index():
-    return INDEX_HTML.render()
+    return _render_page(INDEX_HTML)
 
-LNG_HTML = Template("""<!doctype html>
+LNG_HTML = """<!doctype html>
 <html lang="sk">
 <head>
 <meta charset="utf-8" />
@@ -1394,32 +1656,222 @@ LNG_HTML = Template("""<!doctype html>
 <style>
  body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial; margin: 24px; color:#0b1221; }
  .row { display:flex; gap:12px; align-items:center; justify-content:space-between; margin-bottom:10px; }
- button { padding:8px 10px; border-radius:10px; border:1px solid #e5e7eb; background:#fff; cursor:pointer; }
+ .toolbar { display:flex; gap:8px; align-items:center; }
+ .card { border:1px solid #e5e7eb; border-radius:16px; padding:16px; box-shadow: 0 2px 10px rgba(0,0,0,.04); }
+ .legend { display:flex; gap:16px; margin-bottom:8px; font-size:12px; }
+ .legend-item { display:flex; align-items:center; gap:6px; }
+ .legend-line { width:20px; height:2px; }
+ .muted { color:#6b7280; }
+ canvas { width: 100%; max-width: 980px; height: 320px; }
+ button, select { padding:8px 10px; border-radius:10px; border:1px solid #e5e7eb; background:#fff; cursor:pointer; }
  button:hover { background:#f9fafb; }
 </style>
 </head>
 <body>
   <div class="row">
     <h1>LNG</h1>
-    <div>
+    <div class="toolbar">
+      <select id="rangeSel">
+        <option value="30">30 dní</option>
+        <option value="90" selected>90 dní</option>
+        <option value="365">365 dní</option>
+      </select>
       <button onclick="window.location.href='/'">Späť na hlavnú stránku</button>
     </div>
   </div>
+  <div class="card">
+    <h3>EU LNG terminály – zásoba a send-out</h3>
+    <div class="legend">
+      <div class="legend-item"><div class="legend-line" style="background:#2563eb"></div>Zásoba (GWh)</div>
+      <div class="legend-item"><div class="legend-line" style="background:#f59e0b"></div>Send-out (GWh/d)</div>
+      <div class="legend-item"><div class="legend-line" style="background:#9ca3af"></div>DTRS (GWh/d)</div>
+    </div>
+    <canvas id="chart"></canvas>
+    <div id="msg" class="muted"></div>
+  </div>
+<script>
+(function(){
+  const chartEl = document.getElementById('chart');
+  const rangeEl = document.getElementById('rangeSel');
+  function showMsg(t){ document.getElementById('msg').textContent = t || ''; }
+
+  function draw(records){
+    const cssW = chartEl.clientWidth || 980, cssH = 320, dpi = window.devicePixelRatio || 1;
+    chartEl.width = Math.round(cssW*dpi); chartEl.height = Math.round(cssH*dpi);
+    chartEl.style.width = cssW+'px'; chartEl.style.height = cssH+'px';
+    const g = chartEl.getContext('2d');
+    g.setTransform(dpi,0,0,dpi,0,0);
+    g.clearRect(0,0,cssW,cssH);
+    if(!records.length){ showMsg('Žiadne LNG dáta'); return; }
+    showMsg('');
+
+    const left=60, right=60, top=20, bottom=40, W=cssW, H=cssH, n=records.length;
+    const X = i => left + i*((W-left-right)/Math.max(1,n-1));
+    const inv = records.map(r=>r.inventory_gwh);
+    const flow = [...records.map(r=>r.send_out), ...records.map(r=>r.dtrs)].filter(v=>v!==null);
+    const invVals = inv.filter(v=>v!==null);
+    const scale = (vals) => {
+      const mn = Math.min(...vals, Infinity), mx = Math.max(...vals, -Infinity);
+      const pad = (mx-mn)*0.1 || 1;
+      return [Math.max(0, mn-pad), mx+pad];
+    };
+    const [iMin,iMax] = scale(invVals), [fMin,fMax] = scale(flow);
+    const Yi = v => top + (H-top-bottom)*(1-(v-iMin)/Math.max(1e-9,iMax-iMin));
+    const Yf = v => top + (H-top-bottom)*(1-(v-fMin)/Math.max(1e-9,fMax-fMin));
+
+    g.font = "11px system-ui, -apple-system, Segoe UI, Roboto, Arial";
+    g.strokeStyle = "#e5e7eb"; g.fillStyle = "#6b7280"; g.lineWidth = 1;
+    for(let i=0;i<=5;i++){
+      const y = top + (H-top-bottom)*(i/5);
+      g.beginPath(); g.moveTo(left,y); g.lineTo(W-right,y); g.stroke();
+      g.textAlign = "right"; g.fillText((iMax-(iMax-iMin)*i/5).toFixed(0), left-6, y+3);
+      g.textAlign = "left"; g.fillText((fMax-(fMax-fMin)*i/5).toFixed(0), W-right+6, y+3);
+    }
+    g.textAlign = "center";
+    const step = Math.max(1, Math.floor(n/8));
+    for(let i=0;i<n;i+=step){ g.fillText(records[i].date.slice(0,5), X(i), H-bottom+16); }
+
+    function line(vals, Y, color){
+      g.save(); g.strokeStyle = color; g.lineWidth = 2; g.beginPath();
+      let started = false;
+      vals.forEach((v,i)=>{
+        if(v===null){ started = false; return; }
+        if(!started){ g.moveTo(X(i),Y(v)); started = true; } else g.lineTo(X(i),Y(v));
+      });
+      g.stroke(); g.restore();
+    }
+    line(records.map(r=>r.dtrs), Yf, '#9ca3af');
+    line(records.map(r=>r.send_out), Yf, '#f59e0b');
+    line(inv, Yi, '#2563eb');
+  }
+
+  async function load(days){
+    showMsg('Načítavam…');
+    try {
+      const r = await fetch(`/api/lng/history?days=${encodeURIComponent(days)}`);
+      const j = await r.json();
+      if(!r.ok){ showMsg(j.error || 'Chyba pri načítaní'); return; }
+      draw(j.records || []);
+    } catch(e){ showMsg('Chyba pri načítaní: ' + e); }
+  }
+  rangeEl.addEventListener('change', ()=> load(Number(rangeEl.value || 90)));
+  window.addEventListener('resize', ()=> load(Number(rangeEl.value || 90)));
+  load(Number(rangeEl.value || 90));
+})();
+</script>
 </body>
 </html>
-""")
+"""
 
 @app.get("/lng", response_class=HTMLResponse)
 def lng_page():
-    return LNG_HTML.render()
+    return _render_page(LNG_HTML)
+
+
+# Cache pre LNG históriu – ALSI sa mení raz denne, preto dlhšie TTL než _history_cache
+_lng_cache = {}
+_lng_cache_ttl = 300  # sekúnd
+
+@app.get("/api/lng/history", response_class=JSONUTF8Response)
+async def api_lng_history(days: int = 90, entity: str = _ENTITY_QUERY):
+    """Denné ALSI dáta (zásoba, send-out, DTMI/DTRS) pre EU, krajinu alebo terminál."""
+    try:
+        days = int(days)
+    except Exception:
+        days = 90
+    if days <= 0 or days > 366 * 5:
+        days = 90
+
+    cache_key = f"lng_{(entity or 'eu').lower()}_{days}"
+    now = time()
+    if cache_key in _lng_cache:
+        cached_data, cached_time = _lng_cache[cache_key]
+        if now - cached_time < _lng_cache_ttl:
+            prom.cache_hit("lng", True)
+            resp = JSONUTF8Response(cached_data)
+            resp.headers["Cache-Control"] = f"public, max-age={_lng_cache_ttl}"
+            return resp
+    prom.cache_hit("lng", False)
+
+    return await run_read(_lng_history, entity, days, cache_key, now)
+
+
+def _lng_history(sess, entity: str, days: int, cache_key: str, now: float):
+    from .alsi import LNG_FIELDS
+    try:
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        cols = [getattr(LngTerminalDaily, n) for n in LNG_FIELDS]
+        rows = (sess.query(LngTerminalDaily.date, *cols)
+                .filter(LngTerminalDaily.entity_id == entity_id)
+                .order_by(LngTerminalDaily.date.desc())
+                .limit(days)
+                .all())
+        records = [{
+            "date": _format_date(r.date),
+            **{n: (None if getattr(r, n) is None else round(float(getattr(r, n)), 2)) for n in LNG_FIELDS},
+        } for r in reversed(rows)]
+        result_data = {"entity": entity, "records": records}
+        _lng_cache[cache_key] = (result_data, now)
+        resp = JSONUTF8Response(result_data)
+        resp.headers["Cache-Control"] = f"public, max-age={_lng_cache_ttl}"
+        return resp
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+
+
+@app.api_route("/api/backfill-alsi", methods=["GET", "POST"], response_class=JSONUTF8Response)
+@offload
+def api_backfill_alsi(from_date: str | None = Query(None, description="YYYY-MM-DD; ak chýba, pokračuje od posledného dňa v DB alebo 2021-01-01"),
+                      entity: str | None = Query(None, description="Kód entity; ak chýba, všetky LNG entity")):
+    """Stiahne ALSI dáta LNG terminálov po včerajšok a uloží ich do lng_terminal_daily."""
+    if not os.getenv("AGSI_API_KEY"):
+        return JSONUTF8Response({"ok": False, "error": "AGSI_API_KEY missing"}, status_code=400)
+
+    sess = SessionLocal()
+    try:
+        max_date = dt.date.today() - dt.timedelta(days=1)
+        if from_date:
+            start_date = from_date
+        else:
+            last = (sess.query(func.max(LngTerminalDaily.date))
+                    .filter(LngTerminalDaily.entity_id == EU_ENTITY_ID).scalar())
+            start_date = str(last + dt.timedelta(days=1)) if last else "2021-01-01"
+            if last and last >= max_date:
+                return {"ok": True, "message": "LNG data up to date", "latest_date": str(last)}
+
+        from .scraper import backfill_alsi
+        result = backfill_alsi(start_date, entity=entity)
+        _lng_cache.clear()
+        return {"ok": True, "from_date": start_date, "max_available_date": str(max_date), **result}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
 
 
 # ---------------------------- Core API ----------------------------
 @app.get("/api/today", response_class=JSONUTF8Response)
-def api_today():
-    sess = SessionLocal()
+async def api_today(entity: str = _ENTITY_QUERY):
+    return await run_read(_today, entity)
+
+
+def _today(sess, entity: str):
     try:
-        row = sess.query(GasStorageDaily).order_by(GasStorageDaily.date.desc()).first()
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        # komentáre existujú len pre EU agregát
+        row = (
+            sess.query(GasStorageDaily.date, GasStorageDaily.percent, GasStorageDaily.delta,
+                       GasStorageComment.comment)
+            .outerjoin(GasStorageComment, (GasStorageComment.date == GasStorageDaily.date)
+                       & (GasStorageDaily.entity_id == EU_ENTITY_ID))
+            .filter(GasStorageDaily.entity_id == entity_id)
+            .order_by(GasStorageDaily.date.desc())
+            .first()
+        )
         if not row:
             return JSONUTF8Response({"message": "No data yet"}, status_code=404)
 
@@ -1436,8 +1888,6 @@ def api_today():
     except SQLAlchemyError as e:
         sess.rollback()
         return JSONUTF8Response({"ok": False, "error": "db_error", "detail": str(e)}, status_code=500)
-    finally:
-        sess.close()
 
 
 # Jednoduchý in-memory cache pre history endpoint
@@ -1445,28 +1895,43 @@ _history_cache = {}
 _cache_ttl = 30  # sekúnd
 
 @app.get("/api/history", response_class=JSONUTF8Response)
-def api_history(days: int = 30):
+async def api_history(days: int = 30, entity: str = _ENTITY_QUERY, metrics: str | None = _METRICS_QUERY,
+                      years: int = Query(4, ge=1, le=10, description="Počet predchádzajúcich rokov v sezónnom porovnaní")):
     try:
         days = int(days)
     except Exception:
         days = 30
     if days <= 0 or days > 366:
         days = 30
+    try:
+        # percent/delta sú v records vždy (graf, štatistiky); ?metrics= pridá ďalšie stĺpce
+        extra_metrics = [m for m in _parse_metrics(metrics) if m not in _DAILY_METRICS]
+    except ValueError as e:
+        return JSONUTF8Response({"ok": False, "error": str(e), "available": list(METRIC_NAMES)}, status_code=400)
 
     # Skontrolujeme cache
-    cache_key = f"history_{days}"
+    cache_key = f"history_{(entity or 'eu').lower()}_{days}_{years}_{','.join(extra_metrics)}"
     now = time()
     if cache_key in _history_cache:
         cached_data, cached_time = _history_cache[cache_key]
         if now - cached_time < _cache_ttl:
+            prom.cache_hit("history", True)
             resp = JSONUTF8Response(cached_data)
             resp.headers["Cache-Control"] = "public, max-age=30"
             return resp
+    prom.cache_hit("history", False)
 
-    sess = SessionLocal()
+    return await run_read(_history, entity, days, years, extra_metrics, cache_key, now)
+
+
+def _history(sess, entity: str, days: int, years: int, extra_metrics: list[str], cache_key: str, now: float):
     try:
-        # Optimalizácia: načítame len potrebné stĺpce
-        q = sess.query(GasStorageDaily.date, GasStorageDaily.percent, GasStorageDaily.delta).order_by(GasStorageDaily.date.desc()).limit(days)
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        # Optimalizácia: načítame len potrebné stĺpce (index-only scan cez covering PK)
+        q = (_metric_query(sess, entity_id, [*_DAILY_METRICS, *extra_metrics])
+             .order_by(GasStorageDaily.date.desc()).limit(days))
         rows = list(reversed(q.all()))  # Zoradené od najstaršieho po najnovší (pre graf)
 
         if not rows:
@@ -1478,6 +1943,7 @@ def api_history(days: int = 30):
             "date": _format_date(r.date),
             "percent": round(float(_to_float(r.percent)), 2),
             "delta": None if r.delta is None else round(float(_to_float(r.delta)), 2),
+            **{m: _round_metric(m, getattr(r, m)) for m in extra_metrics},
         } for r in rows]
 
         # Zistíme posledný dátum v DB (nie dnes, ale posledný dostupný dátum z AGSI)
@@ -1501,105 +1967,24 @@ def api_history(days: int = 30):
         last_date = rows[-1].date
         # Koniec mesiaca - deň 0 nasledujúceho mesiaca
         end_of_month = dt.date(last_date.year, last_date.month + 1, 1) - TD(days=1) if last_date.month < 12 else dt.date(last_date.year + 1, 1, 1) - TD(days=1)
-        
-        # Optimalizácia: jeden dotaz pre predchádzajúci rok
-        start_prev = rows[0].date - TD(days=365)
-        # Rozšírime až do konca mesiaca v predchádzajúcom roku
-        end_prev = end_of_month - TD(days=365)
 
-        prev_rows = (
-            sess.query(GasStorageDaily.date, GasStorageDaily.percent)
-            .filter(GasStorageDaily.date >= start_prev,
-                    GasStorageDaily.date <= end_prev)
-            .all()
-        )
-        by_date = {p.date: p for p in prev_rows}
+        # Sezónne porovnanie: os = dni v records + zvyšok mesiaca (pre predpoveď), každý predchádzajúci
+        # rok zarovnaný na ten istý deň plynárenského roka (app/seasonal.py) – jeden dotaz pre všetky roky.
+        # Chýbajúce dni sú null (graf ich preskočí), nič sa nedopĺňa.
+        axis = [r.date for r in rows] + [last_date + TD(days=i) for i in range(1, (end_of_month - last_date).days + 1)]
+        aligned = align_seasons(sess, entity_id, axis, range(1, years + 1))
 
-        baseline = records[0]["percent"]
-        prev_year = []
-        # Najprv dátumy z aktuálnych dát
-        for r in rows:
-            key = r.date - TD(days=365)
-            pr = by_date.get(key)
-            if pr:
-                prev_year.append({"date": _format_date(pr.date), "percent": round(float(_to_float(pr.percent)), 2)})
-            else:
-                prev_year.append({"date": _format_date(key), "percent": baseline})
-        
-        # Pridáme dátumy až do konca mesiaca (ak existujú dáta)
-        if rows:
-            last_prev_date = rows[-1].date - TD(days=365)
-            current_date = last_prev_date + TD(days=1)
-            while current_date <= end_prev:
-                pr = by_date.get(current_date)
-                if pr:
-                    prev_year.append({"date": _format_date(current_date), "percent": round(float(_to_float(pr.percent)), 2)})
-                # Ak nie sú dáta, nepridávame (necháme to prázdne)
-                current_date += TD(days=1)
-
-        # Sezónne porovnanie - pridať dáta pre predchádzajúce roky (2023, 2022, atď.)
-        # Optimalizácia: namiesto N*M dotazov (N=dni, M=roky), urobíme M dotazov
+        def _year_rows(pairs):
+            return [{"date": _format_date(d) if d else None,
+                     "percent": None if v is None else round(float(_to_float(v)), 2)} for d, v in pairs]
+
+        prev_year = _year_rows(aligned[1])
+        current_year = rows[0].date.year
         years_data = {}
-        if rows:
-            current_year = rows[0].date.year
-            baseline = records[0]["percent"]
-            
-            # Vypočítame všetky dátumy, ktoré potrebujeme pre každý rok
-            for year_offset in range(2, 5):  # 2023, 2022, 2021
-                year_key = f"year_{current_year - year_offset}"
-                # Vytvoríme zoznam dátumov pre tento rok (z aktuálnych dát)
-                target_dates = [r.date - TD(days=365 * year_offset) for r in rows]
-                
-                # Pridáme dátumy až do konca mesiaca v predchádzajúcom roku
-                # Vypočítame koniec mesiaca v predchádzajúcom roku
-                prev_year_end_of_month = end_of_month - TD(days=365 * year_offset)
-                # Pridáme dátumy od posledného dátumu v target_dates až do konca mesiaca
-                if target_dates:
-                    last_target_date = max(target_dates)
-                    # Pridáme dátumy od ďalšieho dňa po last_target_date až do prev_year_end_of_month
-                    current_date = last_target_date + TD(days=1)
-                    while current_date <= prev_year_end_of_month:
-                        target_dates.append(current_date)
-                        current_date += TD(days=1)
-                
-                if not target_dates:
-                    continue
-                
-                # Jeden dotaz pre všetky dátumy tohto roka - optimalizácia: načítame len potrebné stĺpce
-                min_date = min(target_dates)
-                max_date = max(target_dates)
-                prev_rows_year_all = (
-                    sess.query(GasStorageDaily.date, GasStorageDaily.percent)
-                    .filter(GasStorageDaily.date >= min_date,
-                            GasStorageDaily.date <= max_date)
-                    .all()
-                )
-                # Vytvoríme mapu dátum -> percent
-                by_date_year = {p.date: p for p in prev_rows_year_all}
-                
-                # Zostavíme výsledok - najprv dátumy z aktuálnych dát
-                year_rows = []
-                for r in rows:
-                    key = r.date - TD(days=365 * year_offset)
-                    pr = by_date_year.get(key)
-                    if pr:
-                        year_rows.append({"date": _format_date(key), "percent": round(float(_to_float(pr.percent)), 2)})
-                    else:
-                        year_rows.append({"date": _format_date(key), "percent": baseline})
-                
-                # Pridáme dátumy až do konca mesiaca (ak existujú dáta)
-                if target_dates:
-                    last_target_date = max([r.date - TD(days=365 * year_offset) for r in rows])
-                    current_date = last_target_date + TD(days=1)
-                    while current_date <= prev_year_end_of_month:
-                        pr = by_date_year.get(current_date)
-                        if pr:
-                            year_rows.append({"date": _format_date(current_date), "percent": round(float(_to_float(pr.percent)), 2)})
-                        # Ak nie sú dáta, nepridávame (necháme to prázdne)
-                        current_date += TD(days=1)
-                
-                if year_rows:
-                    years_data[year_key] = year_rows
+        for year_offset in range(2, years + 1):
+            year_rows = _year_rows(aligned[year_offset])
+            if any(r["percent"] is not None for r in year_rows):
+                years_data[f"year_{current_year - year_offset}"] = year_rows
 
         result_data = {"records": records, "prev_year": prev_year, "stats": stats, "years_data": years_data, "today": today_str}
         
@@ -1612,59 +1997,521 @@ def api_history(days: int = 30):
 
     except Exception as e:
         return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+
+
+# Obálka sa mení len pri backfille/restatemente starších rokov → dlhá cache
+_envelope_cache = {}
+_envelope_cache_ttl = 3600  # sekúnd
+
+@app.get("/api/seasonal-envelope", response_class=JSONUTF8Response)
+async def api_seasonal_envelope(entity: str = _ENTITY_QUERY,
+                                gas_year: int | None = Query(None, description="Rok začiatku plynárenského roka (1. 10.); default aktuálny")):
+    """
+    Min/max/priemer a percentilové pásma (p10–p90) z predchádzajúcich 5 plynárenských rokov
+    pre každý deň plynárenského roka – z materializovanej tabuľky gas_storage_envelope.
+    """
+    from .seasonal import gas_day_index
+    if gas_year is None:
+        gas_year = gas_day_index(dt.date.today())[0]
+
+    cache_key = f"envelope_{(entity or 'eu').lower()}_{gas_year}"
+    now = time()
+    cached = _envelope_cache.get(cache_key)
+    prom.cache_hit("envelope", bool(cached and now - cached[1] < _envelope_cache_ttl))
+    if cached and now - cached[1] < _envelope_cache_ttl:
+        result_data = cached[0]
+    else:
+        result_data = await run_read(_seasonal_envelope, entity, gas_year)
+        if isinstance(result_data, Response):
+            return result_data
+        _envelope_cache[cache_key] = (result_data, now)
+
+    resp = JSONUTF8Response(result_data)
+    resp.headers["Cache-Control"] = "public, max-age=3600, stale-while-revalidate=86400"
+    return resp
+
+
+def _seasonal_envelope(sess, entity: str, gas_year: int):
+    from .seasonal import ENVELOPE_YEARS, date_for
+    try:
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        rows = (sess.query(GasStorageEnvelope)
+                .filter(GasStorageEnvelope.entity_id == entity_id, GasStorageEnvelope.gas_year == gas_year)
+                .order_by(GasStorageEnvelope.day_index)
+                .all())
+        r2 = lambda v: None if v is None else round(float(v), 2)
+        days = []
+        for r in rows:
+            d = date_for(gas_year, r.day_index)
+            days.append({
+                "day_index": r.day_index,
+                "date": _format_date(d) if d else None,
+                "n": r.n,
+                **{k: r2(getattr(r, k)) for k in ("min", "max", "mean", "p10", "p25", "p50", "p75", "p90")},
+            })
+        return {"entity": entity, "gas_year": gas_year,
+                "years": [gas_year - k for k in range(ENVELOPE_YEARS, 0, -1)], "days": days}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+
+
+@app.get("/api/matrix")
+def api_matrix(entity: str = _ENTITY_QUERY,
+               fmt: str = Query("json", description="json | bin (float32 little-endian, row-major) | npy"),
+               metric: str = Query("percent", description="percent | delta"),
+               year: str = Query("calendar", description="calendar | gas (plynárenský rok od 1. 10.)")):
+    """Celá história ako matica roky × 366 (float32, NaN/null = chýbajúci deň) – heatmapa, notebooky."""
+    from . import matrix
+    if fmt not in ("json", "bin", "npy") or year not in ("calendar", "gas"):
+        return JSONUTF8Response({"ok": False, "error": "fmt must be json|bin|npy, year calendar|gas"}, status_code=400)
+
+    sess = SessionLocal()
+    try:
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        years, data = matrix.build(sess, entity_id, metric, gas_year=(year == "gas"))
+    except ValueError as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=400)
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
     finally:
         sess.close()
 
+    if fmt == "json":
+        resp = JSONUTF8Response({"entity": entity, "metric": metric, "year": year, "years": years,
+                                 "days": matrix.DAYS, "values": matrix.to_json_rows(data, len(years))})
+    else:
+        body = matrix.to_npy(data, len(years)) if fmt == "npy" else matrix.to_le_bytes(data)
+        name = f"matrix_{(entity or 'eu').lower()}_{metric}.{fmt}"
+        resp = Response(content=body, media_type="application/octet-stream", headers={
+            "Content-Disposition": f'attachment; filename="{name}"',
+            "X-Matrix-Shape": f"{len(years)},{matrix.DAYS}",
+            "X-Matrix-Years": ",".join(map(str, years)),
+            "X-Matrix-Dtype": "<f4",
+        })
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    return resp
+
+
+# Kĺzavé štatistiky sa počítajú cez celú sériu; cache platí, kým sa nezmení verzia dát
+# (revisions.data_version) – žiadny TTL, po zápise sa prepočíta pri najbližšom requeste.
+_rolling_cache = {}
+_ROLLING_CACHE_MAX = 64
+
+@app.get("/api/rolling", response_class=JSONUTF8Response)
+def api_rolling(window: str = Query("7,30,90", description="Okná v dňoch, čiarkou oddelené (1–1830)"),
+                metric: str = Query("percent", description="percent | delta"),
+                days: int | None = Query(None, description="Vráti len posledných N dní (výpočet je vždy cez celú sériu)"),
+                entity: str = _ENTITY_QUERY):
+    """Kĺzavý priemer/min/max pre každé okno, stĺpcovo: {"dates": [...], "windows": {"7": {"mean": [...], ...}}}."""
+    from . import rolling
+    from .revisions import data_version
+    try:
+        windows = sorted({int(w) for w in window.split(",") if w.strip()})
+    except ValueError:
+        windows = []
+    if not windows or windows[0] < 1 or windows[-1] > 1830 or len(windows) > 8:
+        return JSONUTF8Response({"ok": False, "error": "window must be 1-8 integers in 1..1830"}, status_code=400)
+    if metric not in ("percent", "delta"):
+        return JSONUTF8Response({"ok": False, "error": "metric must be percent|delta"}, status_code=400)
 
-@app.get("/api/export", response_class=StreamingResponse)
-def api_export(fmt: str = "csv", days: int = 30):
+    sess = SessionLocal()
+    try:
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        version = data_version(sess, entity_id)
+        cache_key = (entity_id, metric, tuple(windows))
+        cached = _rolling_cache.get(cache_key)
+        if cached and cached[0] == version:
+            result = cached[1]
+        else:
+            col = getattr(GasStorageDaily, metric)
+            rows = (
+                sess.query(GasStorageDaily.date, col)
+                .filter(GasStorageDaily.entity_id == entity_id, col.isnot(None))
+                .order_by(GasStorageDaily.date.asc())
+                .all()
+            )
+            dates = [r[0] for r in rows]
+            values = [float(r[1]) for r in rows]
+            result = {"dates": [_format_date(d) for d in dates],
+                      "windows": rolling.rolling_many(dates, values, windows)}
+            if len(_rolling_cache) >= _ROLLING_CACHE_MAX:
+                _rolling_cache.clear()
+            _rolling_cache[cache_key] = (version, result)
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+    start = -days if days and days > 0 else 0
+    return {
+        "entity": entity, "metric": metric, "version": version,
+        "dates": result["dates"][start:],
+        "windows": {w: {k: col[start:] for k, col in stats.items()} for w, stats in result["windows"].items()},
+    }
+
+
+_forecast_cache = {}
+
+@app.get("/api/forecast", response_class=JSONUTF8Response)
+def api_forecast(entity: str = _ENTITY_QUERY,
+                 paths: int = Query(5000, description="Počet Monte Carlo ciest (100–50000)"),
+                 years: int = Query(10, description="Koľko minulých rokov použiť ako profil (1–15)"),
+                 target: float = Query(90.0, description="Cieľové naplnenie v % k 1. 11.")):
+    """Monte Carlo predpoveď naplnenia k 1. novembru: percentilové pásma po dňoch + P(dosiahne cieľ)."""
+    from . import forecast
+    from .revisions import data_version
+    paths = max(100, min(int(paths), 50000))
+    years = max(1, min(int(years), 15))
+
+    sess = SessionLocal()
+    try:
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        version = data_version(sess, entity_id)
+        cache_key = (entity_id, paths, years, target)
+        cached = _forecast_cache.get(cache_key)
+        if cached and cached[0] == version:
+            result = cached[1]
+        else:
+            t0 = time()
+            result = forecast.forecast(sess, entity_id, n_paths=paths, max_years=years, target_pct=target)
+            if result is None:
+                return JSONUTF8Response({"ok": False, "error": "no data"}, status_code=404)
+            result["elapsed_ms"] = round((time() - t0) * 1000, 1)
+            if result["bands"]:
+                result["bands"]["dates"] = [_format_date(d) for d in result["bands"]["dates"]]
+            result["as_of"] = _format_date(result["as_of"])
+            result["target_date"] = _format_date(result["target_date"])
+            if len(_forecast_cache) >= 32:
+                _forecast_cache.clear()
+            _forecast_cache[cache_key] = (version, result)
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+    return {"entity": entity, "version": version, **result}
+
+
+_simulate_cache = {}
+
+@app.post("/api/simulate", response_class=JSONUTF8Response)
+def api_simulate(payload: dict = Body(..., examples=[{
+        "scenarios": [{"name": "slabé vtláčanie", "default": 0.8, "multipliers": {"DE": 0.6}}],
+        "until": "2026-11-01", "types": ["eu", "country"], "target": 90, "paths": False}])):
+    """
+    Batch what-if scenárov: násobitelia 5-ročného priemerného tempa vtláčania/ťažby po entitách.
+    Všetky scenáre × entity × dni sa počítajú naraz; základ sa cachuje podľa verzie dát.
+    """
+    from . import simulate
+    from .forecast import target_date
+    from .revisions import data_version
+
+    scenarios = payload.get("scenarios") or [{"name": "baseline"}]
+    if not isinstance(scenarios, list) or len(scenarios) > simulate.MAX_SCENARIOS:
+        return JSONUTF8Response({"ok": False, "error": f"scenarios must be a list of at most {simulate.MAX_SCENARIOS}"}, status_code=400)
+    types = tuple(payload.get("types") or simulate.DEFAULT_TYPES)
+    try:
+        target = float(payload.get("target", 90.0))
+        until = dt.date.fromisoformat(payload["until"]) if payload.get("until") else None
+    except (TypeError, ValueError):
+        return JSONUTF8Response({"ok": False, "error": "until must be YYYY-MM-DD, target a number"}, status_code=400)
+
+    sess = SessionLocal()
+    try:
+        t0 = time()
+        as_of = sess.query(func.max(GasStorageDaily.date)).filter(GasStorageDaily.entity_id == EU_ENTITY_ID).scalar()
+        if as_of is None:
+            return JSONUTF8Response({"ok": False, "error": "no data"}, status_code=404)
+        until = until or target_date(as_of)
+        if not (as_of < until <= as_of + TD(days=366)):
+            return JSONUTF8Response({"ok": False, "error": "until must be within a year after the last data day"}, status_code=400)
+        version = data_version(sess)
+        cache_key = (as_of, until, types)
+        cached = _simulate_cache.get(cache_key)
+        if cached and cached[0] == version:
+            baseline = cached[1]
+        else:
+            baseline = simulate.load_baseline(sess, as_of, until, types)
+            if len(_simulate_cache) >= 16:
+                _simulate_cache.clear()
+            _simulate_cache[cache_key] = (version, baseline)
+        results = simulate.run(baseline, scenarios, target_pct=target, with_paths=bool(payload.get("paths")))
+    except ValueError as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=400)
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+    for sc in results:
+        for item in sc["entities"].values():
+            item["hit_date"] = _format_date(item["hit_date"]) if item["hit_date"] else None
+    return {
+        "ok": True,
+        "as_of": _format_date(as_of),
+        "until": _format_date(until),
+        "target": target,
+        "dates": [_format_date(d) for d in baseline["dates"]] if payload.get("paths") else None,
+        "scenarios": results,
+        "elapsed_ms": round((time() - t0) * 1000, 1),
+    }
+
+
+def _parse_as_of(value: str) -> dt.datetime:
+    """'YYYY-MM-DD' (koniec dňa) alebo 'YYYY-MM-DDTHH:MM[:SS]' v UTC."""
+    if len(value) == 10:
+        return dt.datetime.combine(dt.date.fromisoformat(value), dt.time.max)
+    return dt.datetime.fromisoformat(value)
+
+
+@app.get("/api/history/as-of", response_class=JSONUTF8Response)
+def api_history_as_of(as_of: str = Query(..., description="YYYY-MM-DD alebo YYYY-MM-DDTHH:MM (UTC)"),
+                      days: int = 30, entity: str = _ENTITY_QUERY):
+    """Séria tak, ako ju dashboard poznal v čase as_of, + dni, ktoré AGSI odvtedy opravilo."""
+    from .revisions import as_of_series
+    try:
+        when = _parse_as_of(as_of)
+    except ValueError:
+        return JSONUTF8Response({"ok": False, "error": "as_of must be YYYY-MM-DD or YYYY-MM-DDTHH:MM"}, status_code=400)
+    days = max(1, min(int(days or 30), 366 * 5))
+
+    sess = SessionLocal()
+    try:
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        date_to = min(when.date(), dt.date.today())
+        date_from = date_to - TD(days=days - 1)
+        known = as_of_series(sess, entity_id, when, date_from, date_to)
+        current = dict(
+            sess.query(GasStorageDaily.date, GasStorageDaily.percent)
+            .filter(GasStorageDaily.entity_id == entity_id,
+                    GasStorageDaily.date >= date_from, GasStorageDaily.date <= date_to)
+            .all()
+        )
+        records, revised = [], []
+        for r in known:
+            value = round(float(r.value), 2)
+            records.append({"date": _format_date(r.date), "percent": value,
+                            "first_seen_at": r.first_seen_at.isoformat(timespec="seconds")})
+            now_value = current.get(r.date)
+            if now_value is not None and round(float(now_value), 2) != value:
+                revised.append({"date": _format_date(r.date), "as_of": value, "current": round(float(now_value), 2)})
+        return {"entity": entity, "as_of": when.isoformat(timespec="seconds"), "records": records, "revised": revised}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.get("/api/revisions", response_class=JSONUTF8Response)
+def api_revisions(date: str = Query(..., description="YYYY-MM-DD"), entity: str = _ENTITY_QUERY):
+    """Všetky verzie hodnoty pre jeden deň (AGSI restatementy)."""
+    from .revisions import day_revisions
+    try:
+        day = dt.date.fromisoformat(date)
+    except ValueError:
+        return JSONUTF8Response({"ok": False, "error": "date must be YYYY-MM-DD"}, status_code=400)
+    sess = SessionLocal()
+    try:
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        revisions = [{
+            "percent": round(float(r.value), 2),
+            "first_seen_at": r.first_seen_at.isoformat(timespec="seconds"),
+            "superseded_at": r.superseded_at.isoformat(timespec="seconds") if r.superseded_at else None,
+        } for r in day_revisions(sess, entity_id, day)]
+        return {"entity": entity, "date": _format_date(day), "revisions": revisions}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.get("/api/anomalies", response_class=JSONUTF8Response)
+def api_anomalies(days: int = 30,
+                  entity: str | None = Query(None, description="Kód entity; ak chýba, všetky entity"),
+                  kind: str | None = Query(None, description="delta | flatline | restatement (čiarkou oddelené)")):
+    """Anomálie zistené pri ingeste za posledných N dní (podľa gas day)."""
+    from .anomalies import list_anomalies
+    days = max(1, min(int(days or 30), 366 * 10))
+    kinds = [k.strip() for k in kind.split(",") if k.strip()] if kind else None
+    sess = SessionLocal()
+    try:
+        entity_id = None
+        if entity:
+            entity_id = resolve_entity_id(sess, entity)
+            if entity_id is None:
+                return _unknown_entity(entity)
+        rows = list_anomalies(sess, entity_id, dt.date.today() - TD(days=days), kinds)
+        return {"days": days, "count": len(rows), "anomalies": [{
+            "entity": r.code,
+            "date": _format_date(r.date),
+            "kind": r.kind,
+            "value": None if r.value is None else round(float(r.value), 2),
+            "expected": None if r.expected is None else round(float(r.expected), 2),
+            "score": None if r.score is None else round(float(r.score), 2),
+            "detected_at": r.detected_at.isoformat(timespec="seconds"),
+        } for r in rows]}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+# ---------------------------- Alert pravidlá ----------------------------
+def _rule_dict(r: AlertRule, code: str | None) -> dict:
+    return {"id": r.id, "name": r.name, "entity": code, "kind": r.kind, "threshold": r.threshold,
+            "webhook_url": r.webhook_url, "enabled": r.enabled,
+            "created_at": r.created_at.isoformat(timespec="seconds")}
+
+
+@app.get("/api/alert-rules", response_class=JSONUTF8Response)
+def api_alert_rules():
     sess = SessionLocal()
     try:
         rows = (
-            sess.query(GasStorageDaily)
-            .order_by(GasStorageDaily.date.desc())
-            .limit(days)
+            sess.query(AlertRule, StorageEntity.code)
+            .outerjoin(StorageEntity, StorageEntity.id == AlertRule.entity_id)
+            .order_by(AlertRule.id)
             .all()
         )
+        return {"rules": [_rule_dict(r, code) for r, code in rows]}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.post("/api/alert-rules", response_class=JSONUTF8Response)
+def api_alert_rules_create(payload: dict = Body(..., examples=[{
+        "name": "EU pod 50 %", "entity": "eu", "kind": "cross_below", "threshold": 50,
+        "webhook_url": "http://127.0.0.1:8767/hook"}])):
+    """
+    Nové pravidlo. kind: drop | rise (denná zmena aspoň o threshold p.b.), cross_above | cross_below
+    (prekročenie úrovne threshold %). entity chýba = všetky entity.
+    """
+    from .alerts import RULE_KINDS
+    kind = payload.get("kind")
+    url = (payload.get("webhook_url") or "").strip()
+    try:
+        threshold = float(payload["threshold"])
+    except (KeyError, TypeError, ValueError):
+        threshold = None
+    if kind not in RULE_KINDS or threshold is None or not url.startswith(("http://", "https://")):
+        return JSONUTF8Response({"ok": False, "error": f"kind must be {'|'.join(RULE_KINDS)}, threshold a number, webhook_url http(s)"}, status_code=400)
+    sess = SessionLocal()
+    try:
+        entity_id = None
+        if payload.get("entity"):
+            entity_id = resolve_entity_id(sess, payload["entity"])
+            if entity_id is None:
+                return _unknown_entity(payload["entity"])
+        rule = AlertRule(name=payload.get("name"), entity_id=entity_id, kind=kind, threshold=threshold,
+                         webhook_url=url, enabled=bool(payload.get("enabled", True)),
+                         created_at=dt.datetime.utcnow())
+        sess.add(rule)
+        sess.commit()
+        return {"ok": True, "rule": _rule_dict(rule, payload.get("entity"))}
+    except Exception as e:
+        sess.rollback()
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.delete("/api/alert-rules/{rule_id}", response_class=JSONUTF8Response)
+def api_alert_rules_delete(rule_id: int):
+    from .alerts import cancel_pending
+    sess = SessionLocal()
+    try:
+        deleted = sess.query(AlertRule).filter(AlertRule.id == rule_id).delete()
+        if deleted:
+            cancel_pending(sess, rule_id)
+        sess.commit()
+        if not deleted:
+            return JSONUTF8Response({"ok": False, "error": "rule not found"}, status_code=404)
+        return {"ok": True, "deleted": rule_id}
+    except Exception as e:
+        sess.rollback()
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.get("/api/alert-deliveries", response_class=JSONUTF8Response)
+def api_alert_deliveries(status: str | None = Query(None, description="pending | sent | failed"), limit: int = 100):
+    """Posledné doručenia webhookov (outbox) vrátane počtu pokusov a poslednej chyby."""
+    limit = max(1, min(int(limit or 100), 1000))
+    sess = SessionLocal()
+    try:
+        q = sess.query(AlertDelivery)
+        if status:
+            q = q.filter(AlertDelivery.status == status)
+        rows = q.order_by(AlertDelivery.id.desc()).limit(limit).all()
+        return {"deliveries": [{
+            "id": r.id, "rule_id": r.rule_id, "status": r.status, "attempts": r.attempts,
+            "payload": json.loads(r.payload), "last_error": r.last_error,
+            "created_at": r.created_at.isoformat(timespec="seconds"),
+            "sent_at": r.sent_at.isoformat(timespec="seconds") if r.sent_at else None,
+            "next_attempt_at": r.next_attempt_at.isoformat(timespec="seconds") if r.status == "pending" else None,
+        } for r in rows]}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.get("/api/export", response_class=StreamingResponse)
+def api_export(fmt: str = "csv", days: int = 30, entity: str = _ENTITY_QUERY, metrics: str | None = _METRICS_QUERY):
+    try:
+        names = _parse_metrics(metrics, default=_DAILY_METRICS)
+    except ValueError as e:
+        return JSONUTF8Response({"ok": False, "error": str(e), "available": list(METRIC_NAMES)}, status_code=400)
+    header = ["date", *names]
+
+    sess = ReadSessionLocal()
+    try:
+        entity_id = resolve_entity_id(sess, entity)
+        if entity_id is None:
+            return _unknown_entity(entity)
+        rows = _metric_query(sess, entity_id, names).order_by(GasStorageDaily.date.desc()).limit(days).all()
         rows = list(reversed(rows))
 
-        if fmt.lower() == "csv":
+        def csv_response():
             buf = io.StringIO()
             w = csv.writer(buf)
-            w.writerow(["date", "percent", "delta"])
+            w.writerow(header)
             for r in rows:
-                w.writerow([str(r.date),
-                            f"{_to_float(r.percent):.2f}" if _to_float(r.percent) is not None else "",
-                            "" if r.delta is None else f"{_to_float(r.delta):.2f}"])
+                w.writerow([str(r.date), *[_fmt_metric(n, getattr(r, n)) for n in names]])
             buf.seek(0)
             return StreamingResponse(
                 iter([buf.getvalue()]),
                 media_type="text/csv; charset=utf-8",
                 headers={"Content-Disposition": 'attachment; filename="powergy_gas_storage.csv"'}
             )
+
+        if fmt.lower() == "csv":
+            return csv_response()
         elif fmt.lower() in ("xlsx", "xls"):
+            openpyxl = _openpyxl()
             if openpyxl is None:
-                buf = io.StringIO()
-                w = csv.writer(buf)
-                w.writerow(["date", "percent", "delta"])
-                for r in rows:
-                    w.writerow([str(r.date),
-                                f"{_to_float(r.percent):.2f}" if _to_float(r.percent) is not None else "",
-                                "" if r.delta is None else f"{_to_float(r.delta):.2f}"])
-                buf.seek(0)
-                return StreamingResponse(
-                    iter([buf.getvalue()]),
-                    media_type="text/csv; charset=utf-8",
-                    headers={"Content-Disposition": 'attachment; filename="powergy_gas_storage.csv"'}
-                )
+                return csv_response()
             wb = openpyxl.Workbook()
             ws = wb.active
             ws.title = "gas_storage"
-            ws.append(["date", "percent", "delta"])
+            ws.append(header)
             for r in rows:
-                ws.append([str(r.date),
-                           float(f"{_to_float(r.percent):.2f}") if _to_float(r.percent) is not None else None,
-                           None if r.delta is None else float(f"{_to_float(r.delta):.2f}")])
+                ws.append([str(r.date), *[_round_metric(n, getattr(r, n)) for n in names]])
             xbuf = io.BytesIO()
             wb.save(xbuf)
             xbuf.seek(0)
@@ -1682,7 +2529,9 @@ def api_export(fmt: str = "csv", days: int = 30):
 
 # ---------------------------- Comments ----------------------------
 @app.api_route("/api/backfill-agsi", methods=["GET", "POST"], response_class=JSONUTF8Response)
-def api_backfill_agsi(from_date: str | None = Query(None, description="YYYY-MM-DD; ak chýba, použije najstarší dátum v DB alebo 2021-01-01")):
+@offload
+def api_backfill_agsi(from_date: str | None = Query(None, description="YYYY-MM-DD; ak chýba, použije najstarší dátum v DB alebo 2021-01-01"),
+                      entity: str | None = Query(None, description="Kód entity; ak chýba, backfill všetkých entít")):
     """
     Manuálne spustenie backfillu dát z AGSI API.
     Stiahne všetky dáta od from_date (alebo od najstaršieho dátumu v DB) po včerajšok.
@@ -1709,8 +2558,8 @@ def api_backfill_agsi(from_date: str | None = Query(None, description="YYYY-MM-D
                 }, status_code=400)
         else:
             # Zistíme najstarší dátum v DB - ak chýbajú dáta pred 2021, načítame od 2021
-            earliest_row = sess.query(GasStorageDaily).order_by(GasStorageDaily.date.asc()).first()
-            last_row = sess.query(GasStorageDaily).order_by(GasStorageDaily.date.desc()).first()
+            earliest_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID).order_by(GasStorageDaily.date.asc()).first()
+            last_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID).order_by(GasStorageDaily.date.desc()).first()
             
             # Pre sezónne porovnanie potrebujeme dáta minimálne od 2021-01-01
             min_required_date = dt.date(2021, 1, 1)
@@ -1735,7 +2584,9 @@ def api_backfill_agsi(from_date: str | None = Query(None, description="YYYY-MM-D
                 start_date = str(min_required_date)
         
         from .scraper import backfill_agsi
-        result = backfill_agsi(start_date)
+        result = backfill_agsi(start_date, entity=entity)
+        if result["inserted"] or result["updated"]:
+            _envelope_cache.clear()
         return {"ok": True, "from_date": start_date, "max_available_date": str(max_date), **result}
     except Exception as e:
         return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
@@ -1743,17 +2594,77 @@ def api_backfill_agsi(from_date: str | None = Query(None, description="YYYY-MM-D
         sess.close()
 
 
+@app.get("/api/gaps", response_class=JSONUTF8Response)
+def api_gaps(from_date: str = Query("2021-01-01", description="YYYY-MM-DD"),
+             to_date: str | None = Query(None, description="YYYY-MM-DD; default včerajšok"),
+             entity: str | None = Query(None, description="Kód entity; ak chýba, všetky AGSI entity"),
+             merge_within_days: int = Query(7, ge=0, le=365, description="Zlúčiť diery vzdialené najviac N dní")):
+    """Chýbajúce úseky v gas_storage_daily a z nich zlúčené rozsahy, ktoré by stiahol /api/refill-gaps."""
+    from .gaps import coalesce, find_gaps
+    try:
+        start = dt.date.fromisoformat(from_date)
+        end = dt.date.fromisoformat(to_date) if to_date else dt.date.today() - TD(days=1)
+    except ValueError:
+        return JSONUTF8Response({"ok": False, "error": "dates must be YYYY-MM-DD"}, status_code=400)
+
+    sess = SessionLocal()
+    try:
+        entity_ids = None
+        if entity:
+            entity_id = resolve_entity_id(sess, entity)
+            if entity_id is None:
+                return _unknown_entity(entity)
+            entity_ids = [entity_id]
+        found = find_gaps(sess, start, end, entity_ids)
+        codes = dict(sess.query(StorageEntity.id, StorageEntity.code)
+                     .filter(StorageEntity.id.in_({g["entity_id"] for g in found} or {-1})).all())
+        fmt = lambda g: {**g, "entity": codes.get(g["entity_id"]), "from": str(g["from"]), "to": str(g["to"])}
+        ranges = coalesce(found, merge_within_days)
+        return {
+            "from_date": str(start), "to_date": str(end),
+            "missing_days": sum(g["days"] for g in found),
+            "gaps": [fmt(g) for g in found],
+            "ranges": [fmt(r) for r in ranges],
+        }
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
+
+
+@app.api_route("/api/refill-gaps", methods=["GET", "POST"], response_class=JSONUTF8Response)
+@offload
+def api_refill_gaps(from_date: str = Query("2021-01-01", description="YYYY-MM-DD"),
+                    entity: str | None = Query(None, description="Kód entity; ak chýba, všetky AGSI entity"),
+                    merge_within_days: int = Query(7, ge=0, le=365),
+                    max_ranges: int | None = Query(None, ge=1, description="Najviac N AGSI requestov")):
+    """Stiahne z AGSI len chýbajúce úseky (susedné diery zlúčené do jedného requestu)."""
+    if not os.getenv("AGSI_API_KEY"):
+        return JSONUTF8Response({"ok": False, "error": "AGSI_API_KEY missing"}, status_code=400)
+    try:
+        from .scraper import refill_gaps
+        result = refill_gaps(from_date, entity=entity, merge_within_days=merge_within_days, max_ranges=max_ranges)
+        if result["inserted"] or result["updated"]:
+            _history_cache.clear()
+            _envelope_cache.clear()
+        return {"ok": True, **result}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+
+
 @app.post("/api/backfill-comments", response_class=JSONUTF8Response)
+@offload
 def backfill_comments(limit: int = 60, force: bool = False):
     """Fill missing comments for last N rows; if force=True, overwrite all (CAREFUL with tokens)."""
     sess = SessionLocal()
     try:
         rows = (sess.query(GasStorageDaily)
+                    .filter(GasStorageDaily.entity_id == EU_ENTITY_ID)
                     .order_by(GasStorageDaily.date.desc())
                     .limit(limit).all())
         changed = 0
         for r in rows:
-            if force or not r.comment or not str(r.comment).strip():
+            if force or not has_comment(sess, r.date):
                 current = _to_float(r.percent)
                 delta   = _to_float(r.delta)
                 # compute yoy_gap
@@ -1762,7 +2673,7 @@ def backfill_comments(limit: int = 60, force: bool = False):
                 except ValueError:
                     prev_date = r.date - TD(days=365)
                 prev = (sess.query(GasStorageDaily)
-                             .filter(GasStorageDaily.date == prev_date)
+                             .filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == prev_date)
                              .first())
                 yoy_gap = None
                 if prev and current is not None and _to_float(prev.percent) is not None:
@@ -1771,12 +2682,12 @@ def backfill_comments(limit: int = 60, force: bool = False):
                 trend7 = 0.0
                 try:
                     week_ago = r.date - TD(days=7)
-                    week_ago_row = sess.query(GasStorageDaily).filter(GasStorageDaily.date == week_ago).first()
+                    week_ago_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == week_ago).first()
                     if week_ago_row and current is not None and _to_float(week_ago_row.percent) is not None:
                         trend7 = round(current - _to_float(week_ago_row.percent), 2)
                 except Exception:
                     pass
-                r.comment = generate_comment_safe(current or 0.0, delta, yoy_gap, trend7)
+                save_comment(sess, r.date, *generate_comment_safe(current or 0.0, delta, yoy_gap, trend7))
                 changed += 1
         sess.commit()
         return {"ok": True, "updated": changed}
@@ -1788,6 +2699,7 @@ def backfill_comments(limit: int = 60, force: bool = False):
 
 
 @app.api_route("/api/refresh-comment", methods=["GET", "POST"], response_class=JSONUTF8Response)
+@offload
 def api_refresh_comment(force: bool = Query(False, description="Ak true, prepíše existujúci komentár")):
     """
     Vygeneruje a uloží komentár pre najnovší záznam.
@@ -1797,16 +2709,16 @@ def api_refresh_comment(force: bool = Query(False, description="Ak true, prepí
     """
     sess = SessionLocal()
     try:
-        row = sess.query(GasStorageDaily).order_by(GasStorageDaily.date.desc()).first()
+        row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID).order_by(GasStorageDaily.date.desc()).first()
         if not row:
             return JSONUTF8Response({"ok": False, "error": "No rows"}, status_code=404)
 
         # Regeneruj komentár ak je prázdny alebo ak je force=True
         # Kontrolujeme aj prázdne stringy a whitespace
-        comment_text = str(row.comment) if row.comment else ""
-        has_comment = comment_text.strip() and len(comment_text.strip()) > 0
+        comment_text = str(get_comment(sess, row.date) or "")
+        has_existing = comment_text.strip() and len(comment_text.strip()) > 0
         
-        if has_comment and not force:
+        if has_existing and not force:
             return {"ok": True, "skipped": True, "date": str(row.date), "has_comment": True, "comment_length": len(comment_text)}
 
         current = _to_float(row.percent)
@@ -1819,7 +2731,7 @@ def api_refresh_comment(force: bool = Query(False, description="Ak true, prepí
         except ValueError:
             prev_date = d - TD(days=365)
 
-        prev = sess.query(GasStorageDaily).filter(GasStorageDaily.date == prev_date).first()
+        prev = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == prev_date).first()
         prev_percent = _to_float(prev.percent) if prev else None
         yoy_gap = None if (current is None or prev_percent is None) else round(current - prev_percent, 2)
 
@@ -1827,14 +2739,14 @@ def api_refresh_comment(force: bool = Query(False, description="Ak true, prepí
         trend7 = 0.0
         try:
             week_ago = d - TD(days=7)
-            week_ago_row = sess.query(GasStorageDaily).filter(GasStorageDaily.date == week_ago).first()
+            week_ago_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == week_ago).first()
             if week_ago_row and current is not None and _to_float(week_ago_row.percent) is not None:
                 trend7 = round(current - _to_float(week_ago_row.percent), 2)
         except Exception:
             pass
 
-        comment_text = generate_comment_safe(current or 0.0, delta, yoy_gap, trend7)
-        row.comment = comment_text
+        comment_text, model, prompt_version = generate_comment_safe(current or 0.0, delta, yoy_gap, trend7)
+        save_comment(sess, d, comment_text, model, prompt_version)
         sess.commit()
 
         return {
@@ -1862,6 +2774,7 @@ def api_recompute_deltas(days: int | None = Query(None)):
     - Bez parametru -> prepočet celej tabuľky
     - ?days=N      -> prepočet iba za posledných N dní (+ predchádzajúci deň ako lag)
     """
+    from .revisions import bump_version
     sess = SessionLocal()
     try:
         if days is not None:
@@ -1880,8 +2793,8 @@ def api_recompute_deltas(days: int | None = Query(None)):
                   FROM gas_storage_daily
                 ),
                 lagged AS (
-                  SELECT g.date,
-                         LAG(g.percent) OVER (ORDER BY g.date) AS lag_percent
+                  SELECT g.entity_id, g.date,
+                         LAG(g.percent) OVER (PARTITION BY g.entity_id ORDER BY g.date) AS lag_percent
                   FROM gas_storage_daily g
                   WHERE g.date >= (SELECT since FROM bounds) - INTERVAL '1 day'
                 )
@@ -1891,10 +2804,12 @@ def api_recompute_deltas(days: int | None = Query(None)):
                                  ELSE ROUND((g.percent - l.lag_percent)::numeric, 2)::double precision
                                END
                   FROM lagged l
-                 WHERE l.date = g.date
+                 WHERE l.entity_id = g.entity_id
+                   AND l.date = g.date
                    AND g.date >= (SELECT since FROM bounds)
             """)
             res = sess.execute(sql, {"d": days})
+            bump_version(sess)
             sess.commit()
             changed = getattr(res, "rowcount", 0) or 0
             return {"ok": True, "mode": f"last_{days}_days", "changed": changed}
@@ -1902,8 +2817,8 @@ def api_recompute_deltas(days: int | None = Query(None)):
         # full prepočet
         sql = text("""
             WITH lagged AS (
-              SELECT date,
-                     LAG(percent) OVER (ORDER BY date) AS lag_percent
+              SELECT entity_id, date,
+                     LAG(percent) OVER (PARTITION BY entity_id ORDER BY date) AS lag_percent
               FROM gas_storage_daily
             )
             UPDATE gas_storage_daily g
@@ -1912,9 +2827,11 @@ def api_recompute_deltas(days: int | None = Query(None)):
                              ELSE ROUND((g.percent - l.lag_percent)::numeric, 2)::double precision
                            END
               FROM lagged l
-             WHERE l.date = g.date
+             WHERE l.entity_id = g.entity_id
+               AND l.date = g.date
         """)
         res = sess.execute(sql)
+        bump_version(sess)
         sess.commit()
         changed = getattr(res, "rowcount", 0) or 0
         return {"ok": True, "mode": "full", "changed": changed}
@@ -1927,51 +2844,13 @@ def api_recompute_deltas(days: int | None = Query(None)):
 
 
 # ---------------------------- Daily ingest from AGSI ----------------------------
-def _agsi_headers():
-    key = os.getenv("AGSI_API_KEY", "")
-    return {"x-key": key} if key else {}
-
-def _fetch_agsi_eu_full(date_str: str) -> float | None:
-    """Vráti percento naplnenia 'full' pre EU v daný gas_day (YYYY-MM-DD), alebo None."""
-    url = "https://agsi.gie.eu/api"
-    params = {
-        "type": "eu",
-        "from": date_str,
-        "to": date_str,
-        "size": 100,
-        "gas_day": "asc",
-        "page": 1,
-    }
-    r = requests.get(url, headers=_agsi_headers(), params=params, timeout=25)
-    r.raise_for_status()
-    j = r.json()
-    data = j.get("data") or []
-    if not data:
-        return None
-    # Hľadáme presný záznam pre daný deň
-    # gasDayStart môže byť v rôznych formátoch: "2025-11-20" alebo "2025-11-20T00:00:00+00:00"
-    date_str_clean = date_str[:10]  # Zajistíme len dátum bez času
-    for item in data:
-        gas_day = item.get("gasDayStart") or item.get("gas_day") or ""
-        gas_day_str = str(gas_day)[:10]  # Vezmeme len prvých 10 znakov (YYYY-MM-DD)
-        if gas_day_str == date_str_clean:
-            try:
-                full_val = item.get("full") or item.get("fullness") or item.get("percentage")
-                if full_val is not None:
-                    return float(full_val)
-            except Exception:
-                continue
-    # fallback: ak je len jeden záznam, použi ho
-    if len(data) > 0:
-        try:
-            full_val = data[-1].get("full") or data[-1].get("fullness") or data[-1].get("percentage")
-            if full_val is not None:
-                return float(full_val)
-        except Exception:
-            pass
-    return None
+def _fetch_agsi_eu_day(date_str: str) -> tuple[dict, dict] | None:
+    """Vráti (daily, metrics) záznam EU pre daný gas_day (YYYY-MM-DD), alebo None."""
+    from . import agsi
+    return agsi.fetch_eu_day(date_str)
 
 @app.api_route("/api/ingest-agsi-today", methods=["GET", "POST"], response_class=JSONUTF8Response)
+@offload
 def api_ingest_agsi_today(date: str | None = Query(None, description="YYYY-MM-DD; ak chýba, skúsi today→today-1→today-2")):
     """
     Dotiahne a uloží posledný dostupný deň z AGSI (EU 'full' %), spraví upsert a spočíta deltu.
@@ -1982,7 +2861,7 @@ def api_ingest_agsi_today(date: str | None = Query(None, description="YYYY-MM-DD
     sess = SessionLocal()
     try:
         # Zistíme posledný dátum v DB
-        last_row = sess.query(GasStorageDaily).order_by(GasStorageDaily.date.desc()).first()
+        last_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID).order_by(GasStorageDaily.date.desc()).first()
         # Pre sezónne porovnanie potrebujeme dáta minimálne od 2021
         last_date = last_row.date if last_row else dt.date(2021, 1, 1)
         
@@ -2000,7 +2879,7 @@ def api_ingest_agsi_today(date: str | None = Query(None, description="YYYY-MM-DD
                     start_date = last_date + dt.timedelta(days=1)
                     result = backfill_agsi(str(start_date))
                     # Po backfille aktualizujeme last_date
-                    last_row = sess.query(GasStorageDaily).order_by(GasStorageDaily.date.desc()).first()
+                    last_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID).order_by(GasStorageDaily.date.desc()).first()
                     last_date = last_row.date if last_row else last_date
                 except Exception as e:
                     pass  # Pokračujeme s jednotlivými dňami
@@ -2017,11 +2896,13 @@ def api_ingest_agsi_today(date: str | None = Query(None, description="YYYY-MM-DD
 
         picked_date = None
         picked_full = None
+        picked_metrics = None
         for d in candidates:
-            val = _fetch_agsi_eu_full(d)
-            if val is not None:
+            rec = _fetch_agsi_eu_day(d)
+            if rec is not None:
                 picked_date = d
-                picked_full = round(float(val), 2)
+                picked_full = round(float(rec[0]["percent"]), 2)
+                picked_metrics = rec[1]
                 break
 
         if picked_date is None:
@@ -2029,25 +2910,31 @@ def api_ingest_agsi_today(date: str | None = Query(None, description="YYYY-MM-DD
 
         # Upsert do DB
         d = dt.date.fromisoformat(picked_date)
-        row = sess.query(GasStorageDaily).filter(GasStorageDaily.date == d).first()
+        row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == d).first()
 
         # nájdi včerajšok pre deltu
         prev_date = d - dt.timedelta(days=1)
-        prev = sess.query(GasStorageDaily).filter(GasStorageDaily.date == prev_date).first()
+        prev = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == prev_date).first()
         prev_percent = _to_float(prev.percent) if prev else None
         delta = None if prev_percent is None else round(picked_full - prev_percent, 2)
 
+        changed = row is None or _to_float(row.percent) != picked_full
+        restated = {}
+        if changed:
+            from .revisions import record_changes
+            record_changes(sess, [(EU_ENTITY_ID, d, picked_full)], previous=restated)
+
         if row:
             row.percent = picked_full
             row.delta = delta
             # Ak komentár chýba, vygenerujeme ho
-            if not row.comment or not str(row.comment).strip():
+            if not has_comment(sess, d):
                 # Vypočítaj trend7 a yoy_gap pre komentár
                 trend7 = 0.0
                 yoy_gap = 0.0
                 try:
                     week_ago = d - dt.timedelta(days=7)
-                    week_ago_row = sess.query(GasStorageDaily).filter(GasStorageDaily.date == week_ago).first()
+                    week_ago_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == week_ago).first()
                     if week_ago_row and week_ago_row.percent is not None:
                         trend7 = round(picked_full - _to_float(week_ago_row.percent), 2)
                     
@@ -2055,20 +2942,83 @@ def api_ingest_agsi_today(date: str | None = Query(None, description="YYYY-MM-DD
                         prev_year_date = d.replace(year=d.year - 1)
                     except ValueError:
                         prev_year_date = d - dt.timedelta(days=365)
-                    prev_year_row = sess.query(GasStorageDaily).filter(GasStorageDaily.date == prev_year_date).first()
+                    prev_year_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == prev_year_date).first()
                     if prev_year_row and prev_year_row.percent is not None:
                         yoy_gap = round(picked_full - _to_float(prev_year_row.percent), 2)
                 except Exception:
                     pass
                 
-                row.comment = generate_comment_safe(picked_full, delta, yoy_gap, trend7)
+                save_comment(sess, d, *generate_comment_safe(picked_full, delta, yoy_gap, trend7))
         else:
-            sess.add(GasStorageDaily(date=d, percent=picked_full, delta=delta, comment=None))
-
+            sess.add(GasStorageDaily(date=d, percent=picked_full, delta=delta))
+
+        if changed:
+            from .seasonal import refresh_envelope
+            sess.flush()
+            refresh_envelope(sess, changed=[(EU_ENTITY_ID, d)])
+            from .alerts import evaluate as evaluate_alerts
+            from .anomalies import observe as observe_anomalies
+            observe_anomalies(sess, [(EU_ENTITY_ID, d, picked_full)], restated)
+            evaluate_alerts(sess, [(EU_ENTITY_ID, d, picked_full)])
+
+        from . import agsi
+        agsi.upsert_metrics(sess, [{**picked_metrics, "date": d}])
         sess.commit()
+        _envelope_cache.clear()
         return {"ok": True, "date": picked_date, "percent": picked_full, "delta": delta}
     except Exception as e:
         sess.rollback()
         return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
     finally:
         sess.close()
+
+
+@app.api_route("/api/ingest-today", methods=["GET", "POST"], response_class=JSONUTF8Response)
+@offload
+def api_ingest_today():
+    """
+    Denný beh cez všetky nakonfigurované zdroje (SOURCE_PRIORITY): paralelné stiahnutie,
+    uloženie hodnôt so zdrojom, zosúladenie a publikovanie víťaza do gas_storage_daily.
+    """
+    try:
+        from .scraper import run_daily_sources
+        result = run_daily_sources()
+        _history_cache.clear()
+        _envelope_cache.clear()
+        return result
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+
+
+@app.get("/api/sources", response_class=JSONUTF8Response)
+def api_sources(days: int = 14):
+    """Hodnoty jednotlivých zdrojov po dňoch vedľa publikovanej hodnoty a rozdiel medzi zdrojmi."""
+    from .settings import SOURCE_DIVERGENCE_PP, SOURCE_PRIORITY
+    from .sources import configured_sources
+    days = max(1, min(int(days or 14), 366))
+    sess = SessionLocal()
+    try:
+        since = dt.date.today() - dt.timedelta(days=days)
+        rows = (sess.query(GasStorageSourceValue.date, GasStorageSourceValue.source, GasStorageSourceValue.value,
+                           GasStorageDaily.percent)
+                .outerjoin(GasStorageDaily, (GasStorageDaily.entity_id == GasStorageSourceValue.entity_id)
+                           & (GasStorageDaily.date == GasStorageSourceValue.date))
+                .filter(GasStorageSourceValue.entity_id == EU_ENTITY_ID, GasStorageSourceValue.date >= since)
+                .order_by(GasStorageSourceValue.date.desc())
+                .all())
+        by_day = {}
+        for d, source, value, published in rows:
+            rec = by_day.setdefault(d, {"date": _format_date(d), "published": _to_float(published), "values": {}})
+            rec["values"][source] = round(float(value), 3)
+        records = []
+        for rec in by_day.values():
+            vals = list(rec["values"].values())
+            rec["spread"] = round(max(vals) - min(vals), 3) if len(vals) > 1 else 0.0
+            rec["diverged"] = rec["spread"] > SOURCE_DIVERGENCE_PP
+            records.append(rec)
+        return {"priority": SOURCE_PRIORITY, "configured": configured_sources(),
+                "divergence_threshold": SOURCE_DIVERGENCE_PP, "records": records}
+    except Exception as e:
+        return JSONUTF8Response({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        sess.close()
@@ -0,0 +1,62 @@
+# app/matrix.py
+"""
+Celá história série ako hustá matica roky × 366 (float32, NaN = chýbajúci deň).
+
+Riadok = rok (kalendárny alebo plynárenský), stĺpec = slot dňa z app/seasonal.py,
+takže 29. február má vlastný stĺpec a ostatné dni sú v každom roku pod sebou.
+Postaví sa jedným zoradeným prechodom cez PK (entity_id, date); serializuje sa
+ako JSON, surové little-endian float32 (row-major) alebo .npy (verzia 1.0) – bez numpy.
+"""
+import struct
+import sys
+from array import array
+
+from sqlalchemy import text
+
+from .seasonal import DAYS, calendar_day_index, gas_day_index
+
+MATRIX_METRICS = ("percent", "delta")
+NAN = float("nan")
+
+
+def build(sess, entity_id: int, metric: str = "percent", gas_year: bool = False) -> tuple[list[int], array]:
+    """Vráti (roky, matica ako array('f') dĺžky len(roky) * 366, row-major)."""
+    if metric not in MATRIX_METRICS:
+        raise ValueError(f"metric must be one of {', '.join(MATRIX_METRICS)}")
+    index = gas_day_index if gas_year else calendar_day_index
+    rows = sess.execute(text(f"""
+        SELECT date, {metric} FROM gas_storage_daily
+        WHERE entity_id = :entity_id AND {metric} IS NOT NULL
+        ORDER BY date
+    """), {"entity_id": entity_id}).all()
+    if not rows:
+        return [], array("f")
+
+    first_year = index(rows[0][0])[0]
+    years = list(range(first_year, index(rows[-1][0])[0] + 1))
+    data = array("f", [NAN]) * (len(years) * DAYS)
+    for d, v in rows:
+        y, i = index(d)
+        data[(y - first_year) * DAYS + i] = v
+    return years, data
+
+
+def to_le_bytes(data: array) -> bytes:
+    """Surové float32 little-endian (row-major)."""
+    if sys.byteorder != "little":
+        data = array("f", data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def to_npy(data: array, rows: int) -> bytes:
+    """NumPy .npy v1.0: magic, dĺžka hlavičky, dict hlavička zarovnaná na 64 B, dáta '<f4'."""
+    header = f"{{'descr': '<f4', 'fortran_order': False, 'shape': ({rows}, {DAYS}), }}"
+    pad = 64 - (10 + len(header) + 1) % 64
+    header = header + " " * (pad % 64) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1") + to_le_bytes(data)
+
+
+def to_json_rows(data: array, rows: int) -> list[list[float | None]]:
+    """Riadky matice pre JSON (NaN → null)."""
+    return [[None if v != v else round(v, 3) for v in data[r * DAYS:(r + 1) * DAYS]] for r in range(rows)]
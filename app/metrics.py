@@ -0,0 +1,269 @@
+# app/metrics.py
+"""
+Prometheus metriky (GET /metrics).
+
+- http_requests_total / http_request_duration_seconds: čistý ASGI middleware (žiadny
+  BaseHTTPMiddleware), route = šablóna cesty (/api/history, nie query), takže kardinalita
+  je ohraničená počtom endpointov; label children sú cachované v dict-e,
+- cache_requests_total{cache, result}: in-process cache endpointov (history, lng, envelope),
+- db_query_duration_seconds{op}: before/after_cursor_execute na všetkých Engine (sync aj async),
+- per request: počet SQL a čas v DB (http_request_db_*, hlavička Server-Timing), pomalé príkazy
+  (db_slow_queries_total + log s normalizovaným SQL) a N+1 – ten istý tvar príkazu viac ako
+  DB_N_PLUS_ONE-krát v jednom requeste (db_n_plus_one_total + log raz na route a tvar),
+- http_client_duration_seconds / http_client_errors_total{host}: pooled session z app/agsi.py
+  (AGSI, ALSI, KYOS),
+- openai_request_duration_seconds{model, outcome},
+- pipeline_stage_duration_seconds{stage, outcome}: stage() okolo krokov ingestu a backfillov,
+- db_pool_*: stav connection poolov z database.pool_status() pri každom scrape.
+
+S PROMETHEUS_MULTIPROC_DIR (viac uvicorn workerov) sa agregujú metriky všetkých procesov.
+"""
+import contextlib
+import contextvars
+import functools
+import os
+import re
+from time import perf_counter
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy.engine.interfaces import ExecuteStyle
+
+from .settings import DB_N_PLUS_ONE, DB_SLOW_QUERY_MS
+
+_FAST = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_SLOW = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requesty", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Latencia HTTP requestov", ["method", "route"],
+                         buckets=_FAST)
+CACHE = Counter("cache_requests_total", "In-process cache endpointov", ["cache", "result"])
+DB_QUERY = Histogram("db_query_duration_seconds", "Trvanie SQL príkazov", ["op"], buckets=_FAST)
+DB_SLOW = Counter("db_slow_queries_total", "SQL príkazy nad DB_SLOW_QUERY_MS", ["op"])
+REQUEST_QUERIES = Histogram("http_request_db_queries", "Počet SQL príkazov na request", ["route"],
+                            buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Čas v DB na request", ["route"], buckets=_FAST)
+N_PLUS_ONE = Counter("db_n_plus_one_total", "Requesty s opakovaným tvarom SQL (N+1)", ["route"])
+HTTP_CLIENT = Histogram("http_client_duration_seconds", "Latencia odchádzajúcich requestov (AGSI/ALSI/KYOS)",
+                        ["host"], buckets=_SLOW)
+HTTP_CLIENT_ERRORS = Counter("http_client_errors_total", "Chyby odchádzajúcich requestov", ["host", "kind"])
+OPENAI = Histogram("openai_request_duration_seconds", "Latencia OpenAI volaní", ["model", "outcome"],
+                   buckets=_SLOW)
+STAGE = Histogram("pipeline_stage_duration_seconds", "Trvanie krokov ingestu/backfillu", ["stage", "outcome"],
+                  buckets=_SLOW)
+
+
+# --- HTTP middleware ----------------------------------------------------------------
+
+_children: dict = {}
+
+
+def _observe_request(method: str, route: str, status: int, seconds: float):
+    key = (method, route, status)
+    pair = _children.get(key)
+    if pair is None:
+        pair = _children[key] = (HTTP_REQUESTS.labels(method, route, str(status)),
+                                 HTTP_LATENCY.labels(method, route))
+    pair[0].inc()
+    pair[1].observe(seconds)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: počet a latencia requestov podľa šablóny route (scope["route"] z FastAPI)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = perf_counter()
+        status = 500
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # SQL streamovanej odpovede (export) po hlavičkách už do Server-Timing nepadne
+                timing = (f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries", '
+                          f'app;dur={(perf_counter() - start) * 1000:.1f}').encode()
+                message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", timing)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _query_stats.reset(token)
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            _observe_request(scope["method"], route, status, perf_counter() - start)
+            _observe_queries(route, stats)
+
+
+# --- SQL per request -------------------------------------------------------------------
+
+class QueryStats:
+    """Počítadlo SQL jedného requestu; shapes = {SQL text: počet} (parametre sú mimo textu)."""
+    __slots__ = ("count", "seconds", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: dict = {}
+
+
+# Mutable objekt v contextvar: sync endpointy bežia vo vlákne s kópiou kontextu (FastAPI threadpool,
+# offload), zmeny počítadla sa teda prejavia aj v middleware.
+_query_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
+_n_plus_one_seen: set = set()
+
+_SQL_STR = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUM = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_SQL_IN = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SQL_WS = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str, limit: int = 500) -> str:
+    """Tvar príkazu pre log: literály → ?, zoznamy (?, ?, …) → (…), jeden riadok."""
+    sql = _SQL_NUM.sub("?", _SQL_STR.sub("?", sql))
+    sql = _SQL_WS.sub(" ", _SQL_IN.sub("(…)", sql)).strip()
+    return sql if len(sql) <= limit else sql[:limit] + "…"
+
+
+def _observe_queries(route: str, stats: QueryStats):
+    if not stats.count:
+        return
+    REQUEST_QUERIES.labels(route).observe(stats.count)
+    REQUEST_DB_TIME.labels(route).observe(stats.seconds)
+    statement, n = max(stats.shapes.items(), key=lambda kv: kv[1])
+    if n > DB_N_PLUS_ONE:
+        N_PLUS_ONE.labels(route).inc()
+        if (route, statement) not in _n_plus_one_seen:
+            _n_plus_one_seen.add((route, statement))
+            print(f"N+1: {route} spustil {n}× ({stats.count} SQL spolu): {normalize_sql(statement)}")
+
+
+# --- helpery pre ostatné moduly --------------------------------------------------------
+
+def cache_hit(cache: str, hit: bool):
+    CACHE.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_http_client(host: str, seconds: float, error: str | None = None):
+    HTTP_CLIENT.labels(host).observe(seconds)
+    if error:
+        HTTP_CLIENT_ERRORS.labels(host, error).inc()
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """with stage("backfill_agsi"): … – trvanie kroku pipeline s outcome ok/error."""
+    start = perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        STAGE.labels(name, outcome).observe(perf_counter() - start)
+
+
+def timed_stage(name: str):
+    """Dekorátorová verzia stage()."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+# --- SQL -------------------------------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = perf_counter() - conn.info["query_start"].pop()
+    op = statement.lstrip()[:6].upper().rstrip()
+    (_DB_CHILDREN.get(op) or _DB_OTHER).observe(seconds)
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += seconds
+        # dávky jedného hromadného INSERT (insertmanyvalues) nie sú N+1
+        if context is None or context.execute_style is not ExecuteStyle.INSERTMANYVALUES:
+            shapes = stats.shapes
+            shapes[statement] = shapes.get(statement, 0) + 1
+    if seconds >= _SLOW_S:
+        DB_SLOW.labels(op if op in _DB_CHILDREN else "OTHER").inc()
+        print(f"Slow query {seconds * 1000:.0f} ms: {normalize_sql(statement)}")
+
+
+_DB_CHILDREN = {op: DB_QUERY.labels(op) for op in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")}
+_DB_OTHER = DB_QUERY.labels("OTHER")
+_SLOW_S = DB_SLOW_QUERY_MS / 1000
+
+
+def _handle_error(context):
+    # after_cursor_execute pri chybe nepríde – zahodíme štart, aby zásobník nerástol
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def instrument_sqlalchemy():
+    """Zaregistruje časovanie SQL na všetkých Engine (raz na proces)."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+# --- connection pooly ------------------------------------------------------------------
+
+class _PoolCollector:
+    def describe(self):
+        # bez describe() by register() volal collect() hneď pri importe (→ import database)
+        return []
+
+    def collect(self):
+        from .database import pool_status
+
+        status = pool_status()
+        for key, help_ in (("checked_out", "Spojenia požičané z poolu"), ("checked_in", "Voľné spojenia v poole"),
+                           ("overflow", "Spojenia nad pool_size"), ("size", "pool_size")):
+            g = GaugeMetricFamily(f"db_pool_{key}", help_, labels=["pool"])
+            for name, st in status.items():
+                g.add_metric([name], st[key])
+            yield g
+        for key, help_ in (("checkouts", "Checkouty"), ("connects", "Nové spojenia"), ("timeouts", "Timeouty čakania"),
+                           ("invalidations", "Zneplatnené spojenia"), ("pings", "Pre-ping SELECT 1")):
+            g = CounterMetricFamily(f"db_pool_{key}", help_, labels=["pool"])
+            for name, st in status.items():
+                g.add_metric([name], st[key])
+            yield g
+        g = CounterMetricFamily("db_pool_wait_seconds", "Celkové čakanie na spojenie", labels=["pool"])
+        for name, st in status.items():
+            g.add_metric([name], st["wait_ms_total"] / 1000)
+        yield g
+
+
+REGISTRY.register(_PoolCollector())
+
+
+def render() -> tuple[bytes, str]:
+    """Telo a content-type pre /metrics."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
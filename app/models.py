@@ -1,14 +1,260 @@
-from sqlalchemy import Column, Date, Float, Integer, Index, String, Text
+from sqlalchemy import (REAL, BigInteger, Boolean, Column, Date, DateTime, Float, Integer, Index, PrimaryKeyConstraint,
+                        SmallInteger, String, Text, UniqueConstraint, text)
 from .database import Base
 
+# EU agregát má pevné id – staré zápisy bez entity_id (a stará inštancia počas deployu) padnú naň
+EU_ENTITY_ID = 1
+
+
+class StorageEntity(Base):
+    """Dimenzia sérií AGSI: EU agregát, krajina, prevádzkovateľ (company) alebo zásobník (facility)."""
+    __tablename__ = "storage_entity"
+
+    id = Column(Integer, primary_key=True)
+    type = Column(String(16), nullable=False)     # eu | country | company | facility
+    code = Column(String(64), nullable=False, unique=True)  # 'eu', ISO krajina alebo EIC kód
+    name = Column(String(255))
+    country = Column(String(8))                   # AGSI parameter 'country'
+    company = Column(String(64))                  # AGSI parameter 'company' (EIC prevádzkovateľa)
+    parent_id = Column(Integer)
+
+
 class GasStorageDaily(Base):
     __tablename__ = "gas_storage_daily"
 
-    id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, index=True, unique=True, nullable=False)
+    entity_id = Column(Integer, nullable=False, default=EU_ENTITY_ID, server_default=text(str(EU_ENTITY_ID)))
+    date = Column(Date, nullable=False)
     percent = Column(Float, nullable=False)
     delta = Column(Float)
-    comment = Column(Text)
 
-# 🔑 pridaj index aj explicitne (nie je nutné, ale odporúča sa)
-Index("idx_gsd_date", GasStorageDaily.date)
+    __table_args__ = (
+        # Covering PK: čítanie série (entity_id, date, percent, delta) je index-only scan
+        PrimaryKeyConstraint("entity_id", "date", name="gas_storage_daily_pkey",
+                             postgresql_include=["percent", "delta"]),
+        # BRIN na dátum: lacné rozsahové skeny cez všetky entity (tisíce sérií × ~2000 dní)
+        Index("idx_gsd_date_brin", "date", postgresql_using="brin"),
+    )
+
+
+class GasStorageRevision(Base):
+    """
+    Append-only história hodnôt gas_storage_daily.percent (AGSI spätne opravuje dni).
+    Riadok = hodnota platná od first_seen_at do superseded_at (NULL = aktuálna); nový riadok
+    vzniká len pri zmene hodnoty. Čítanie aktuálnych dát ostáva na gas_storage_daily.
+    """
+    __tablename__ = "gas_storage_revision"
+
+    entity_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    first_seen_at = Column(DateTime, nullable=False)
+    superseded_at = Column(DateTime)
+    value = Column(REAL, nullable=False)
+
+    __table_args__ = (
+        # PK slúži aj as-of dotazom: (entity_id, date) rozsah, first_seen_at <= X
+        PrimaryKeyConstraint("entity_id", "date", "first_seen_at", name="gas_storage_revision_pkey"),
+        # najviac jedna aktuálna revízia na deň; malý partial index pre uzatváranie revízií
+        Index("gsr_current_uq", "entity_id", "date", unique=True,
+              postgresql_where=text("superseded_at IS NULL"), postgresql_include=["value"]),
+    )
+
+
+class DataVersion(Base):
+    """
+    Počítadlo verzie dát série (revisions.bump_version / data_version): +1 v tej istej transakcii
+    ako každá zmena percent (record_changes) aj prepis delty, takže sa zmení až commitom zápisu.
+    """
+    __tablename__ = "data_version"
+
+    entity_id = Column(Integer, primary_key=True)
+    v = Column(BigInteger, nullable=False, default=0)
+
+
+class GasStorageEnvelope(Base):
+    """
+    Materializovaná sezónna obálka: pre (entita, plynárenský rok, deň plynárenského roka)
+    štatistiky z predchádzajúcich seasonal.ENVELOPE_YEARS rokov. Prepočítava sa inkrementálne
+    (seasonal.refresh_envelope) pri každej zmene hodnoty v gas_storage_daily.
+    """
+    __tablename__ = "gas_storage_envelope"
+
+    entity_id = Column(Integer, nullable=False)
+    gas_year = Column(SmallInteger, nullable=False)     # rok, v ktorom plynárenský rok začína (1. 10.)
+    day_index = Column(SmallInteger, nullable=False)    # 0..365, seasonal.gas_day_index
+    n = Column(SmallInteger, nullable=False)            # počet rokov s dátami
+    min = Column(REAL)
+    max = Column(REAL)
+    mean = Column(REAL)
+    p10 = Column(REAL)
+    p25 = Column(REAL)
+    p50 = Column(REAL)
+    p75 = Column(REAL)
+    p90 = Column(REAL)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("entity_id", "gas_year", "day_index", name="gas_storage_envelope_pkey"),
+    )
+
+
+class AnomalyState(Base):
+    """
+    O(1) stav detektora anomálií na sériu (app/anomalies.py): posledný bod, počet bodov,
+    exponenciálne kĺzavý priemer prírastku a rozptyl rezídua, dĺžka behu rovnakej hodnoty.
+    """
+    __tablename__ = "anomaly_state"
+
+    entity_id = Column(Integer, primary_key=True)
+    last_date = Column(Date, nullable=False)
+    last_value = Column(REAL, nullable=False)
+    n = Column(Integer, nullable=False, default=0)
+    ew_mean = Column(REAL, nullable=False, default=0)   # EW priemer denného prírastku (p.b.)
+    ew_var = Column(REAL, nullable=False, default=0)    # EW rozptyl rezídua voči očakávaniu
+    flat_run = Column(SmallInteger, nullable=False, default=0)
+
+
+class GasStorageAnomaly(Base):
+    """Zistené anomálie: delta (neobvyklý prírastok), flatline (zaseknutý zdroj), restatement (oprava dňa)."""
+    __tablename__ = "gas_storage_anomaly"
+
+    entity_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    kind = Column(String(16), nullable=False)
+    value = Column(REAL)
+    expected = Column(REAL)
+    score = Column(REAL)                 # z-skóre (delta), rozdiel p.b. (restatement), dĺžka behu (flatline)
+    detected_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("entity_id", "date", "kind", name="gas_storage_anomaly_pkey"),
+        Index("idx_anomaly_detected_at", "detected_at"),
+    )
+
+
+class AlertRule(Base):
+    """
+    Serverové alert pravidlo (app/alerts.py). entity_id NULL = každá entita.
+    kind: drop / rise (denná zmena o aspoň threshold p.b.), cross_above / cross_below (prekročenie úrovne).
+    """
+    __tablename__ = "alert_rule"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255))
+    entity_id = Column(Integer)
+    kind = Column(String(16), nullable=False)
+    threshold = Column(REAL, nullable=False)
+    webhook_url = Column(String(1024), nullable=False)
+    enabled = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_alert_rule_entity", "entity_id", postgresql_where=text("enabled")),
+    )
+
+
+class AlertDelivery(Base):
+    """Outbox webhookov: jedno odpálenie pravidla pre (entita, deň); stav pending → sent | failed."""
+    __tablename__ = "alert_delivery"
+
+    id = Column(Integer, primary_key=True)
+    rule_id = Column(Integer, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    payload = Column(Text, nullable=False)          # JSON telo webhooku
+    status = Column(String(8), nullable=False, default="pending")
+    attempts = Column(SmallInteger, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint("rule_id", "entity_id", "date", name="alert_delivery_rule_day_uq"),
+        Index("idx_alert_delivery_due", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
+
+
+class GasStorageMetrics(Base):
+    """
+    Plná sada AGSI metrík k sérii v gas_storage_daily (rovnaký kľúč entity_id, date).
+    REAL (4 B) stačí na presnosť AGSI (TWh / GWh/d na 2–4 desatinné miesta) a drží riadok kompaktný.
+    Stĺpce zodpovedajú agsi.METRIC_FIELDS.
+    """
+    __tablename__ = "gas_storage_metrics"
+
+    entity_id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    gas_in_storage = Column(REAL)        # TWh
+    working_gas_volume = Column(REAL)    # TWh
+    injection = Column(REAL)             # GWh/d
+    withdrawal = Column(REAL)            # GWh/d
+    net_withdrawal = Column(REAL)        # GWh/d
+    injection_capacity = Column(REAL)    # GWh/d
+    withdrawal_capacity = Column(REAL)   # GWh/d
+    consumption = Column(REAL)           # TWh
+    consumption_full = Column(REAL)      # %
+    trend = Column(REAL)                 # %
+
+
+class LngTerminalDaily(Base):
+    """
+    Denné dáta LNG terminálov z GIE ALSI (EU, krajina, prevádzkovateľ alebo terminál).
+    Entity zdieľajú storage_entity (eu a krajiny spoločné s AGSI; lng_company/lng_terminal navyše).
+    Stĺpce zodpovedajú alsi.LNG_FIELDS.
+    """
+    __tablename__ = "lng_terminal_daily"
+
+    entity_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    inventory_gwh = Column(REAL)         # zásoba LNG v nádržiach, GWh
+    inventory_lng = Column(REAL)         # zásoba LNG, 10^3 m3
+    send_out = Column(REAL)              # GWh/d
+    dtmi_gwh = Column(REAL)              # deklarovaná max. zásoba (DTMI), GWh
+    dtrs = Column(REAL)                  # deklarovaný max. send-out (DTRS), GWh/d
+    contracted_capacity = Column(REAL)   # GWh/d
+    available_capacity = Column(REAL)    # GWh/d
+
+    __table_args__ = (
+        PrimaryKeyConstraint("entity_id", "date", name="lng_terminal_daily_pkey"),
+        Index("idx_lng_date_brin", "date", postgresql_using="brin"),
+    )
+
+
+class GasStorageSourceValue(Base):
+    """
+    Hodnota naplnenia (%) tak, ako ju vrátil jednotlivý zdroj (agsi, kyos, …) – podklad
+    pre zosúladenie v app/sources.py. Publikovaná hodnota zostáva v gas_storage_daily.
+    """
+    __tablename__ = "gas_storage_source_value"
+
+    entity_id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    source = Column(String(16), primary_key=True)
+    value = Column(REAL, nullable=False)
+    fetched_at = Column(DateTime, nullable=False)
+
+
+class GasStorageComment(Base):
+    """Komentáre (EU agregát) mimo „horúcej“ tabuľky gas_storage_daily, s provenance."""
+    __tablename__ = "gas_storage_comment"
+
+    date = Column(Date, primary_key=True)
+    comment = Column(Text, nullable=False)
+    model = Column(String(64))            # napr. gpt-4o-mini | fallback | legacy
+    prompt_version = Column(Integer)      # gpt.PROMPT_VERSION, None pre fallback/legacy
+    generated_at = Column(DateTime, nullable=False)
+
+
+class CommentCache(Base):
+    """Komentáre adresované obsahom: kľúč = hash zaokrúhlených vstupov + verzia promptu + model."""
+    __tablename__ = "comment_cache"
+
+    key = Column(String(64), primary_key=True)
+    model = Column(String(64), nullable=False)
+    prompt_version = Column(Integer, nullable=False)
+    comment = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+
+# LRU eviction triedi podľa last_used_at
+Index("idx_comment_cache_last_used", CommentCache.last_used_at)
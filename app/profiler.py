@@ -0,0 +1,184 @@
+# app/profiler.py
+"""
+Profilovanie na požiadanie v produkcii (zapnuté len s PROFILE_TOKEN, inak nič nebeží).
+
+- sample_for(seconds): štatistický sampler – každých `interval` s prejde sys._current_frames()
+  všetkých vlákien (event loop, threadpool, _blocking_pool) a spočíta stacky,
+- ProfileMiddleware: request s hlavičkami X-Profile: 1 a X-Profile-Token dostane namiesto tela
+  collapsed stacky počas svojho behu (pôvodný status je v X-Profile-Status). Sampluje sa celý
+  proces, takže súbežné requesty sú v profile tiež – vlákno je koreň stacku,
+- memory_start() / memory_diff() / memory_stop(): tracemalloc snapshot a rozdiel oproti nemu.
+
+Výstup je „collapsed stack“ formát (frame;frame;frame počet), ktorý berie flamegraph.pl,
+speedscope aj inferno. Idle vlákna (čakanie na frontu, select event loopu) sa vynechávajú.
+"""
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+from .settings import PROFILE_TOKEN
+
+# Python leaf frame vlákna, ktoré len čaká na prácu
+_IDLE = {("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select"),
+         ("thread.py", "_worker"), ("threading.py", "_wait_for_tstate_lock")}
+
+
+def enabled() -> bool:
+    return bool(PROFILE_TOKEN)
+
+
+def authorized(token) -> bool:
+    """Token z hlavičky (str alebo bytes); bez PROFILE_TOKEN je profilovanie vypnuté."""
+    if not PROFILE_TOKEN or not token:
+        return False
+    if isinstance(token, bytes):
+        token = token.decode("latin-1")
+    return hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler(threading.Thread):
+    """Vlákno, ktoré do stop() vzorkuje stacky ostatných vlákien do Counter-a."""
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        labels: dict = {}  # code → label (ten istý frame sa formátuje raz)
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _label(code)
+                    parts.append(label)
+                    frame = frame.f_back
+                parts.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+
+async def sample_for(seconds: float, interval: float = 0.005) -> tuple[str, int]:
+    """
+    Vzorkuje `seconds` sekúnd; vráti (collapsed stacky, počet kôl vzorkovania). Sampler je vlastné
+    vlákno, request len čaká na event loope – nedrží worker threadpoolu ani _blocking_pool.
+    """
+    sampler = Sampler(interval)
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler._stop_event.set()   # aj pri odpojení klienta (CancelledError)
+    while sampler.is_alive():       # dobehne najviac jedno kolo, join() by blokoval loop
+        await asyncio.sleep(min(interval, 0.01))
+    return collapsed(sampler.stacks), sampler.samples
+
+
+class ProfileMiddleware:
+    """ASGI middleware pre profil jedného requestu; pridáva sa len pri zapnutom profilovaní."""
+
+    def __init__(self, app, interval: float = 0.002):
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not headers.get(b"x-profile") or not authorized(headers.get(b"x-profile-token")):
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def _swallow(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        sampler = Sampler(self.interval)
+        sampler.start()
+        try:
+            await self.app(scope, receive, _swallow)
+        finally:
+            stacks = sampler.stop()
+        body = collapsed(stacks).encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            (b"x-profile-status", str(status).encode()),
+            (b"x-profile-samples", str(sampler.samples).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+
+# --- pamäť -----------------------------------------------------------------------------
+
+_baseline = None
+_lock = threading.Lock()
+
+
+def memory_start(frames: int = 25) -> dict:
+    """Zapne tracemalloc (ak nebeží) a uloží baseline snapshot."""
+    global _baseline
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _baseline = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), "traced_bytes": current, "peak_bytes": peak}
+
+
+def memory_diff(top: int = 30, key: str = "lineno") -> str:
+    """Top `top` rozdielov aktuálneho snapshotu oproti baseline (key: lineno | filename | traceback)."""
+    with _lock:
+        if _baseline is None or not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc nebeží – najprv POST /api/_profile/memory")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)))
+        stats = snapshot.compare_to(_baseline, key)
+    lines = []
+    for st in stats[:top]:
+        lines.append(f"{st.size_diff / 1024:+.1f} KiB ({st.count_diff:+d} blokov), spolu {st.size / 1024:.1f} KiB")
+        if key == "traceback":
+            lines.extend(st.traceback.format())
+        else:
+            lines.append(f"  {st.traceback[0].filename}:{st.traceback[0].lineno}")
+    total = sum(st.size_diff for st in stats)
+    return f"# rozdiel spolu {total / 1024:+.1f} KiB\n" + "\n".join(lines) + "\n"
+
+
+def memory_stop() -> dict:
+    global _baseline
+    with _lock:
+        _baseline = None
+        tracemalloc.stop()
+    return {"tracing": False}
@@ -0,0 +1,110 @@
+# app/revisions.py
+"""
+Bitemporálna história EU/entity sérií (gas_storage_revision).
+
+- record_changes() sa volá pri každom zápise gas_storage_daily.percent, ale len pre riadky,
+  ktoré sa naozaj zmenili: uzavrie aktuálnu revíziu (superseded_at) a pridá novú,
+- as_of_series() vráti sériu tak, ako sme ju poznali v danom okamihu,
+- day_revisions() vráti všetky verzie jedného dňa,
+- data_version() / bump_version(): počítadlo verzie dát entity pre cache odvodených výpočtov.
+"""
+import datetime as dt
+
+from sqlalchemy import text
+
+# Dva príkazy (nie jeden CTE) – partial unique index na aktuálnu revíziu musí vidieť
+# uzavretý riadok skôr, než vložíme nový.
+_CLOSE_SQL = text("""
+    UPDATE gas_storage_revision r
+    SET superseded_at = :seen_at
+    FROM unnest(CAST(:entity_ids AS integer[]), CAST(:dates AS date[])) AS c(entity_id, date)
+    WHERE r.entity_id = c.entity_id AND r.date = c.date AND r.superseded_at IS NULL
+    RETURNING r.entity_id, r.date, r.value
+""")
+_OPEN_SQL = text("""
+    INSERT INTO gas_storage_revision (entity_id, date, first_seen_at, value)
+    SELECT entity_id, date, :seen_at, value
+    FROM unnest(CAST(:entity_ids AS integer[]), CAST(:dates AS date[]), CAST(:vals AS real[]))
+         AS c(entity_id, date, value)
+    ON CONFLICT DO NOTHING
+""")
+
+_AS_OF_SQL = text("""
+    SELECT date, value, first_seen_at
+    FROM gas_storage_revision
+    WHERE entity_id = :entity_id
+      AND date BETWEEN :date_from AND :date_to
+      AND first_seen_at <= :as_of
+      AND (superseded_at IS NULL OR superseded_at > :as_of)
+    ORDER BY date
+""")
+
+
+def record_changes(sess, rows, seen_at: dt.datetime | None = None, previous: dict | None = None) -> int:
+    """
+    rows: iterovateľné (entity_id, date, value) – len zmenené alebo nové hodnoty.
+    Vráti počet nových revízií. Ak je daný `previous`, doplní doň {(entity_id, date): pôvodná hodnota}
+    pre uzavreté revízie (restatementy). Commit robí volajúci (rovnaká transakcia ako zápis do daily).
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    params = {
+        "seen_at": seen_at or dt.datetime.utcnow(),
+        "entity_ids": [r[0] for r in rows],
+        "dates": [r[1] for r in rows],
+        "vals": [float(r[2]) for r in rows],
+    }
+    closed = sess.execute(_CLOSE_SQL, params)
+    if previous is not None:
+        previous.update(((e, d), v) for e, d, v in closed)
+    bump_version(sess, params["entity_ids"])
+    return sess.execute(_OPEN_SQL, params).rowcount or 0
+
+
+def as_of_series(sess, entity_id: int, as_of: dt.datetime, date_from: dt.date, date_to: dt.date) -> list:
+    """Séria (date, value, first_seen_at) tak, ako platila v čase as_of."""
+    return sess.execute(_AS_OF_SQL, {"entity_id": entity_id, "as_of": as_of,
+                                     "date_from": date_from, "date_to": date_to}).all()
+
+
+def day_revisions(sess, entity_id: int, day: dt.date) -> list:
+    """Všetky verzie hodnoty pre jeden deň, od najstaršej."""
+    return sess.execute(text("""
+        SELECT value, first_seen_at, superseded_at
+        FROM gas_storage_revision
+        WHERE entity_id = :entity_id AND date = :day
+        ORDER BY first_seen_at
+    """), {"entity_id": entity_id, "day": day}).all()
+
+
+_BUMP_SQL = text("""
+    INSERT INTO data_version (entity_id, v)
+    SELECT id, 1 FROM storage_entity
+    WHERE CAST(:entity_ids AS integer[]) IS NULL OR id = ANY(CAST(:entity_ids AS integer[]))
+    ON CONFLICT (entity_id) DO UPDATE SET v = data_version.v + 1
+""")
+
+
+def bump_version(sess, entity_ids=None):
+    """
+    Zvýši verziu dát entít (None = všetky). Volá sa v transakcii zápisu, takže nová verzia je
+    viditeľná presne s commitom – aj pri dlhom backfille, ktorý commitne po neskoršom dennom ingeste.
+    """
+    ids = None if entity_ids is None else sorted(set(entity_ids))   # stále poradie zámkov riadkov
+    if ids == []:
+        return
+    sess.execute(_BUMP_SQL, {"entity_ids": ids})
+
+
+def data_version(sess, entity_id: int | None = None) -> str:
+    """
+    Verzia dát série z počítadla data_version (zmení sa každým commitnutým zápisom percent aj delty);
+    None = súčet cez všetky entity (jeden riadok na entitu, žiadny sken revízií).
+    """
+    if entity_id is None:
+        v = sess.execute(text("SELECT SUM(v) FROM data_version")).scalar()
+    else:
+        v = sess.execute(text("SELECT v FROM data_version WHERE entity_id = :entity_id"),
+                         {"entity_id": entity_id}).scalar()
+    return str(v or 0)
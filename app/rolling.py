@@ -0,0 +1,46 @@
+# app/rolling.py
+"""
+Kĺzavé štatistiky (priemer, min, max, počet) cez celú sériu v O(n) na okno.
+
+Okno je v kalendárnych dňoch (posledných `w` dní vrátane aktuálneho), takže diery v sérii
+sa neprepočítavajú ako posun okna. Priemer cez bežiaci súčet (dva ukazovatele), min/max
+cez monotónne deque – každý bod do deque vojde aj z nej vypadne najviac raz.
+"""
+from collections import deque
+
+
+def rolling(dates: list, values: list[float], window: int) -> dict[str, list]:
+    """dates zoradené vzostupne, values bez None. Vráti stĺpce mean/min/max/count (rovnaká dĺžka ako dates)."""
+    n = len(values)
+    mean, mins, maxs, counts = [None] * n, [None] * n, [None] * n, [0] * n
+    lo_q: deque = deque()   # indexy s rastúcimi hodnotami → front = minimum
+    hi_q: deque = deque()   # indexy s klesajúcimi hodnotami → front = maximum
+    total = 0.0
+    start = 0
+    for i in range(n):
+        v = values[i]
+        total += v
+        while lo_q and values[lo_q[-1]] >= v:
+            lo_q.pop()
+        lo_q.append(i)
+        while hi_q and values[hi_q[-1]] <= v:
+            hi_q.pop()
+        hi_q.append(i)
+        # posun ľavého okraja: ponecháme len dni (dates[i] - window, dates[i]]
+        while (dates[i] - dates[start]).days >= window:
+            total -= values[start]
+            start += 1
+        while lo_q[0] < start:
+            lo_q.popleft()
+        while hi_q[0] < start:
+            hi_q.popleft()
+        cnt = i - start + 1
+        counts[i] = cnt
+        mean[i] = round(total / cnt, 3)
+        mins[i] = round(values[lo_q[0]], 3)
+        maxs[i] = round(values[hi_q[0]], 3)
+    return {"mean": mean, "min": mins, "max": maxs, "count": counts}
+
+
+def rolling_many(dates: list, values: list[float], windows) -> dict[str, dict[str, list]]:
+    return {str(w): rolling(dates, values, w) for w in windows}
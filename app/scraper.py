@@ -1,31 +1,18 @@
-import re
 import datetime as dt
-from playwright.sync_api import sync_playwright
 from sqlalchemy import select
-from .settings import KYOS_URL, OPENAI_API_KEY
+from .settings import OPENAI_API_KEY
 from .database import SessionLocal, init_db
-from .models import GasStorageDaily
-from .gpt import generate_comment
-
-def _extract_percent_from_html(html: str) -> float | None:
-    m = re.search(r"(\d{2,3}\.\d)\s?%", html)
-    if m:
-        return float(m.group(1))
-    return None
-
-def fetch_kyos_percent() -> float:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(KYOS_URL, timeout=60000, wait_until="domcontentloaded")
-        page.wait_for_timeout(5000)
-        html = page.content()
-        browser.close()
-    value = _extract_percent_from_html(html)
-    if value is None:
-        raise RuntimeError("Nepodarilo sa extrahovať percento zo stránky KYOS.")
-    return value
+from .models import EU_ENTITY_ID, GasStorageDaily
+from .comments import save_comment
+from .gpt import FALLBACK_MODEL, generate_comment_with_meta
+from .kyos import fetch_kyos_percent
+from .alerts import evaluate as evaluate_alerts
+from .anomalies import observe as observe_anomalies
+from .metrics import timed_stage
+from .revisions import record_changes
+from .seasonal import refresh_envelope
 
+@timed_stage("run_daily_kyos")
 def run_daily():
     init_db()
     today = dt.date.today()
@@ -33,7 +20,7 @@ def run_daily():
 
     yesterday = today - dt.timedelta(days=1)
     prev = sess.execute(
-        select(GasStorageDaily).where(GasStorageDaily.date == yesterday)
+        select(GasStorageDaily).where(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == yesterday)
     ).scalar_one_or_none()
 
     current = fetch_kyos_percent()
@@ -49,7 +36,7 @@ def run_daily():
         # 7-dňový trend: rozdiel medzi dnes a pred 7 dňami
         week_ago = today - dt.timedelta(days=7)
         week_ago_row = sess.execute(
-            select(GasStorageDaily).where(GasStorageDaily.date == week_ago)
+            select(GasStorageDaily).where(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == week_ago)
         ).scalar_one_or_none()
         if week_ago_row:
             trend7 = round(current - week_ago_row.percent, 2)
@@ -60,121 +47,126 @@ def run_daily():
         except ValueError:  # 29. február
             prev_year_date = today - dt.timedelta(days=365)
         prev_year_row = sess.execute(
-            select(GasStorageDaily).where(GasStorageDaily.date == prev_year_date)
+            select(GasStorageDaily).where(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == prev_year_date)
         ).scalar_one_or_none()
         if prev_year_row:
             yoy_gap = round(current - prev_year_row.percent, 2)
     except Exception:
         pass  # Použijeme default hodnoty 0.0
 
-    comment = generate_comment(current, delta, trend7, yoy_gap)
+    comment, model, prompt_version = generate_comment_with_meta(current, delta, trend7, yoy_gap)
 
     existing = sess.execute(
-        select(GasStorageDaily).where(GasStorageDaily.date == today)
+        select(GasStorageDaily).where(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == today)
     ).scalar_one_or_none()
 
+    changed = existing is None or existing.percent != current
+    restated = {}
+    if changed:
+        record_changes(sess, [(EU_ENTITY_ID, today, current)], previous=restated)
     if existing:
         existing.percent = current
         existing.delta = delta
-        existing.comment = comment
     else:
-        rec = GasStorageDaily(date=today, percent=current, delta=delta, comment=comment)
+        rec = GasStorageDaily(date=today, percent=current, delta=delta)
         sess.add(rec)
+    if changed:
+        sess.flush()
+        refresh_envelope(sess, changed=[(EU_ENTITY_ID, today)])
+        observe_anomalies(sess, [(EU_ENTITY_ID, today, current)], restated)
+        evaluate_alerts(sess, [(EU_ENTITY_ID, today, current)])
+    save_comment(sess, today, comment, model, prompt_version)
 
     sess.commit()
     sess.close()
     
 import os
-import requests
 
 AGSI_API_KEY = os.getenv("AGSI_API_KEY", "")
 
-def _agsi_fetch_all(from_date: str) -> list[dict]:
+def _fetch_agsi_eu_day(date_str: str) -> tuple[dict, dict] | None:
+    """Vráti (daily, metrics) záznam EU pre daný gas_day (YYYY-MM-DD), alebo None."""
+    if not AGSI_API_KEY:
+        return None
+    from . import agsi
+    try:
+        return agsi.fetch_eu_day(date_str)
+    except Exception as e:
+        print(f"Error fetching AGSI data for {date_str}: {e}")
+        return None
+
+def _publish_eu_day(sess, day: dt.date, percent: float, metrics: dict | None = None) -> float | None:
     """
-    Stiahne všetky stránky agregovaných dát pre celú EÚ (type=eu).
-    Žiadny 'country', žiadny 'dataset'. Paginácia podľa 'last_page'.
+    Zapíše EU hodnotu pre `day` do gas_storage_daily (delta voči predchádzajúcemu dňu),
+    vygeneruje komentár a voliteľne uloží AGSI metriky. Vráti deltu; commit robí volajúci.
     """
-    headers = {"x-key": AGSI_API_KEY}
-    url = "https://agsi.gie.eu/api"
-
-    def fetch_pages(params: dict) -> list[dict]:
-        out: list[dict] = []
-        page = 1
-        last_page = 1
-        while page <= last_page:
-            p = dict(params)
-            p["page"] = page
-            r = requests.get(url, params=p, headers=headers, timeout=60)
-            r.raise_for_status()
-            j = r.json()
-            last_page = int((j.get("last_page") or 1)) if isinstance(j, dict) else 1
-            data = j.get("data") if isinstance(j, dict) else None
-            if isinstance(data, list) and data:
-                out.extend(data)
-            page += 1
-        return out
+    import sys
 
-    # AGSI API má oneskorenie - dáta pre dnešok ešte nemusia byť dostupné
-    # Použijeme včerajšok ako maximálny dátum
-    max_date = dt.date.today() - dt.timedelta(days=1)
+    row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == day).first()
 
-    base = {
-        "type": "eu",                    # 🔑 kľúčové
-        "from": from_date,
-        "to": max_date.isoformat(),      # Použijeme včerajšok, nie dnes
-        "size": 5000,                   # veľká strana, menej requestov
-        "gas_day": "asc",               # staršie → novšie
-    }
+    # nájdi včerajšok pre deltu
+    prev_date = day - dt.timedelta(days=1)
+    prev = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == prev_date).first()
+    prev_percent = float(prev.percent) if prev and prev.percent is not None else None
+    delta = None if prev_percent is None else round(percent - prev_percent, 2)
 
-    return fetch_pages(base)
+    # Vypočítaj trend7 (7-dňový trend) a yoy_gap (medziročný rozdiel)
+    trend7 = 0.0
+    yoy_gap = 0.0
+    try:
+        # 7-dňový trend
+        week_ago = day - dt.timedelta(days=7)
+        week_ago_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == week_ago).first()
+        if week_ago_row and week_ago_row.percent is not None:
+            trend7 = round(percent - float(week_ago_row.percent), 2)
 
-def _fetch_agsi_eu_full(date_str: str) -> float | None:
-    """Vráti percento naplnenia 'full' pre EU v daný gas_day (YYYY-MM-DD), alebo None."""
-    if not AGSI_API_KEY:
-        return None
-    url = "https://agsi.gie.eu/api"
-    params = {
-        "type": "eu",
-        "from": date_str,
-        "to": date_str,
-        "size": 100,
-        "gas_day": "asc",
-        "page": 1,
-    }
-    headers = {"x-key": AGSI_API_KEY}
+        # Medziročný rozdiel
+        try:
+            prev_year_date = day.replace(year=day.year - 1)
+        except ValueError:  # 29. február
+            prev_year_date = day - dt.timedelta(days=365)
+        prev_year_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID, GasStorageDaily.date == prev_year_date).first()
+        if prev_year_row and prev_year_row.percent is not None:
+            yoy_gap = round(percent - float(prev_year_row.percent), 2)
+    except Exception:
+        pass
+
+    # Generuj komentár (ak je OPENAI_API_KEY dostupný, inak použije fallback)
     try:
-        r = requests.get(url, headers=headers, params=params, timeout=25)
-        r.raise_for_status()
-        j = r.json()
-        data = j.get("data") or []
-        if not data:
-            return None
-        # Hľadáme presný záznam pre daný deň
-        # gasDayStart môže byť v rôznych formátoch: "2025-11-20" alebo "2025-11-20T00:00:00+00:00"
-        date_str_clean = date_str[:10]  # Zajistíme len dátum bez času
-        for item in data:
-            gas_day = item.get("gasDayStart") or item.get("gas_day") or ""
-            gas_day_str = str(gas_day)[:10]  # Vezmeme len prvých 10 znakov (YYYY-MM-DD)
-            if gas_day_str == date_str_clean:
-                try:
-                    full_val = item.get("full") or item.get("fullness") or item.get("percentage")
-                    if full_val is not None:
-                        return float(full_val)
-                except Exception:
-                    continue
-        # fallback: ak je len jeden záznam, použi ho
-        if len(data) > 0:
-            try:
-                full_val = data[-1].get("full") or data[-1].get("fullness") or data[-1].get("percentage")
-                if full_val is not None:
-                    return float(full_val)
-            except Exception:
-                pass
-        return None
+        comment, model, prompt_version = generate_comment_with_meta(percent, delta, trend7, yoy_gap)
     except Exception as e:
-        print(f"Error fetching AGSI data for {date_str}: {e}")
-        return None
+        print(f"Warning: Could not generate comment with GPT: {e}, using fallback", file=sys.stderr)
+        # Fallback komentár
+        d = "—" if delta is None else f"{delta:+.2f} p.b."
+        y = "—" if yoy_gap is None else f"{yoy_gap:+.2f} p.b. vs. 2024"
+        comment = (
+            f"Zásobníky sú na {percent:.2f} %, denná zmena {d}. "
+            f"Medziročný rozdiel je {y}. "
+            f"Vývoj zodpovedá sezóne; riziká: počasie, prítoky LNG a prípadné neplánované odstávky."
+        )
+        model, prompt_version = FALLBACK_MODEL, None
+
+    changed = row is None or row.percent != percent
+    restated = {}
+    if changed:
+        record_changes(sess, [(EU_ENTITY_ID, day, percent)], previous=restated)
+    if row:
+        row.percent = percent
+        row.delta = delta
+    else:
+        sess.add(GasStorageDaily(date=day, percent=percent, delta=delta))
+    if changed:
+        sess.flush()
+        refresh_envelope(sess, changed=[(EU_ENTITY_ID, day)])
+        observe_anomalies(sess, [(EU_ENTITY_ID, day, percent)], restated)
+        evaluate_alerts(sess, [(EU_ENTITY_ID, day, percent)])
+    save_comment(sess, day, comment, model, prompt_version)
+    if metrics:
+        from . import agsi
+        agsi.upsert_metrics(sess, [{**metrics, "date": day}])
+    return delta
 
+@timed_stage("run_daily_agsi")
 def run_daily_agsi():
     """
     Dotiahne a uloží posledný dostupný deň z AGSI (EU 'full' %), spraví upsert a spočíta deltu.
@@ -201,7 +193,7 @@ def run_daily_agsi():
     sess = SessionLocal()
     try:
         # Najprv zistíme posledný dátum v DB
-        last_row = sess.query(GasStorageDaily).order_by(GasStorageDaily.date.desc()).first()
+        last_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID).order_by(GasStorageDaily.date.desc()).first()
         # Pre sezónne porovnanie potrebujeme dáta minimálne od 2021
         last_date = last_row.date if last_row else dt.date(2021, 1, 1)
         
@@ -218,7 +210,7 @@ def run_daily_agsi():
                 print(f"Backfill result: {result}")
                 # Po backfille aktualizujeme last_date a refreshneme session
                 sess.expire_all()
-                last_row = sess.query(GasStorageDaily).order_by(GasStorageDaily.date.desc()).first()
+                last_row = sess.query(GasStorageDaily).filter(GasStorageDaily.entity_id == EU_ENTITY_ID).order_by(GasStorageDaily.date.desc()).first()
                 last_date = last_row.date if last_row else last_date
                 print(f"After backfill, last date is: {last_date}")
             except Exception as e:
@@ -248,69 +240,20 @@ def run_daily_agsi():
         
         picked_date = None
         picked_full = None
+        picked_metrics = None
         for d in candidates:
-            val = _fetch_agsi_eu_full(d)
-            if val is not None:
+            rec = _fetch_agsi_eu_day(d)
+            if rec is not None:
                 picked_date = d
-                picked_full = round(float(val), 2)
+                picked_full = round(float(rec[0]["percent"]), 2)
+                picked_metrics = rec[1]
                 print(f"Found AGSI data for {d}: {picked_full}%")
                 break
         
         if picked_date is None:
             raise RuntimeError(f"No AGSI data for candidates: {candidates}")
         
-        # Upsert do DB
-        d = dt.date.fromisoformat(picked_date)
-        row = sess.query(GasStorageDaily).filter(GasStorageDaily.date == d).first()
-        
-        # nájdi včerajšok pre deltu
-        prev_date = d - dt.timedelta(days=1)
-        prev = sess.query(GasStorageDaily).filter(GasStorageDaily.date == prev_date).first()
-        prev_percent = float(prev.percent) if prev and prev.percent is not None else None
-        delta = None if prev_percent is None else round(picked_full - prev_percent, 2)
-        
-        # Vypočítaj trend7 (7-dňový trend) a yoy_gap (medziročný rozdiel)
-        trend7 = 0.0
-        yoy_gap = 0.0
-        try:
-            # 7-dňový trend
-            week_ago = d - dt.timedelta(days=7)
-            week_ago_row = sess.query(GasStorageDaily).filter(GasStorageDaily.date == week_ago).first()
-            if week_ago_row and week_ago_row.percent is not None:
-                trend7 = round(picked_full - float(week_ago_row.percent), 2)
-            
-            # Medziročný rozdiel
-            try:
-                prev_year_date = d.replace(year=d.year - 1)
-            except ValueError:  # 29. február
-                prev_year_date = d - dt.timedelta(days=365)
-            prev_year_row = sess.query(GasStorageDaily).filter(GasStorageDaily.date == prev_year_date).first()
-            if prev_year_row and prev_year_row.percent is not None:
-                yoy_gap = round(picked_full - float(prev_year_row.percent), 2)
-        except Exception:
-            pass
-        
-        # Generuj komentár (ak je OPENAI_API_KEY dostupný, inak použije fallback)
-        try:
-            from .gpt import generate_comment
-            comment = generate_comment(picked_full, delta, trend7, yoy_gap)
-        except Exception as e:
-            print(f"Warning: Could not generate comment with GPT: {e}, using fallback", file=sys.stderr)
-            # Fallback komentár
-            d = "—" if delta is None else f"{delta:+.2f} p.b."
-            y = "—" if yoy_gap is None else f"{yoy_gap:+.2f} p.b. vs. 2024"
-            comment = (
-                f"Zásobníky sú na {picked_full:.2f} %, denná zmena {d}. "
-                f"Medziročný rozdiel je {y}. "
-                f"Vývoj zodpovedá sezóne; riziká: počasie, prítoky LNG a prípadné neplánované odstávky."
-            )
-        
-        if row:
-            row.percent = picked_full
-            row.delta = delta
-            row.comment = comment
-        else:
-            sess.add(GasStorageDaily(date=d, percent=picked_full, delta=delta, comment=comment))
+        delta = _publish_eu_day(sess, dt.date.fromisoformat(picked_date), picked_full, picked_metrics)
         
         sess.commit()
         result = {"ok": True, "date": picked_date, "percent": picked_full, "delta": delta}
@@ -328,105 +271,116 @@ def run_daily_agsi():
     finally:
         sess.close()
 
-def backfill_agsi(from_date: str = "2021-01-01"):
+# Koľko entít sa stiahne (paralelne) a zapíše v jednej dávke/transakcii
+_BACKFILL_ENTITY_BATCH = 64
+
+@timed_stage("recompute_deltas")
+def _recompute_deltas(sess, start_date: dt.date, end_date: dt.date | None = None,
+                      entity_ids: list[int] | None = None):
+    """Prepočíta delty (percent − predchádzajúci deň) v [start_date, end_date]; commit robí volajúci."""
+    from sqlalchemy import text
+    from .revisions import bump_version
+
+    # Potrebujeme aj predchádzajúci deň pre správny výpočet delty
+    prev_day = start_date - dt.timedelta(days=1)
+    sess.execute(text("""
+        WITH lagged AS (
+          SELECT entity_id, date,
+                 LAG(percent) OVER (PARTITION BY entity_id ORDER BY date) AS lag_percent
+          FROM gas_storage_daily
+          WHERE date >= :prev_day
+            AND (CAST(:end_date AS date) IS NULL OR date <= :end_date)
+            AND (CAST(:entity_ids AS integer[]) IS NULL OR entity_id = ANY(:entity_ids))
+        )
+        UPDATE gas_storage_daily g
+           SET delta = CASE
+                         WHEN l.lag_percent IS NULL THEN NULL
+                         ELSE ROUND((g.percent - l.lag_percent)::numeric, 2)::double precision
+                       END
+          FROM lagged l
+         WHERE l.entity_id = g.entity_id
+           AND l.date = g.date
+           AND g.date >= :start_date
+    """), {"start_date": start_date, "prev_day": prev_day, "end_date": end_date, "entity_ids": entity_ids})
+    bump_version(sess, entity_ids)
+
+@timed_stage("backfill_agsi")
+def backfill_agsi(from_date: str = "2021-01-01", entity: str | None = None):
     """
-    Načíta historické denné naplnenie zásobníkov pre EÚ z AGSI+ a uloží do DB.
+    Načíta historické denné naplnenie zásobníkov z AGSI+ a uloží do DB – pre všetky entity
+    v storage_entity (EU, krajiny, prevádzkovatelia, zásobníky), alebo len pre `entity` (kód).
     Expect: from_date = 'YYYY-MM-DD'
-    Používa upsert logiku - aktualizuje existujúce záznamy, pridáva nové.
+    Používa hromadný upsert (INSERT … ON CONFLICT) – aktualizuje len zmenené záznamy, pridáva nové.
     Pre sezónne porovnanie v grafe potrebujeme dáta minimálne od 2021-01-01.
     """
+    from concurrent.futures import ThreadPoolExecutor
+    from . import agsi
+    from .entities import AGSI_ENTITY_TYPES, resolve_entity_id
+    from .models import StorageEntity
+    from .settings import AGSI_CONCURRENCY
+
     if not AGSI_API_KEY:
         raise RuntimeError("Missing AGSI_API_KEY")
 
-    rows = _agsi_fetch_all(from_date)
+    # AGSI API má oneskorenie - dáta pre dnešok ešte nemusia byť dostupné
+    to_date = (dt.date.today() - dt.timedelta(days=1)).isoformat()
 
     sess = SessionLocal()
-    inserted, updated = 0, 0
+    inserted, updated, source_count, metrics_written = 0, 0, 0, 0
     try:
-        # Získame všetky existujúce dátumy naraz pre rýchlejšie vyhľadávanie
-        existing_dates = {
-            r.date: r 
-            for r in sess.query(GasStorageDaily).all()
-        }
-        
-        for row in rows:
-            # dátum môže byť 'gasDayStart' alebo 'gas_day'
-            d = (row.get("gasDayStart") or row.get("gas_day") or row.get("date") or "")[:10]
-            # percentá bývajú 'full' | 'fullness' | 'percentage'
-            p = row.get("full") or row.get("fullness") or row.get("percentage")
-            if not d or p is None:
-                continue
-            
-            try:
-            d_obj = dt.date.fromisoformat(d)
-            p_val = float(p)
-            except (ValueError, TypeError):
-                continue
-
-            # Použijeme cache existujúcich dátumov
-            rec = existing_dates.get(d_obj)
-            if rec:
-                # Aktualizujeme vždy, aj ak sa hodnota nezmenila (pre istotu)
-                old_percent = rec.percent
-                    rec.percent = p_val
-                # Počítame ako update len ak sa hodnota skutočne zmenila
-                if abs(old_percent - p_val) > 0.001:  # Použijeme malú toleranciu pre float porovnanie
-                    updated += 1
-                else:
-                    # Záznam už existuje s rovnakou hodnotou - stále to počítame ako "processed"
-                    pass
-            else:
-                # Nový záznam - pridáme do session a do cache
-                new_rec = GasStorageDaily(date=d_obj, percent=p_val, delta=None, comment=None)
-                sess.add(new_rec)
-                existing_dates[d_obj] = new_rec  # Pridáme do cache, aby sme zabránili duplikátom
-                inserted += 1
-
-        # Commitneme aj ak sa nič nezmenilo (pre istotu)
-        sess.commit()
+        q = (sess.query(StorageEntity)
+             .filter(StorageEntity.type.in_(AGSI_ENTITY_TYPES))
+             .order_by(StorageEntity.id))
+        if entity:
+            entity_id = resolve_entity_id(sess, entity)
+            if entity_id is None:
+                raise RuntimeError(f"Unknown entity: {entity}")
+            q = q.filter(StorageEntity.id == entity_id)
+        entities = q.all()
+
+        with ThreadPoolExecutor(max_workers=max(AGSI_CONCURRENCY, 1)) as pool:
+            for i in range(0, len(entities), _BACKFILL_ENTITY_BATCH):
+                batch = entities[i:i + _BACKFILL_ENTITY_BATCH]
+                rows: list[dict] = []
+                metric_rows: list[dict] = []
+                for daily, metrics in pool.map(lambda e: agsi.fetch_entity_series(e, from_date, to_date), batch):
+                    rows.extend(daily)
+                    metric_rows.extend(metrics)
+                # zápis v poradí dátumu – fyzické poradie koreluje s BRIN indexom na date
+                rows.sort(key=lambda r: (r["date"], r["entity_id"]))
+                metric_rows.sort(key=lambda r: (r["date"], r["entity_id"]))
+                ins, upd = agsi.upsert_daily(sess, rows)
+                metrics_written += agsi.upsert_metrics(sess, metric_rows)
+                sess.commit()
+                inserted += ins
+                updated += upd
+                source_count += len(rows)
         
         # Po commite vypočítame delty pre všetky záznamy od from_date
         # Vypočítame delty aj ak sme len overili existujúce záznamy
-        if len(rows) > 0:
+        if source_count > 0:
             try:
-                # Vypočítame delty pre záznamy od from_date (vrátane predchádzajúceho dňa pre správny výpočet)
-                from sqlalchemy import text
-                start_date_obj = dt.date.fromisoformat(from_date)
-                # Potrebujeme aj predchádzajúci deň pre správny výpočet delty
-                prev_day = start_date_obj - dt.timedelta(days=1)
-                
-                sess.execute(text("""
-                    WITH lagged AS (
-                      SELECT date,
-                             LAG(percent) OVER (ORDER BY date) AS lag_percent
-                      FROM gas_storage_daily
-                      WHERE date >= :prev_day
-                    )
-                    UPDATE gas_storage_daily g
-                       SET delta = CASE
-                                     WHEN l.lag_percent IS NULL THEN NULL
-                                     ELSE ROUND((g.percent - l.lag_percent)::numeric, 2)::double precision
-                                   END
-                      FROM lagged l
-                     WHERE l.date = g.date
-                       AND g.date >= :start_date
-                """), {"start_date": start_date_obj, "prev_day": prev_day})
+                entity_ids = None if not entity else [e.id for e in entities]
+                _recompute_deltas(sess, dt.date.fromisoformat(from_date), entity_ids=entity_ids)
                 sess.commit()
                 print(f"Updated deltas for dates >= {from_date}")
             except Exception as e:
+                sess.rollback()
                 print(f"Warning: Failed to update deltas: {e}")
                 import traceback
                 traceback.print_exc()
         
         # Vrátime informáciu aj o tom, koľko záznamov už existovalo
-        existing_count = len(rows) - inserted - updated
+        existing_count = source_count - inserted - updated
         
         return {
             "inserted": inserted, 
             "updated": updated, 
-            "source_count": len(rows),
+            "source_count": source_count,
             "already_exists": existing_count,
-            "processed": inserted + updated + existing_count
+            "processed": inserted + updated + existing_count,
+            "entities": len(entities),
+            "metrics_written": metrics_written,
         }
     except Exception as e:
         sess.rollback()
@@ -434,9 +388,170 @@ def backfill_agsi(from_date: str = "2021-01-01"):
     finally:
         sess.close()
 
-if __name__ == "__main__":
-    # Použi AGSI ak je dostupný, inak KYOS
+@timed_stage("refill_gaps")
+def refill_gaps(from_date: str = "2021-01-01", entity: str | None = None, merge_within_days: int = 7,
+                max_ranges: int | None = None):
+    """
+    Nájde diery v gas_storage_daily (app/gaps.py) a stiahne z AGSI len chýbajúce úseky –
+    susedné diery jednej entity zlúči do jedného requestu. Delty sa prepočítajú len v dotknutých úsekoch.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from . import agsi, gaps
+    from .entities import resolve_entity_id
+    from .models import StorageEntity
+    from .settings import AGSI_CONCURRENCY
+
+    if not AGSI_API_KEY:
+        raise RuntimeError("Missing AGSI_API_KEY")
+
+    to_date = dt.date.today() - dt.timedelta(days=1)
+    sess = SessionLocal()
+    try:
+        entity_ids = None
+        if entity:
+            entity_id = resolve_entity_id(sess, entity)
+            if entity_id is None:
+                raise RuntimeError(f"Unknown entity: {entity}")
+            entity_ids = [entity_id]
+        found = gaps.find_gaps(sess, dt.date.fromisoformat(from_date), to_date, entity_ids)
+        ranges = gaps.coalesce(found, merge_within_days)
+        if max_ranges:
+            ranges = ranges[:max_ranges]
+        if not ranges:
+            return {"gaps": 0, "ranges": 0, "missing_days": 0, "inserted": 0, "updated": 0}
+
+        by_id = {e.id: e for e in sess.query(StorageEntity)
+                 .filter(StorageEntity.id.in_({r["entity_id"] for r in ranges})).all()}
+
+        def fetch(r):
+            return agsi.fetch_entity_series(by_id[r["entity_id"]], r["from"].isoformat(), r["to"].isoformat())
+
+        inserted = updated = 0
+        with ThreadPoolExecutor(max_workers=max(AGSI_CONCURRENCY, 1)) as pool:
+            for i in range(0, len(ranges), _BACKFILL_ENTITY_BATCH):
+                batch = ranges[i:i + _BACKFILL_ENTITY_BATCH]
+                rows: list[dict] = []
+                metric_rows: list[dict] = []
+                for daily, metrics in pool.map(fetch, batch):
+                    rows.extend(daily)
+                    metric_rows.extend(metrics)
+                rows.sort(key=lambda r: (r["date"], r["entity_id"]))
+                metric_rows.sort(key=lambda r: (r["date"], r["entity_id"]))
+                ins, upd = agsi.upsert_daily(sess, rows)
+                agsi.upsert_metrics(sess, metric_rows)
+                # delta sa mení v diere a v prvom dni po nej
+                for r in batch:
+                    _recompute_deltas(sess, r["from"], r["to"] + dt.timedelta(days=1), [r["entity_id"]])
+                sess.commit()
+                inserted += ins
+                updated += upd
+
+        return {"gaps": sum(r["gaps"] for r in ranges), "ranges": len(ranges),
+                "missing_days": sum(r["missing"] for r in ranges),
+                "inserted": inserted, "updated": updated}
+    except Exception as e:
+        sess.rollback()
+        raise RuntimeError(f"Gap refill failed: {str(e)}") from e
+    finally:
+        sess.close()
+
+@timed_stage("backfill_alsi")
+def backfill_alsi(from_date: str = "2021-01-01", entity: str | None = None):
+    """
+    Načíta denné dáta LNG terminálov z GIE ALSI (EU, krajiny s terminálmi, prevádzkovatelia,
+    terminály – alebo len `entity`) a uloží ich do lng_terminal_daily.
+    Rovnaký postup ako backfill_agsi: paralelné sťahovanie po dávkach entít, hromadný upsert.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from . import alsi
+    from .entities import resolve_entity_id
+    from .settings import AGSI_CONCURRENCY
+
+    if not AGSI_API_KEY:
+        raise RuntimeError("Missing AGSI_API_KEY")
+
+    to_date = (dt.date.today() - dt.timedelta(days=1)).isoformat()
+
+    sess = SessionLocal()
+    written, source_count = 0, 0
+    try:
+        entities = alsi.lng_entities(sess)
+        if entity:
+            entity_id = resolve_entity_id(sess, entity)
+            entities = [e for e in entities if e.id == entity_id]
+            if not entities:
+                raise RuntimeError(f"Unknown LNG entity: {entity}")
+
+        with ThreadPoolExecutor(max_workers=max(AGSI_CONCURRENCY, 1)) as pool:
+            for i in range(0, len(entities), _BACKFILL_ENTITY_BATCH):
+                batch = entities[i:i + _BACKFILL_ENTITY_BATCH]
+                rows: list[dict] = []
+                for series in pool.map(lambda e: alsi.fetch_entity_series(e, from_date, to_date), batch):
+                    rows.extend(series)
+                rows.sort(key=lambda r: (r["date"], r["entity_id"]))
+                written += alsi.upsert_lng(sess, rows)
+                sess.commit()
+                source_count += len(rows)
+
+        return {"written": written, "source_count": source_count,
+                "unchanged": source_count - written, "entities": len(entities)}
+    except Exception as e:
+        sess.rollback()
+        raise RuntimeError(f"ALSI backfill failed: {str(e)}") from e
+    finally:
+        sess.close()
+
+@timed_stage("run_daily_sources")
+def run_daily_sources():
+    """
+    Denný beh cez všetky nakonfigurované zdroje (app/sources.py): paralelné stiahnutie,
+    uloženie každej hodnoty so zdrojom, zosúladenie podľa priority a publikovanie víťaza.
+    """
+    import sys
+    from . import sources
+
+    init_db()
     if AGSI_API_KEY:
-        run_daily_agsi()
-    else:
-    run_daily()
+        # ak DB zaostáva o viac ako 2 dni, doplníme históriu z AGSI (ako run_daily_agsi)
+        sess = SessionLocal()
+        try:
+            last = (sess.query(GasStorageDaily.date).filter(GasStorageDaily.entity_id == EU_ENTITY_ID)
+                    .order_by(GasStorageDaily.date.desc()).limit(1).scalar())
+        finally:
+            sess.close()
+        if last and (dt.date.today() - last).days > 2:
+            try:
+                print(f"Backfill result: {backfill_agsi(str(last + dt.timedelta(days=1)))}", file=sys.stderr)
+            except Exception as e:
+                print(f"Backfill failed: {e}, continuing with daily sources", file=sys.stderr)
+
+    readings, errors = sources.fetch_all()
+    for name, err in errors.items():
+        print(f"Source {name} failed: {err}", file=sys.stderr)
+    if not readings:
+        raise RuntimeError(f"No source returned data: {errors}")
+
+    result = sources.reconcile(readings)
+    if result["diverged"]:
+        print(f"WARNING: sources diverge by {result['divergence']} p.b.: {result['values']}", file=sys.stderr)
+
+    sess = SessionLocal()
+    try:
+        sources.save_readings(sess, readings)
+        day = result["date"]
+        delta = _publish_eu_day(sess, day, round(result["value"], 2), result["metrics"])
+        sess.commit()
+        out = {"ok": True, "date": str(day), "percent": round(result["value"], 2), "delta": delta,
+               "source": result["source"], "values": result["values"], "divergence": result["divergence"],
+               "diverged": result["diverged"], "errors": errors}
+        print(f"SUCCESS: {out}", file=sys.stderr)
+        return out
+    except Exception:
+        sess.rollback()
+        raise
+    finally:
+        sess.close()
+
+if __name__ == "__main__":
+    # Všetky nakonfigurované zdroje naraz (SOURCE_PRIORITY), víťaz podľa priority
+    run_daily_sources()
@@ -0,0 +1,147 @@
+# app/seasonal.py
+"""
+Zarovnanie sezón podľa plynárenského roka (1. október – 30. september).
+
+Každý dátum sa mapuje na (gas_year, day_index), kde day_index je poradie kalendárneho dňa
+v „prestupnom“ plynárenskom roku (366 slotov, 29. február má vlastný slot 151). Ten istý
+mesiac/deň má teda v každom roku rovnaký index a posun o k rokov je len gas_year - k –
+žiadny drift o deň za každý prestupný rok ako pri `date - 365 * k`. V neprestupnom roku
+slot 29. februára neexistuje (None), nič sa nedopĺňa.
+
+Mapovanie je predpočítané v pamäti (366 položiek); align() urobí pre ľubovoľný počet
+rokov jeden indexovaný dotaz (entity_id, date IN (…)) a zvyšok je gather cez dict.
+"""
+import datetime as dt
+
+GAS_YEAR_START_MONTH = 10
+DAYS = 366
+
+# plynárenský rok 1999/2000 obsahuje 29. 2. 2000 → referencia pre 366 slotov
+_REF_START = dt.date(1999, GAS_YEAR_START_MONTH, 1)
+_MONTH_DAY = tuple(((_REF_START + dt.timedelta(days=i)).month, (_REF_START + dt.timedelta(days=i)).day)
+                   for i in range(DAYS))
+_SLOT = {md: i for i, md in enumerate(_MONTH_DAY)}
+
+
+# kalendárny rok: referencia 2000 (prestupný) – 29. 2. má slot 59
+_CAL_SLOT = {((dt.date(2000, 1, 1) + dt.timedelta(days=i)).month, (dt.date(2000, 1, 1) + dt.timedelta(days=i)).day): i
+             for i in range(DAYS)}
+
+
+def calendar_day_index(d: dt.date) -> tuple[int, int]:
+    """(rok, day_index) v kalendárnom roku s 366 slotmi (29. 2. = 59, v neprestupnom roku prázdny)."""
+    return d.year, _CAL_SLOT[(d.month, d.day)]
+
+
+def gas_day_index(d: dt.date) -> tuple[int, int]:
+    """(gas_year, day_index); gas_year je rok, v ktorom plynárenský rok začína."""
+    gas_year = d.year if d.month >= GAS_YEAR_START_MONTH else d.year - 1
+    return gas_year, _SLOT[(d.month, d.day)]
+
+
+def date_for(gas_year: int, day_index: int) -> dt.date | None:
+    """Inverzia gas_day_index; None pre 29. február v neprestupnom roku."""
+    month, day = _MONTH_DAY[day_index]
+    year = gas_year if month >= GAS_YEAR_START_MONTH else gas_year + 1
+    try:
+        return dt.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def shift_years(d: dt.date, years: int) -> dt.date | None:
+    """Ten istý deň sezóny o `years` rokov skôr (kladné) / neskôr (záporné)."""
+    gas_year, idx = gas_day_index(d)
+    return date_for(gas_year - years, idx)
+
+
+def align(sess, entity_id: int, axis: list[dt.date], offsets) -> dict[int, list[tuple[dt.date | None, float | None]]]:
+    """
+    Pre každý posun k z `offsets` vráti zoznam (dátum, percent) zarovnaný pozične s `axis`.
+    Chýbajúce dni sú (dátum, None), neexistujúci 29. február (None, None). Jeden dotaz do DB.
+    """
+    from sqlalchemy import bindparam, text
+
+    targets = {k: [shift_years(d, k) for d in axis] for k in offsets}
+    wanted = sorted({d for ds in targets.values() for d in ds if d is not None})
+    values = {}
+    if wanted:
+        # expanding IN namiesto ANY(date[]) – /api/history beží aj mimo Postgresu (sync fallback)
+        values = dict(sess.execute(text("""
+            SELECT date, percent FROM gas_storage_daily
+            WHERE entity_id = :entity_id AND date IN :dates
+        """).bindparams(bindparam("dates", expanding=True)), {"entity_id": entity_id, "dates": wanted}).all())
+    return {k: [(d, values.get(d) if d is not None else None) for d in ds] for k, ds in targets.items()}
+
+
+# --- materializovaná sezónna obálka (gas_storage_envelope) --------------------
+
+ENVELOPE_YEARS = 5
+ENVELOPE_PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Rovnaké mapovanie ako gas_day_index(), v SQL (29. 2. → slot 151 cez prestupný rok 2000)
+GAS_YEAR_SQL = "(CAST(EXTRACT(YEAR FROM date + INTERVAL '3 months') AS integer) - 1)"
+DAY_INDEX_SQL = ("(make_date(CASE WHEN EXTRACT(MONTH FROM date) >= 10 THEN 1999 ELSE 2000 END, "
+                 "CAST(EXTRACT(MONTH FROM date) AS integer), CAST(EXTRACT(DAY FROM date) AS integer))"
+                 " - DATE '1999-10-01')")
+
+_ENVELOPE_SQL = f"""
+    WITH src AS (
+        SELECT entity_id, percent, {GAS_YEAR_SQL} AS gas_year, {DAY_INDEX_SQL} AS day_index
+        FROM gas_storage_daily
+        WHERE entity_id = ANY(CAST(:entity_ids AS integer[]))
+    ),
+    targets AS ({{targets}}),
+    agg AS (
+        SELECT t.entity_id, t.gas_year, t.day_index,
+               COUNT(*) AS n, MIN(s.percent) AS min, MAX(s.percent) AS max, AVG(s.percent) AS mean,
+               percentile_cont(CAST(:pcts AS float8[])) WITHIN GROUP (ORDER BY s.percent) AS p
+        FROM targets t
+        JOIN src s ON s.entity_id = t.entity_id AND s.day_index = t.day_index
+                  AND s.gas_year BETWEEN t.gas_year - :years AND t.gas_year - 1
+        GROUP BY t.entity_id, t.gas_year, t.day_index
+    )
+    INSERT INTO gas_storage_envelope (entity_id, gas_year, day_index, n, min, max, mean, p10, p25, p50, p75, p90)
+    SELECT entity_id, gas_year, day_index, n, min, max, mean, p[1], p[2], p[3], p[4], p[5]
+    FROM agg
+    ON CONFLICT (entity_id, gas_year, day_index) DO UPDATE SET
+        n = EXCLUDED.n, min = EXCLUDED.min, max = EXCLUDED.max, mean = EXCLUDED.mean,
+        p10 = EXCLUDED.p10, p25 = EXCLUDED.p25, p50 = EXCLUDED.p50, p75 = EXCLUDED.p75, p90 = EXCLUDED.p90
+"""
+
+# Plný prepočet: každý (entita, rok, slot) zo zdrojových dát ovplyvní nasledujúcich ENVELOPE_YEARS rokov
+_FULL_TARGETS = """
+        SELECT DISTINCT s.entity_id, s.gas_year + k AS gas_year, s.day_index
+        FROM src s CROSS JOIN generate_series(1, :years) AS k
+"""
+# Inkrementálny prepočet: len sloty zasiahnuté zmenenými dňami
+_CHANGED_TARGETS = """
+        SELECT DISTINCT c.entity_id, c.gas_year + k AS gas_year, c.day_index
+        FROM unnest(CAST(:c_entity_ids AS integer[]), CAST(:c_gas_years AS integer[]),
+                    CAST(:c_day_indexes AS integer[])) AS c(entity_id, gas_year, day_index)
+        CROSS JOIN generate_series(1, :years) AS k
+"""
+
+
+def refresh_envelope(sess, entity_ids: list[int] | None = None, changed=None) -> int:
+    """
+    Prepočíta gas_storage_envelope. `changed` = iterovateľné (entity_id, date) → len dotknuté sloty
+    (nový deň zmení ten istý slot v nasledujúcich ENVELOPE_YEARS rokoch); inak plný prepočet
+    pre `entity_ids` (None = všetky entity). Vráti počet zapísaných riadkov; commit robí volajúci.
+    """
+    from sqlalchemy import text
+
+    params = {"years": ENVELOPE_YEARS, "pcts": list(ENVELOPE_PERCENTILES)}
+    if changed is not None:
+        keys = {(e, *gas_day_index(d)) for e, d in changed}
+        if not keys:
+            return 0
+        params.update(c_entity_ids=[k[0] for k in keys], c_gas_years=[k[1] for k in keys],
+                      c_day_indexes=[k[2] for k in keys], entity_ids=sorted({k[0] for k in keys}))
+        sql = _ENVELOPE_SQL.format(targets=_CHANGED_TARGETS)
+    else:
+        if entity_ids is None:
+            entity_ids = [r[0] for r in sess.execute(text("SELECT id FROM storage_entity"))]
+        params["entity_ids"] = list(entity_ids)
+        sql = _ENVELOPE_SQL.format(targets=_FULL_TARGETS)
+    return sess.execute(text(sql), params).rowcount or 0
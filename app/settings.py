@@ -1,6 +1,68 @@
 import os
 
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Async čítania (asyncpg); prázdne = odvodené z READ_DATABASE_URL, resp. DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', '')
+# Read replika pre čítacie endpointy (today, history, export); prázdne = primárna DB
+READ_DATABASE_URL = os.getenv('READ_DATABASE_URL', '')
+# Connection pool (na engine; sync primárna, replika a async engine majú každý vlastný pool –
+# súčet pool_size + max_overflow cez všetky musí zostať pod limitom spojení Postgres plánu)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+# always = SELECT 1 pri každom checkoute, idle = len ak spojenie ležalo v poole dlhšie
+# ako DB_PRE_PING_IDLE_S, off = bez pingu (spolieha sa na recycle)
+DB_PRE_PING = os.getenv('DB_PRE_PING', 'idle').lower()
+DB_PRE_PING_IDLE_S = float(os.getenv('DB_PRE_PING_IDLE_S', '60'))
+# SQL inštrumentácia: príkaz dlhší ako DB_SLOW_QUERY_MS ide do logu (normalizované SQL);
+# request, ktorý spustí ten istý tvar príkazu viac ako DB_N_PLUS_ONE-krát, je označený ako N+1
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '200'))
+DB_N_PLUS_ONE = int(os.getenv('DB_N_PLUS_ONE', '10'))
+# Profilovanie na požiadanie (/api/_profile/*, hlavička X-Profile); prázdne = vypnuté, bez réžie
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+# Vlákna pre blokujúce endpointy (AGSI/ALSI/OpenAI ingest) – mimo threadpoolu pre requesty
+BLOCKING_WORKERS = int(os.getenv('BLOCKING_WORKERS', '4'))
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 KYOS_URL = os.getenv('KYOS_URL', 'https://gas.kyos.com/')
+# KYOS: dátový endpoint pre priamy HTTP fetch (prázdny = HTML stránka KYOS_URL),
+# selektor, na ktorý čaká záložný prehliadač, a jeho timeout
+KYOS_DATA_URL = os.getenv('KYOS_DATA_URL', '')
+KYOS_SELECTOR = os.getenv('KYOS_SELECTOR', r'text=/\d{2,3}\.\d\s?%/')
+KYOS_TIMEOUT_MS = int(os.getenv('KYOS_TIMEOUT_MS', '30000'))
+# Denný beh cez viac zdrojov: poradie priority, prah rozdielu (p.b.) pre varovanie, celkový timeout
+SOURCE_PRIORITY = [s.strip().lower() for s in os.getenv('SOURCE_PRIORITY', 'agsi,kyos').split(',') if s.strip()]
+SOURCE_DIVERGENCE_PP = float(os.getenv('SOURCE_DIVERGENCE_PP', '0.5'))
+SOURCE_TIMEOUT_S = float(os.getenv('SOURCE_TIMEOUT_S', '120'))
 APP_BASE_URL = os.getenv('APP_BASE_URL', '')
+
+# Cache vygenerovaných komentárov (tabuľka comment_cache)
+COMMENT_CACHE_MAX_ENTRIES = int(os.getenv('COMMENT_CACHE_MAX_ENTRIES', '5000'))
+COMMENT_CACHE_TTL_DAYS = int(os.getenv('COMMENT_CACHE_TTL_DAYS', '365'))
+
+# Expand/contract migrácia komentárov: stĺpec gas_storage_daily.comment sa zmaže až keď
+# na ňom nebeží žiadna stará inštancia (nastav na 1 v release po presune do gas_storage_comment)
+DROP_LEGACY_COMMENT_COLUMN = os.getenv('DROP_LEGACY_COMMENT_COLUMN', '0') == '1'
+
+# AGSI+ (GIE) ingest; URL sa dá presmerovať na lokálny stand-in (bench/fake_gie.py --kind agsi)
+AGSI_API_KEY = os.getenv('AGSI_API_KEY', '')
+AGSI_BASE_URL = os.getenv('AGSI_BASE_URL', 'https://agsi.gie.eu/api').rstrip('/')
+AGSI_CONCURRENCY = int(os.getenv('AGSI_CONCURRENCY', '4'))
+
+# ALSI (GIE LNG terminály) – rovnaký GIE kľúč ako AGSI; URL sa dá presmerovať na lokálny stand-in
+ALSI_BASE_URL = os.getenv('ALSI_BASE_URL', 'https://alsi.gie.eu/api')
+
+# Detekcia anomálií pri ingeste: z-skóre prírastku voči sezónnemu očakávaniu,
+# restatement o aspoň N p.b., rovnaká hodnota N dní po sebe
+ANOMALY_Z = float(os.getenv('ANOMALY_Z', '6'))
+ANOMALY_RESTATE_PP = float(os.getenv('ANOMALY_RESTATE_PP', '1.0'))
+ANOMALY_FLAT_DAYS = int(os.getenv('ANOMALY_FLAT_DAYS', '3'))
+
+# Alert pravidlá (tabuľka alert_rule): vyhodnocujú sa len pre dni nie staršie ako N dní
+# (backfill histórie nespúšťa webhooky); doručenie s retry a exponenciálnym backoffom
+ALERT_MAX_AGE_DAYS = int(os.getenv('ALERT_MAX_AGE_DAYS', '7'))
+ALERT_MAX_ATTEMPTS = int(os.getenv('ALERT_MAX_ATTEMPTS', '6'))
+ALERT_POLL_S = float(os.getenv('ALERT_POLL_S', '30'))
+ALERT_TIMEOUT_S = float(os.getenv('ALERT_TIMEOUT_S', '10'))
@@ -0,0 +1,138 @@
+# app/sources.py
+"""
+Register zdrojov EU naplnenia (%) pre denný beh a ich zosúladenie.
+
+Každý zdroj je funkcia bez argumentov, ktorá vráti reading:
+    {"source": "agsi", "date": dt.date | None, "value": 83.41, "metrics": dict | None}
+(date=None znamená „posledná publikovaná hodnota“ bez vlastného gas day – napr. KYOS).
+
+fetch_all() stiahne všetky nakonfigurované zdroje paralelne (beh trvá ako najpomalší zdroj),
+reconcile() vyberie víťaza podľa SOURCE_PRIORITY a ohlási rozdiel nad SOURCE_DIVERGENCE_PP,
+save_readings() uloží každú hodnotu so zdrojom do gas_storage_source_value.
+"""
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .settings import AGSI_API_KEY, SOURCE_DIVERGENCE_PP, SOURCE_PRIORITY, SOURCE_TIMEOUT_S
+
+SOURCES: dict = {}
+
+
+def register(name: str, available=lambda: True):
+    """Dekorátor: zaregistruje zdroj pod menom; `available()` rozhodne, či je nakonfigurovaný."""
+    def deco(fn):
+        SOURCES[name] = (fn, available)
+        return fn
+    return deco
+
+
+@register("agsi", available=lambda: bool(AGSI_API_KEY))
+def _agsi_latest() -> dict | None:
+    """Posledný dostupný EU gas day z AGSI (včera až 5 dní dozadu – AGSI publikuje s oneskorením)."""
+    from . import agsi
+
+    today = dt.date.today()
+    for i in range(1, 6):
+        day = today - dt.timedelta(days=i)
+        rec = agsi.fetch_eu_day(day.isoformat())
+        if rec is not None:
+            daily, metrics = rec
+            return {"source": "agsi", "date": daily["date"], "value": float(daily["percent"]),
+                    "metrics": metrics}
+    return None
+
+
+@register("kyos")
+def _kyos_latest() -> dict | None:
+    from .kyos import fetch_kyos_percent
+
+    return {"source": "kyos", "date": None, "value": float(fetch_kyos_percent()), "metrics": None}
+
+
+def configured_sources(priority: list[str] | None = None) -> list[str]:
+    """Zdroje v poradí priority, ktoré sú zaregistrované a dostupné (napr. AGSI len s kľúčom)."""
+    return [n for n in (priority or SOURCE_PRIORITY) if n in SOURCES and SOURCES[n][1]()]
+
+
+def fetch_all(names: list[str] | None = None, timeout: float | None = None) -> tuple[list[dict], dict]:
+    """
+    Stiahne zdroje paralelne. Vráti (readings, errors); zdroj, ktorý zlyhal, nevrátil dáta
+    alebo nestihol timeout, je v errors a ostatné sa použijú.
+    """
+    names = names if names is not None else configured_sources()
+    readings, errors = [], {}
+    if not names:
+        return readings, {"_": "no source configured"}
+    pool = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="source")
+    try:
+        futures = {pool.submit(SOURCES[n][0]): n for n in names}
+        done, pending = wait(futures, timeout=timeout or SOURCE_TIMEOUT_S)
+        for fut in pending:
+            errors[futures[fut]] = "timeout"
+        for fut in done:
+            name = futures[fut]
+            try:
+                r = fut.result()
+            except Exception as e:
+                errors[name] = str(e)
+                continue
+            if r is None:
+                errors[name] = "no data"
+            else:
+                readings.append(r)
+    finally:
+        # nečakáme na zdroje, ktoré prekročili timeout
+        pool.shutdown(wait=False, cancel_futures=True)
+    return readings, errors
+
+
+def reconcile(readings: list[dict], priority: list[str] | None = None,
+              threshold: float | None = None) -> dict:
+    """
+    Víťaz = prvý zdroj podľa priority (zdroje mimo zoznamu idú na koniec abecedne).
+    Readings bez vlastného dátumu dostanú dátum víťaza (resp. prvého datovaného zdroja, inak dnešok).
+    divergence = max |hodnota − víťaz| cez ostatné zdroje; diverged, ak presiahne prah (p.b.).
+    """
+    if not readings:
+        raise ValueError("no readings to reconcile")
+    order = list(priority or SOURCE_PRIORITY)
+    rank = {n: i for i, n in enumerate(order)}
+    ranked = sorted(readings, key=lambda r: (rank.get(r["source"], len(order)), r["source"]))
+    winner = ranked[0]
+
+    day = next((r["date"] for r in ranked if r["date"] is not None), dt.date.today())
+    for r in ranked:
+        if r["date"] is None:
+            r["date"] = day
+
+    values = {r["source"]: round(r["value"], 3) for r in ranked}
+    divergence = max((abs(r["value"] - winner["value"]) for r in ranked[1:]), default=0.0)
+    limit = SOURCE_DIVERGENCE_PP if threshold is None else threshold
+    return {
+        "source": winner["source"],
+        "date": winner["date"],
+        "value": winner["value"],
+        "metrics": winner.get("metrics"),
+        "values": values,
+        "divergence": round(divergence, 3),
+        "diverged": divergence > limit,
+    }
+
+
+def save_readings(sess, readings: list[dict], entity_id: int | None = None) -> int:
+    """Upsert hodnôt jednotlivých zdrojov (entity_id, date, source). Commit robí volajúci."""
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from .models import EU_ENTITY_ID, GasStorageSourceValue
+
+    now = dt.datetime.utcnow()
+    rows = [{"entity_id": entity_id or EU_ENTITY_ID, "date": r["date"] or dt.date.today(),
+             "source": r["source"], "value": r["value"], "fetched_at": now} for r in readings]
+    if not rows:
+        return 0
+    ins = pg_insert(GasStorageSourceValue.__table__)
+    stmt = ins.on_conflict_do_update(
+        index_elements=["entity_id", "date", "source"],
+        set_={"value": ins.excluded.value, "fetched_at": ins.excluded.fetched_at},
+    )
+    sess.execute(stmt, rows)
+    return len(rows)
@@ -0,0 +1 @@
+"""Lokálne nástroje na testovanie a meranie (stand-in servery, fixtures, benchmarky)."""
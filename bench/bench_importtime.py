@@ -0,0 +1,84 @@
+# bench/bench_importtime.py
+"""
+Rozpočet studeného štartu: čas importu app.main a zoznam modulov, ktoré sa pri ňom nesmú načítať.
+
+    python -m bench.bench_importtime [--budget-ms 1200] [--runs 3] [--top 15]
+
+Spustí `python -X importtime -c "import app.main"` v čistom procese (DATABASE_URL stačí fiktívna –
+engine sa pri importe nepripája), zoberie najlepší z --runs behov a vypíše najdrahšie moduly
+prvej úrovne. Exit 1, ak import prekročí --budget-ms alebo sa pri štarte načíta niektorý
+z LAZY modulov (tie majú byť importované až vo funkcii, ktorá ich potrebuje).
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Voliteľné/ťažké závislosti, ktoré sa načítajú až pri prvom použití funkcie
+LAZY = ("openai", "openpyxl", "numpy", "playwright", "requests", "jinja2")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def measure() -> tuple[int, dict, set]:
+    """(kumulatívny čas app.main v µs, {modul prvej úrovne pod app.main: µs}, všetky načítané moduly)."""
+    env = {**os.environ, "DATABASE_URL": os.getenv("DATABASE_URL") or "postgresql+psycopg2://bench@127.0.0.1:9/bench"}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    total, children, loaded = 0, {}, set()
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative, depth, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        loaded.add(name)
+        if name == "app.main":
+            total = cumulative
+        elif depth == 0:
+            children = {}  # dokončený iný top-level import (napr. site pri štarte interpretera)
+        elif depth == 2:
+            # riadky sa vypisujú po dokončení importu → všetko s hĺbkou 2 pred app.main je jeho priamy import
+            children[name] = children.get(name, 0) + cumulative
+    return total, children, loaded
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import-time rozpočet app.main")
+    ap.add_argument("--budget-ms", type=float, default=1200)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    measure()  # prvý beh zahreje .pyc a page cache
+    best = None
+    for _ in range(max(args.runs, 1)):
+        run = measure()
+        if best is None or run[0] < best[0]:
+            best = run
+    total, children, loaded = best
+
+    print(f"import app.main: {total / 1000:.0f} ms (najlepší z {args.runs}, rozpočet {args.budget_ms:.0f} ms)")
+    for name, us in sorted(children.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    eager = sorted(m for m in loaded if m.split(".")[0] in LAZY)
+    roots = sorted({m.split(".")[0] for m in eager})
+    failed = False
+    if roots:
+        print(f"\nLAZY moduly načítané pri štarte: {', '.join(roots)} (napr. {', '.join(eager[:5])})")
+        failed = True
+    if total / 1000 > args.budget_ms:
+        print(f"\nprekročený rozpočet: {total / 1000:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
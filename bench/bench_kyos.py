@@ -0,0 +1,128 @@
+# bench/bench_kyos.py
+"""
+Latencia a pamäť KYOS zdroja voči uloženej HTML fixture (bench/fixtures/kyos.html).
+
+    python -m bench.bench_kyos [--runs 20]
+
+Fixture servuje lokálny HTTP server; merajú sa tri cesty:
+  http     – priamy fetch + regex (app.kyos.fetch_percent_http)
+  browser  – zdieľaný Chromium kontext, čaká na selektor (app.kyos.fetch_percent_browser);
+             prvé volanie (štart prehliadača) sa reportuje zvlášť
+  legacy   – pôvodný postup: nový Chromium na každé volanie + pevných 5 s
+Ak Chromium nie je nainštalovaný (python -m playwright install chromium), browser cesty sa preskočia.
+"""
+import argparse
+import functools
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _serve_fixtures() -> tuple[ThreadingHTTPServer, str]:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=FIXTURES))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/kyos.html"
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _tree_rss_mb() -> float:
+    """RSS tohto procesu + všetkých potomkov (Chromium beží v podprocesoch); len Linux /proc."""
+    me = os.getpid()
+    children: dict[int, list[int]] = {}
+    for name in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(name))
+        except (OSError, ValueError, IndexError):
+            continue
+    total, stack = 0, [me]
+    while stack:
+        pid = stack.pop()
+        total += _rss_kb(pid)
+        stack.extend(children.get(pid, []))
+    return total / 1024
+
+
+def _measure(name: str, fn, runs: int) -> None:
+    times = []
+    rss_peak = 0.0
+    tracemalloc.start()
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        value = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+        rss_peak = max(rss_peak, _tree_rss_mb())
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    p95 = sorted(times)[max(int(len(times) * 0.95) - 1, 0)]
+    print(f"{name:<14} runs={runs:<3} median={statistics.median(times):9.1f} ms  p95={p95:9.1f} ms  "
+          f"rss(tree)={rss_peak:7.1f} MB  py_peak={py_peak / 1024:8.1f} KiB  value={value}")
+
+
+def _legacy(url: str) -> float | None:
+    from playwright.sync_api import sync_playwright
+    from app.kyos import extract_percent_from_html
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        page.wait_for_timeout(5000)
+        html = page.content()
+        browser.close()
+    return extract_percent_from_html(html)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--legacy-runs", type=int, default=2)
+    args = ap.parse_args()
+
+    from app import kyos
+
+    srv, url = _serve_fixtures()
+    print(f"fixture: {url}  baseline rss={_tree_rss_mb():.1f} MB")
+    kyos.fetch_percent_http(url)  # import requests + otvorenie spojenia mimo merania
+    _measure("http", lambda: kyos.fetch_percent_http(url), args.runs)
+
+    try:
+        _measure("browser-cold", lambda: kyos.fetch_percent_browser(url, selector="#eu-level"), 1)
+    except Exception as e:
+        print(f"browser paths skipped: {str(e).splitlines()[0]}")
+    else:
+        _measure("browser-warm", lambda: kyos.fetch_percent_browser(url, selector="#eu-level"), args.runs)
+        kyos.close_browser()
+        if args.legacy_runs > 0:
+            _measure("legacy", lambda: _legacy(url), args.legacy_runs)
+    srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
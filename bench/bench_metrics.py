@@ -0,0 +1,109 @@
+# bench/bench_metrics.py
+"""
+Réžia metrík (app/metrics.py) na request a na SQL príkaz.
+
+    python -m bench.bench_metrics [--n 20000]
+
+1. ASGI: ten istý triviálny FastAPI endpoint volaný priamo cez ASGI (bez siete) s a bez
+   MetricsMiddleware → µs na request navyše,
+2. SQL: SELECT 1 na SQLite in-memory s a bez before/after_cursor_execute listenerov,
+3. render /metrics (scrape) pri aktuálnom počte sérií.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _asgi_app(with_metrics: bool):
+    from fastapi import FastAPI
+
+    from app.metrics import MetricsMiddleware
+
+    app = FastAPI()
+
+    @app.get("/api/ping/{x}")
+    def ping(x: int):
+        return {"x": x}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def _drive(app, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(n):
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": f"/api/ping/{i % 100}", "raw_path": b"", "root_path": "",
+                 "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+        await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+def bench_asgi(n: int) -> tuple[float, float]:
+    base, instr = _asgi_app(False), _asgi_app(True)
+    asyncio.run(_drive(base, 500))
+    asyncio.run(_drive(instr, 500))
+    best = lambda app: min(asyncio.run(_drive(app, n)) for _ in range(3)) / n * 1e6
+    return best(base), best(instr)
+
+
+def bench_sql(n: int) -> tuple[float, float]:
+    from sqlalchemy import create_engine, text
+
+    from app.metrics import instrument_sqlalchemy
+
+    engine = create_engine("sqlite://")
+    stmt = text("SELECT 1")
+
+    def run():
+        with engine.connect() as conn:
+            start = time.perf_counter()
+            for _ in range(n):
+                conn.execute(stmt)
+            return time.perf_counter() - start
+
+    run()
+    base = min(run() for _ in range(3)) / n * 1e6
+    instrument_sqlalchemy()
+    engine = create_engine("sqlite://")  # listenery na Engine triede platia pre nové spojenia
+    run()
+    instr = min(run() for _ in range(3)) / n * 1e6
+    return base, instr
+
+
+def bench_render(n: int = 50) -> float:
+    from app.metrics import render
+
+    start = time.perf_counter()
+    for _ in range(n):
+        body, _ = render()
+    return (time.perf_counter() - start) / n * 1e3, len(body)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Metrics overhead benchmark")
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+    base, instr = bench_asgi(args.n)
+    print(f"ASGI request   bez: {base:7.1f} µs   s metrikami: {instr:7.1f} µs   réžia: {instr - base:+6.1f} µs")
+    base, instr = bench_sql(args.n)
+    print(f"SQL SELECT 1   bez: {base:7.1f} µs   s metrikami: {instr:7.1f} µs   réžia: {instr - base:+6.1f} µs")
+    ms, size = bench_render()
+    print(f"/metrics render: {ms:.2f} ms ({size} B)")
+
+
+if __name__ == "__main__":
+    main()
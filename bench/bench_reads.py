@@ -0,0 +1,113 @@
+# bench/bench_reads.py
+"""
+Priepustnosť read endpointov pri súbežných klientoch na jednom uvicorn workeri.
+
+    DATABASE_URL=postgresql+psycopg2://… python -m bench.bench_reads [--clients 1,8,32,64] [--seconds 5]
+
+Spustí aplikáciu v samostatnom procese (uvicorn, 1 worker) a pre každý počet klientov meria
+req/s a latenciu p50/p95 na /api/today a /api/history (rôzne days → mimo in-process cache).
+--blocking N pridá N klientov, ktorí súčasne volajú pomalý blokujúci endpoint
+(/api/recompute-deltas) – read endpointy by pod ním nemali čakať vo fronte.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _serve(port: int, app_dir: str):
+    """uvicorn v samostatnom procese (klienti nesmú súperiť so serverom o GIL)."""
+    import subprocess
+
+    import requests
+
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                             "--workers", "1", "--log-level", "warning"], cwd=app_dir)
+    for _ in range(200):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except Exception:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def _client(base: str, deadline: float, latencies: list, errors: list):
+    import requests
+
+    s = requests.Session()
+    while time.perf_counter() < deadline:
+        if random.random() < 0.5:
+            url = f"{base}/api/today"
+        else:
+            url = f"{base}/api/history?days={random.randint(7, 366)}&years={random.randint(1, 6)}"
+        t = time.perf_counter()
+        try:
+            ok = s.get(url, timeout=30).status_code == 200
+        except Exception:
+            ok = False
+        latencies.append(time.perf_counter() - t)
+        if not ok:
+            errors.append(url)
+
+
+def _blocker(base: str, deadline: float):
+    import requests
+
+    while time.perf_counter() < deadline:
+        try:
+            requests.post(f"{base}/api/recompute-deltas?days=3650", timeout=120)
+        except Exception:
+            pass
+
+
+def run(base: str, clients: int, seconds: float, blocking: int = 0) -> dict:
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    with ThreadPoolExecutor(max_workers=clients + blocking) as pool:
+        for _ in range(blocking):
+            pool.submit(_blocker, base, deadline)
+        for _ in range(clients):
+            pool.submit(_client, base, deadline, latencies, errors)
+    lat = sorted(latencies)
+    return {
+        "clients": clients,
+        "requests": len(lat),
+        "rps": round(len(lat) / seconds, 1),
+        "p50_ms": round(statistics.median(lat) * 1000, 1) if lat else None,
+        "p95_ms": round(lat[int(len(lat) * 0.95) - 1] * 1000, 1) if lat else None,
+        "errors": len(errors),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Read throughput benchmark")
+    ap.add_argument("--clients", default="1,8,32,64")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--blocking", type=int, default=0)
+    ap.add_argument("--port", type=int, default=8799)
+    ap.add_argument("--app-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    help="Koreň repozitára s app/ (napr. git worktree staršej verzie na porovnanie)")
+    args = ap.parse_args()
+
+    proc = _serve(args.port, args.app_dir)
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        run(base, 4, 1.0)  # zahriatie poolov
+        print(f"{'clients':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+        for n in (int(x) for x in args.clients.split(",")):
+            r = run(base, n, args.seconds, args.blocking)
+            print(f"{r['clients']:>8} {r['rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['errors']:>7}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# bench/fake_gie.py
+"""
+Lokálny stand-in pre GIE ALSI API (LNG terminály) a AGSI+ (zásobníky) – na testovanie ingestu
+bez siete a kľúča.
+
+    python -m bench.fake_gie --port 8766
+    ALSI_BASE_URL=http://127.0.0.1:8766/api AGSI_API_KEY=x uvicorn app.main:app
+    python -m bench.fake_gie --kind agsi --port 8765 [--error-rate 0.05] [--latency-ms 200] [--day-format mixed]
+    AGSI_BASE_URL=http://127.0.0.1:8765/api AGSI_API_KEY=x uvicorn app.main:app
+
+Podporuje:
+  GET /api?type=eu | country=XX[&company=EIC[&facility=EIC]]&from=&to=|date=&size=&page=&gas_day=asc
+  GET /api/about?show=listing
+Dáta sú syntetické a deterministické (rovnaký request → rovnaká odpoveď); AGSI séria pre
+kľúč facility | company | country | eu je bench.synth.value(), teda tá istá, ktorú bench.synth
+vloží do DB pre entitu s rovnakým kódom.
+
+AGSI navyše (AgsiConfig): stránkovanie cez last_page, gasDayStart ako dátum alebo s časom,
+publikačné oneskorenie, restatementy (pôvodná hodnota, po restate_after opravená), latencia
+s jitterom a podiel chýb 429/500/502/503 (429 s Retry-After). GET /_stats = počty requestov
+podľa statusu, POST /_clock?advance_hours=N posunie čas servera.
+"""
+import argparse
+import datetime as dt
+import json
+import math
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# krajina → [(prevádzkovateľ, [terminály])]
+LISTING = {
+    "ES": [("21X-ES-ENAGAS", "Enagas", ["21W-ES-BARCELONA", "21W-ES-HUELVA"])],
+    "NL": [("21X-NL-GATE", "Gate terminal", ["21W-NL-GATE"])],
+    "FR": [("21X-FR-ELENGY", "Elengy", ["21W-FR-MONTOIR", "21W-FR-FOS"])],
+}
+_TERMINALS = {t: cc for cc, comps in LISTING.items() for _, _, ts in comps for t in ts}
+_COMPANY = {t: comp for cc, comps in LISTING.items() for comp, _, ts in comps for t in ts}
+
+
+def _terminal_day(eic: str, day: dt.date) -> dict:
+    """Deterministické hodnoty pre jeden terminál a deň (sezónnosť + posun podľa EIC)."""
+    seed = sum(map(ord, eic)) % 97
+    season = math.sin((day.timetuple().tm_yday + seed) / 365.0 * 2 * math.pi)
+    capacity = 200.0 + seed * 5
+    inventory = capacity * (0.55 + 0.25 * season)
+    send_out = capacity * (0.35 + 0.15 * math.cos(day.toordinal() / 7.0 + seed))
+    return {"inventory": inventory, "sendOut": send_out, "dtmi": capacity * 1.1,
+            "dtrs": capacity * 0.8, "contractedCapacity": capacity * 0.7,
+            "availableCapacity": capacity * 0.1}
+
+
+def _terminals_for(q: dict) -> list[str]:
+    if q.get("facility"):
+        return [q["facility"]] if q["facility"] in _TERMINALS else []
+    if q.get("company"):
+        return [t for t in _TERMINALS if _COMPANY[t] == q["company"]]
+    if q.get("country"):
+        return [t for t in _TERMINALS if _TERMINALS[t] == q["country"].upper()]
+    return list(_TERMINALS)
+
+
+def _record(terminals: list[str], day: dt.date) -> dict:
+    tot = {}
+    for t in terminals:
+        for k, v in _terminal_day(t, day).items():
+            tot[k] = tot.get(k, 0.0) + v
+    fmt = lambda v: f"{v:.2f}"
+    return {
+        "gasDayStart": day.isoformat(),
+        "inventory": {"lng": fmt(tot["inventory"] / 6.5), "gwh": fmt(tot["inventory"])},
+        "sendOut": fmt(tot["sendOut"]),
+        "dtmi": {"lng": fmt(tot["dtmi"] / 6.5), "gwh": fmt(tot["dtmi"])},
+        "dtrs": fmt(tot["dtrs"]),
+        "contractedCapacity": fmt(tot["contractedCapacity"]),
+        "availableCapacity": fmt(tot["availableCapacity"]),
+    }
+
+
+def _listing() -> dict:
+    return {"LSO": {"Europe": {
+        cc: [{"eic": comp, "name": name,
+              "facilities": [{"eic": t, "name": t.split("-")[-1].title()} for t in ts]}
+             for comp, name, ts in comps]
+        for cc, comps in LISTING.items()
+    }}}
+
+
+def _series(q: dict) -> dict:
+    terminals = _terminals_for(q)
+    today = dt.date.today()
+    start = dt.date.fromisoformat(q.get("from") or (today - dt.timedelta(days=30)).isoformat())
+    end = min(dt.date.fromisoformat(q.get("to") or today.isoformat()), today - dt.timedelta(days=1))
+    size = max(int(q.get("size") or 30), 1)
+    page = max(int(q.get("page") or 1), 1)
+    n = max((end - start).days + 1, 0) if terminals else 0
+    last_page = max(math.ceil(n / size), 1)
+    days = range((page - 1) * size, min(page * size, n))
+    data = [_record(terminals, start + dt.timedelta(days=i)) for i in days]
+    if q.get("gas_day") != "asc":
+        data.reverse()
+    return {"last_page": last_page, "total": n, "data": data}
+
+
+# --- AGSI ------------------------------------------------------------------------------
+
+class AgsiConfig:
+    """
+    Správanie fake AGSI. Náhodnosť (chyby, jitter, restatementy) je odvodená z hashu
+    (seed, URL, poradie pokusu o tú istú URL), takže rovnaký scenár dopadne rovnako
+    aj pri súbežných requestoch.
+    """
+
+    def __init__(self, entities: int = 30, lag_hours: float = 42, restatements: float = 0.002,
+                 restate_after_hours: float = 72, day_format: str = "date", latency_ms: float = 0,
+                 jitter_ms: float = 0, error_rate: float = 0.0, seed: int = 42):
+        self.entities = entities
+        self.lag = dt.timedelta(hours=lag_hours)
+        self.restatements = restatements
+        self.restate_after = dt.timedelta(hours=restate_after_hours)
+        self.day_format = day_format        # date | datetime | mixed
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.seed = seed
+
+
+_ERROR_STATUSES = (429, 500, 502, 503)
+
+
+def _unit(*parts) -> float:
+    """Deterministické číslo z [0, 1) pre dané časti."""
+    return zlib.crc32(":".join(map(str, parts)).encode()) / 2 ** 32
+
+
+def _gas_day(day: dt.date, fmt: str) -> str:
+    if fmt == "datetime" or (fmt == "mixed" and day.toordinal() % 2):
+        return f"{day.isoformat()}T00:00:00+01:00"
+    return day.isoformat()
+
+
+def _agsi_record(key: str, day: dt.date, cfg: AgsiConfig | None = None, now: dt.datetime | None = None) -> dict:
+    """
+    Záznam AGSI pre kľúč a deň. Restatement (bench.synth.restatement) sa prejaví až
+    `restate_after` po publikácii – dovtedy AGSI vracia pôvodnú hodnotu, rovnako ako v revíziách synth.
+    """
+    from .synth import restatement, value
+
+    cfg = cfg or AgsiConfig()
+    full = value(key, day, cfg.seed)
+    fixed = restatement(key, day, cfg.restatements, cfg.seed)
+    if fixed is not None and (now or dt.datetime.utcnow()) >= dt.datetime.combine(day, dt.time()) + cfg.lag + cfg.restate_after:
+        full = fixed
+    wgv = 100.0 + sum(map(ord, key)) % 900      # TWh
+    gis = wgv * full / 100
+    flow = 24 * wgv * (0.004 + 0.003 * math.cos(day.toordinal() / 5.0))
+    injection, withdrawal = (flow, 0.0) if 90 <= day.timetuple().tm_yday <= 290 else (0.0, flow)
+    fmt = lambda v: f"{v:.4f}"
+    return {
+        "name": key, "code": key, "gasDayStart": _gas_day(day, cfg.day_format), "full": f"{full:.2f}",
+        "gasInStorage": fmt(gis), "workingGasVolume": fmt(wgv), "injection": fmt(injection),
+        "withdrawal": fmt(withdrawal), "netWithdrawal": fmt(withdrawal - injection),
+        "injectionCapacity": fmt(24 * wgv * 0.01), "withdrawalCapacity": fmt(24 * wgv * 0.015),
+        "consumption": fmt(wgv * 3), "consumptionFull": fmt(gis / (wgv * 3) * 100), "trend": "0.10",
+        "status": "E" if day.toordinal() % 7 else "C",
+    }
+
+
+def _agsi_series(q: dict, cfg: AgsiConfig | None = None, now: dt.datetime | None = None) -> dict:
+    """Stránka série; posledný publikovaný deň = najneskorší D, pre ktorý D + lag <= now."""
+    cfg = cfg or AgsiConfig()
+    now = now or dt.datetime.utcnow()
+    key = q.get("facility") or q.get("company") or q.get("country") or "eu"
+    latest = (now - cfg.lag).date()
+    start = dt.date.fromisoformat(q.get("from") or q.get("date") or (latest - dt.timedelta(days=30)).isoformat())
+    end = min(dt.date.fromisoformat(q.get("to") or q.get("date") or latest.isoformat()), latest)
+    size = max(int(q.get("size") or 30), 1)
+    page = max(int(q.get("page") or 1), 1)
+    n = max((end - start).days + 1, 0)
+    last_page = max(math.ceil(n / size), 1)
+    # AGSI vracia zostupne (najnovší deň prvý), gas_day=asc obráti poradie
+    if q.get("gas_day") == "asc":
+        days = [start + dt.timedelta(days=i) for i in range((page - 1) * size, min(page * size, n))]
+    else:
+        days = [end - dt.timedelta(days=i) for i in range((page - 1) * size, min(page * size, n))]
+    return {"last_page": last_page, "total": n, "data": [_agsi_record(key, d, cfg, now) for d in days]}
+
+
+def _agsi_listing(cfg: AgsiConfig) -> dict:
+    """Listing zo synth.entities(): krajina → prevádzkovateľ 21X-SYN-XX → zásobníky 21W-SYN-…"""
+    from .synth import entities
+
+    countries: dict = {}
+    for e in entities(cfg.entities):
+        if e["type"] == "country":
+            countries.setdefault(e["country"], {})
+        elif e["type"] == "facility":
+            comp = countries.setdefault(e["country"], {}).setdefault(
+                e["company"], {"eic": e["company"], "name": f"Synthetic SSO {e['country']}", "facilities": []})
+            comp["facilities"].append({"eic": e["code"], "name": e["name"]})
+    return {"SSO": {"Europe": {cc: list(comps.values()) for cc, comps in countries.items()}}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        u = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(u.query).items()}
+        path = u.path.rstrip("/")
+        agsi = srv.kind == "agsi"
+        if agsi and path == "/_stats":
+            with srv.lock:
+                return self._json(200, {**srv.stats, "clock_offset_hours": srv.clock_offset.total_seconds() / 3600})
+        if agsi:
+            status = self._inject_faults()
+            if status:
+                return
+        if path.endswith("/about"):
+            body = _agsi_listing(srv.agsi) if agsi else _listing()
+        elif path.endswith("/api"):
+            try:
+                body = _agsi_series(q, srv.agsi, dt.datetime.utcnow() + srv.clock_offset) if agsi else _series(q)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+        else:
+            self.send_error(404)
+            return
+        self._json(200, body)
+
+    def do_POST(self):
+        """POST /_clock?advance_hours=N posunie „teraz“ fake AGSI (publikácia, restatementy)."""
+        srv = self.server
+        u = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(u.query).items()}
+        if srv.kind != "agsi" or u.path.rstrip("/") != "/_clock":
+            self.send_error(404)
+            return
+        with srv.lock:
+            srv.clock_offset += dt.timedelta(hours=float(q.get("advance_hours") or 0))
+            offset = srv.clock_offset.total_seconds() / 3600
+        self._json(200, {"clock_offset_hours": offset})
+
+    def _inject_faults(self) -> int | None:
+        """Latencia a chyby podľa AgsiConfig; vráti status, ak sa odpovedalo chybou."""
+        srv, cfg = self.server, self.server.agsi
+        with srv.lock:
+            attempt = srv.attempts[self.path] = srv.attempts.get(self.path, 0) + 1
+            srv.stats["requests"] += 1
+        if cfg.latency or cfg.jitter:
+            time.sleep(cfg.latency + cfg.jitter * _unit(cfg.seed, "jitter", self.path, attempt))
+        status = None
+        if cfg.error_rate and _unit(cfg.seed, "error", self.path, attempt) < cfg.error_rate:
+            status = _ERROR_STATUSES[int(_unit(cfg.seed, "status", self.path, attempt) * len(_ERROR_STATUSES))]
+        with srv.lock:
+            key = str(status or 200)
+            srv.stats["by_status"][key] = srv.stats["by_status"].get(key, 0) + 1
+        if status:
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        return status
+
+    def _json(self, status: int, body: dict):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int = 8766, host: str = "127.0.0.1", background: bool = False,
+          kind: str = "alsi", agsi: AgsiConfig | None = None) -> ThreadingHTTPServer:
+    """
+    Spustí server (kind = alsi | agsi, správanie AGSI podľa `agsi`); s background=True beží
+    v daemon vlákne a vráti sa hneď (pre skripty).
+    """
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.kind = kind
+    srv.agsi = agsi or AgsiConfig()
+    srv.lock = threading.Lock()
+    srv.attempts = {}
+    srv.stats = {"requests": 0, "by_status": {}}
+    srv.clock_offset = dt.timedelta()
+    if background:
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    else:
+        srv.serve_forever()
+    return srv
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fake GIE ALSI/AGSI server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--kind", choices=("alsi", "agsi"), default="alsi")
+    g = ap.add_argument_group("AGSI")
+    g.add_argument("--entities", type=int, default=30, help="počet entít v listingu (ako bench.synth)")
+    g.add_argument("--lag-hours", type=float, default=42, help="gas day D je dostupný od D + lag")
+    g.add_argument("--restatements", type=float, default=0.002, help="podiel dní, ktoré sa neskôr opravia")
+    g.add_argument("--restate-after-hours", type=float, default=72)
+    g.add_argument("--day-format", choices=("date", "datetime", "mixed"), default="date")
+    g.add_argument("--latency-ms", type=float, default=0)
+    g.add_argument("--jitter-ms", type=float, default=0)
+    g.add_argument("--error-rate", type=float, default=0.0, help="podiel odpovedí 429/500/502/503")
+    g.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    cfg = AgsiConfig(args.entities, args.lag_hours, args.restatements, args.restate_after_hours,
+                     args.day_format, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    print(f"Fake {args.kind.upper()} on http://{args.host}:{args.port}/api")
+    serve(args.port, args.host, kind=args.kind, agsi=cfg)
@@ -0,0 +1,88 @@
+# bench/fake_llm.py
+"""
+Lokálny stand-in pre OpenAI Chat Completions – na meranie backfill_comments bez siete a tokenov.
+
+    python -m bench.fake_llm --port 8768 [--latency-ms 300]
+    OPENAI_API_KEY=x OPENAI_BASE_URL=http://127.0.0.1:8768/v1 uvicorn app.main:app
+
+POST /v1/chat/completions vráti po --latency-ms pevný komentár (odvodený z promptu, aby sa
+rôzne vstupy nelíšili len v cache); GET /calls vráti počet prijatých volaní.
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_SENTENCES = (
+    "Zásobníky sa vyvíjajú v súlade so sezónou.",
+    "Tempo vtláčania zostáva stabilné.",
+    "Medziročne je naplnenie mierne vyššie.",
+    "Rizikom ostáva počasie a dostupnosť LNG.",
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive – klient openai drží spojenie
+
+    def do_POST(self):
+        srv = self.server
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "not found"}})
+        req = json.loads(raw or b"{}")
+        with srv.lock:
+            srv.calls += 1
+        time.sleep(srv.latency)
+        prompt = json.dumps(req.get("messages"), ensure_ascii=False)
+        h = zlib.crc32(prompt.encode())
+        text = " ".join(_SENTENCES[(h + i) % len(_SENTENCES)] for i in range(2))
+        self._json(200, {
+            "id": f"chatcmpl-{h:x}", "object": "chat.completion", "created": int(time.time()),
+            "model": req.get("model") or "fake",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4,
+                      "total_tokens": (len(prompt) + len(text)) // 4},
+        })
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/calls":
+            return self._json(200, {"calls": self.server.calls})
+        self._json(404, {"error": {"message": "not found"}})
+
+    def _json(self, status: int, body: dict):
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int = 8768, host: str = "127.0.0.1", background: bool = False,
+          latency_ms: float = 300) -> ThreadingHTTPServer:
+    """Spustí server; s background=True beží v daemon vlákne a vráti sa hneď (pre skripty)."""
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.latency = latency_ms / 1000
+    srv.calls = 0
+    srv.lock = threading.Lock()
+    if background:
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    else:
+        srv.serve_forever()
+    return srv
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8768)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    args = ap.parse_args()
+    print(f"Fake OpenAI on http://{args.host}:{args.port}/v1")
+    serve(args.port, args.host, latency_ms=args.latency_ms)
@@ -0,0 +1,217 @@
+# bench/harness.py
+"""
+Reprodukovateľný benchmark aplikácie nad syntetickými dátami s uloženou baseline.
+
+    python -m bench.harness --database-url postgresql+psycopg2://postgres@localhost/powergy_bench \\
+        [--years 5] [--entities 30] [--repeat 7] [--only history,export] [--save] [--threshold 0.25]
+
+1. naplní DB cez bench.synth (reset – preto musí mať DB v názve „bench“, inak --force),
+2. spustí fake AGSI (bench.fake_gie, kind=agsi) a fake OpenAI (bench.fake_llm) v daemon vláknach,
+3. volá skutočnú FastAPI aplikáciu (TestClient, startup vrátane init_db) a meria:
+   - /api/history pre days z UI (30/90/180/365): cold = prázdna _history_cache, warm = z cache,
+   - /api/export csv a xlsx (365 dní),
+   - /api/backfill-agsi za posledný rok proti fake AGSI (--agsi-latency-ms, --agsi-error-rate
+     → priepustnosť ingestu a retry pri chybách),
+   - /api/backfill-comments (60 dní, force) proti fake LLM s prázdnou comment_cache (DB aj pamäť),
+4. najlepší čas každého merania (min z --repeat, ako timeit – menej citlivý na šum než medián)
+   porovná s baseline (bench/baselines/default.json); regresia = pomalšie o viac ako
+   --threshold (a aspoň o 2 ms) → exit 1. --save baseline prepíše.
+
+Len Postgres: aplikácia používa unnest/CAST(… AS integer[]), ON CONFLICT a percentile_cont,
+na SQLite nebeží. Cold meria in-process cache aplikácie, nie shared_buffers Postgresu.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "baselines", "default.json")
+HISTORY_DAYS = (30, 90, 180, 365)
+ABS_FLOOR_MS = 2.0
+# parametre scenára, pri ktorých zmene nemá porovnanie s baseline zmysel
+_SCENARIO_KEYS = ("years", "entities", "gaps", "restatements", "seed", "llm_latency_ms", "agsi_latency_ms",
+                  "agsi_error_rate", "cpus")
+
+
+def _timed(fn, repeat: int, before=None) -> list[float]:
+    out = []
+    for _ in range(repeat):
+        if before:
+            before()
+        t = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t) * 1000)
+    return out
+
+
+def _ok(r):
+    if r.status_code != 200:
+        raise RuntimeError(f"{r.request.url}: HTTP {r.status_code} {r.text[:200]}")
+    return r
+
+
+def run(args) -> dict:
+    """Naplní DB, spustí fake servery a vráti {meranie: [ms, …]}."""
+    from bench import fake_gie, fake_llm
+
+    agsi_srv = fake_gie.serve(args.agsi_port, background=True, kind="agsi", agsi=fake_gie.AgsiConfig(
+        entities=args.entities, restatements=args.restatements, latency_ms=args.agsi_latency_ms,
+        error_rate=args.agsi_error_rate, seed=args.seed))
+    llm_srv = fake_llm.serve(args.llm_port, background=True, latency_ms=args.llm_latency_ms)
+    os.environ.update({
+        "DATABASE_URL": args.database_url, "READ_DATABASE_URL": "", "ASYNC_DATABASE_URL": "",
+        "AGSI_API_KEY": "bench", "AGSI_BASE_URL": f"http://127.0.0.1:{args.agsi_port}/api",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+    })
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+
+    from app import comment_cache, main
+    from app.database import SessionLocal
+
+    only = set(args.only.split(",")) if args.only else None
+    want = lambda group: only is None or group in only
+    results: dict[str, list[float]] = {}
+
+    with TestClient(main.app) as c:
+        sess = SessionLocal()
+        try:
+            t = time.perf_counter()
+            info = synth_load(sess, args)
+            print(f"synth: {info['daily']} dní, {info['entities']} entít za {time.perf_counter() - t:.1f} s")
+        finally:
+            sess.close()
+
+        if want("history"):
+            for days in HISTORY_DAYS:
+                url = f"/api/history?days={days}"
+                results[f"history_{days}_cold"] = _timed(lambda: _ok(c.get(url)), args.repeat,
+                                                         before=main._history_cache.clear)
+                _ok(c.get(url))
+                results[f"history_{days}_warm"] = _timed(lambda: _ok(c.get(url)), args.repeat)
+
+        if want("export"):
+            for fmt in ("csv", "xlsx"):
+                url = f"/api/export?fmt={fmt}&days=365"
+                results[f"export_{fmt}"] = _timed(lambda: _ok(c.get(url)).content, args.repeat)
+
+        if want("backfill_agsi"):
+            since = (dt.date.today() - dt.timedelta(days=366)).isoformat()
+            results["backfill_agsi_1y"] = _timed(
+                lambda: _ok(c.post(f"/api/backfill-agsi?from_date={since}")), max(args.repeat // 2, 1))
+            print(f"fake AGSI: {agsi_srv.stats}")
+
+        if want("backfill_comments"):
+            def clear_comment_cache():
+                comment_cache._memory.clear()
+                s = SessionLocal()
+                try:
+                    s.execute(text("DELETE FROM comment_cache"))
+                    s.commit()
+                finally:
+                    s.close()
+
+            results["backfill_comments_60"] = _timed(
+                lambda: _ok(c.post("/api/backfill-comments?limit=60&force=true")), max(args.repeat // 2, 1),
+                before=clear_comment_cache)
+            print(f"fake LLM: {llm_srv.calls} volaní")
+
+    agsi_srv.shutdown()
+    llm_srv.shutdown()
+    return results
+
+
+def synth_load(sess, args) -> dict:
+    from bench.synth import load
+
+    return load(sess, args.years, args.entities, args.gaps, args.restatements, args.seed, reset=True)
+
+
+def compare(best: dict, baseline: dict, threshold: float) -> list[str]:
+    """Zoznam regresií oproti baseline (merania, ktoré v baseline nie sú, sa ignorujú)."""
+    out = []
+    for name, ms in best.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if ms > base * (1 + threshold) and ms - base > ABS_FLOOR_MS:
+            out.append(f"{name}: {ms:.1f} ms vs baseline {base:.1f} ms (+{(ms / base - 1) * 100:.0f} %)")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark aplikácie nad syntetickými dátami")
+    ap.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    ap.add_argument("--force", action="store_true", help="povoliť reset DB bez „bench“ v názve")
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--entities", type=int, default=30)
+    ap.add_argument("--gaps", type=float, default=0.01)
+    ap.add_argument("--restatements", type=float, default=0.002)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=7)
+    ap.add_argument("--only", default="", help="history,export,backfill_agsi,backfill_comments")
+    ap.add_argument("--agsi-port", type=int, default=8765)
+    ap.add_argument("--agsi-latency-ms", type=float, default=0)
+    ap.add_argument("--agsi-error-rate", type=float, default=0.0, help="podiel odpovedí 429/5xx z fake AGSI (retry)")
+    ap.add_argument("--llm-port", type=int, default=8768)
+    ap.add_argument("--llm-latency-ms", type=float, default=20)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--threshold", type=float, default=0.25, help="povolené spomalenie oproti baseline (0.25 = 25 %%)")
+    ap.add_argument("--save", action="store_true", help="uložiť výsledok ako novú baseline")
+    args = ap.parse_args()
+
+    if not args.database_url:
+        ap.error("--database-url alebo BENCH_DATABASE_URL je povinné")
+    url = urlparse(args.database_url)
+    if not url.scheme.startswith("postgresql"):
+        ap.error("aplikácia používa SQL špecifické pre Postgres – zadaj lokálny Postgres")
+    if "bench" not in url.path and not args.force:
+        ap.error(f"harness resetuje dáta v {url.path.lstrip('/')!r}; použi DB s „bench“ v názve alebo --force")
+
+    results = run(args)
+    best = {k: round(min(v), 2) for k, v in results.items()}
+    print(f"\n{'meranie':<28}{'min':>10}{'medián':>10}{'max':>10}   [ms]")
+    for name, vals in results.items():
+        print(f"{name:<28}{best[name]:>10.1f}{statistics.median(vals):>10.1f}{max(vals):>10.1f}")
+
+    meta = {"python": platform.python_version(), "cpus": os.cpu_count(), "machine": platform.machine(),
+            "years": args.years, "entities": args.entities, "gaps": args.gaps,
+            "restatements": args.restatements, "seed": args.seed, "repeat": args.repeat,
+            "llm_latency_ms": args.llm_latency_ms, "agsi_latency_ms": args.agsi_latency_ms,
+            "agsi_error_rate": args.agsi_error_rate, "created": dt.datetime.utcnow().isoformat(timespec="seconds")}
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": best}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline uložená: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nbaseline {args.baseline} neexistuje – spusti s --save")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    differs = [k for k in _SCENARIO_KEYS if baseline.get("meta", {}).get(k) != meta[k]]
+    if differs:
+        print(f"\npozor: baseline bola meraná s inými parametrami ({', '.join(differs)}) – porovnanie je orientačné")
+    regressions = compare(best, baseline["results"], args.threshold)
+    if regressions:
+        print(f"\nREGRESIA oproti baseline (> {args.threshold:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nbez regresie oproti baseline (prah {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
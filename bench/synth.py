@@ -0,0 +1,185 @@
+# bench/synth.py
+"""
+Syntetické dáta gas_storage_daily pre benchmarky – deterministické (rovnaký seed → rovnaké dáta).
+
+    python -m bench.synth --database-url postgresql+psycopg2://…/powergy_bench \\
+        [--years 5] [--entities 30] [--gaps 0.01] [--restatements 0.002] [--seed 42] [--reset]
+
+Entity: EU (id 1), krajiny (ISO kódy) a zvyšok zásobníky s EIC „21W-SYN-…“ – kód je zároveň
+kľúč série, takže bench/fake_gie.py (AGSI) vráti pre tie isté parametre tie isté hodnoty.
+Séria = sezónna krivka (napĺňanie apríl–október, čerpanie v zime) + posun a šum podľa entity.
+--gaps = podiel chýbajúcich dní (v úsekoch 1–7 dní), --restatements = podiel dní, ktoré AGSI
+neskôr opravilo: v gas_storage_revision majú dve revízie, v gas_storage_daily platí oprava.
+"""
+import argparse
+import datetime as dt
+import math
+import os
+import random
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COUNTRIES = ("DE", "IT", "FR", "NL", "AT", "HU", "SK", "CZ", "PL", "ES", "BE", "RO", "BG", "HR", "PT",
+             "DK", "LV", "SE", "IE", "SI")
+PUBLISH_LAG = dt.timedelta(days=1, hours=18)   # AGSI zverejní gas day D zhruba D+1 večer
+RESTATE_LAG = dt.timedelta(days=3)
+
+
+def _rng(key: str, seed: int, salt: str = "") -> random.Random:
+    return random.Random(zlib.crc32(f"{seed}:{key}:{salt}".encode()))
+
+
+def value(key: str, day: dt.date, seed: int = 42) -> float:
+    """Naplnenie (%) série `key` v deň `day` – hladká sezónna krivka, bez stavu (dá sa volať na preskačku)."""
+    r = _rng(key, seed)
+    phase, amp, base = r.uniform(-20, 20), r.uniform(30, 45), r.uniform(45, 55)
+    doy = day.timetuple().tm_yday
+    season = math.sin((doy - 110 + phase) / 365.25 * 2 * math.pi)
+    wobble = 1.5 * math.sin(day.toordinal() / 9.0 + phase) + 0.6 * math.sin(day.toordinal() / 3.1)
+    return round(min(max(base + amp * season + wobble, 0.0), 100.0), 2)
+
+
+def restatement(key: str, day: dt.date, rate: float, seed: int = 42) -> float | None:
+    """Opravená hodnota dňa (pôvodná ± 0,1–2 p.b.), alebo None, ak deň opravený nebol."""
+    if rate <= 0:
+        return None
+    r = _rng(key, seed, f"restate:{day.toordinal()}")
+    if r.random() >= rate:
+        return None
+    return round(min(max(value(key, day, seed) + r.choice((-1, 1)) * r.uniform(0.1, 2.0), 0.0), 100.0), 2)
+
+
+def missing_days(key: str, start: dt.date, end: dt.date, rate: float, seed: int = 42) -> set:
+    """Dni bez hodnoty: úseky 1–7 dní, spolu približne `rate` z rozsahu."""
+    out: set = set()
+    if rate <= 0:
+        return out
+    r = _rng(key, seed, "gaps")
+    n = (end - start).days + 1
+    while len(out) < n * rate:
+        first = start + dt.timedelta(days=r.randrange(n))
+        for i in range(r.randint(1, 7)):
+            d = first + dt.timedelta(days=i)
+            if d <= end:
+                out.add(d)
+    return out
+
+
+def entities(n: int) -> list[dict]:
+    """EU + krajiny + zásobníky; `n` = počet entít okrem EU."""
+    out = [{"id": 1, "type": "eu", "code": "eu", "name": "EU", "country": None, "company": None}]
+    for i in range(n):
+        if i < len(COUNTRIES):
+            cc = COUNTRIES[i]
+            out.append({"type": "country", "code": cc, "name": cc, "country": cc, "company": None})
+        else:
+            cc = COUNTRIES[i % len(COUNTRIES)]
+            out.append({"type": "facility", "code": f"21W-SYN-{i:05d}", "name": f"Synthetic {i}",
+                        "country": cc, "company": f"21X-SYN-{cc}"})
+    return out
+
+
+def rows(key: str, entity_id: int, start: dt.date, end: dt.date, gaps: float = 0.0,
+         restatements: float = 0.0, seed: int = 42):
+    """(daily riadky, revision riadky) jednej entity; delta = zmena oproti predchádzajúcemu existujúcemu dňu."""
+    skip = missing_days(key, start, end, gaps, seed)
+    daily, revisions = [], []
+    prev = None
+    d = start
+    while d <= end:
+        if d not in skip:
+            first = value(key, d, seed)
+            fixed = restatement(key, d, restatements, seed)
+            seen = dt.datetime.combine(d, dt.time()) + PUBLISH_LAG
+            final = first if fixed is None else fixed
+            daily.append({"entity_id": entity_id, "date": d, "percent": final,
+                          "delta": None if prev is None else round(final - prev, 2)})
+            revisions.append({"entity_id": entity_id, "date": d, "first_seen_at": seen, "value": first,
+                              "superseded_at": None if fixed is None else seen + RESTATE_LAG})
+            if fixed is not None:
+                revisions.append({"entity_id": entity_id, "date": d, "first_seen_at": seen + RESTATE_LAG,
+                                  "value": fixed, "superseded_at": None})
+            prev = final
+        d += dt.timedelta(days=1)
+    return daily, revisions
+
+
+_DATA_TABLES = ("gas_storage_daily", "gas_storage_revision", "gas_storage_envelope", "gas_storage_metrics",
+                "gas_storage_comment", "gas_storage_source_value", "comment_cache", "anomaly_state",
+                "gas_storage_anomaly")
+
+
+def load(sess, years: int = 5, n_entities: int = 30, gaps: float = 0.01, restatements: float = 0.002,
+         seed: int = 42, end: dt.date | None = None, reset: bool = False) -> dict:
+    """
+    Naplní DB syntetickými dátami do `end` (default včera). reset=True najprv vyprázdni dátové
+    tabuľky a entity okrem EU. Po vložení prepočíta sezónnu obálku. Commit robí load().
+    """
+    from sqlalchemy import insert, text
+
+    from app.models import GasStorageDaily, GasStorageRevision, StorageEntity
+    from app.revisions import bump_version
+    from app.seasonal import refresh_envelope
+
+    end = end or dt.date.today() - dt.timedelta(days=1)
+    start = dt.date(end.year - years, 1, 1)
+    if reset:
+        # EU (id 1) necháme – init_db() ho založil a nastavil sekvenciu
+        sess.execute(text(f"TRUNCATE {', '.join(_DATA_TABLES)}"))
+        sess.execute(text("DELETE FROM storage_entity WHERE id <> 1"))
+
+    ents = entities(n_entities)
+    existing = {code: id_ for id_, code in sess.execute(text("SELECT id, code FROM storage_entity"))}
+    for e in ents:
+        if e["code"] not in existing:
+            row = StorageEntity(**e)
+            sess.add(row)
+            sess.flush()
+            existing[e["code"]] = row.id
+    n_daily = n_rev = 0
+    for e in ents:
+        daily, revisions = rows(e["code"], existing[e["code"]], start, end, gaps, restatements, seed)
+        sess.execute(text("DELETE FROM gas_storage_daily WHERE entity_id = :id"), {"id": existing[e["code"]]})
+        sess.execute(text("DELETE FROM gas_storage_revision WHERE entity_id = :id"), {"id": existing[e["code"]]})
+        if daily:
+            sess.execute(insert(GasStorageDaily), daily)
+            sess.execute(insert(GasStorageRevision), revisions)
+        n_daily += len(daily)
+        n_rev += len(revisions)
+    # zápis mimo record_changes → verziu dát (cache rolling/forecast/simulate) zvýšime ručne
+    bump_version(sess, list(existing.values()))
+    sess.commit()
+    refresh_envelope(sess, [existing[e["code"]] for e in ents])
+    sess.commit()
+    return {"entities": len(ents), "daily": n_daily, "revisions": n_rev, "from": start, "to": end}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Syntetické gas_storage_daily dáta")
+    ap.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--entities", type=int, default=30, help="počet entít okrem EU")
+    ap.add_argument("--gaps", type=float, default=0.01)
+    ap.add_argument("--restatements", type=float, default=0.002)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--reset", action="store_true", help="vyprázdniť dátové tabuľky a entity okrem EU")
+    args = ap.parse_args()
+    if not args.database_url:
+        ap.error("--database-url alebo DATABASE_URL je povinné")
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from app import models  # noqa: F401 – create_all potrebuje zaregistrované modely
+    from app.database import SessionLocal, init_db
+
+    init_db()
+    sess = SessionLocal()
+    try:
+        print(load(sess, args.years, args.entities, args.gaps, args.restatements, args.seed, reset=args.reset))
+    finally:
+        sess.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# bench/webhook_sink.py
+"""
+Lokálny príjemca webhookov pre alert pravidlá – na testovanie doručovania bez siete.
+
+    python -m bench.webhook_sink --port 8767 [--fail-first 2]
+    curl -X POST localhost:8000/api/alert-rules -H 'Content-Type: application/json' \\
+         -d '{"kind": "cross_above", "threshold": 90, "webhook_url": "http://127.0.0.1:8767/hook"}'
+
+POST na ľubovoľnú cestu uloží JSON telo; GET /received vráti všetko prijaté.
+--fail-first N odpovie na prvých N POSTov 500 (overenie retry).
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        srv = self.server
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with srv.lock:
+            srv.attempts += 1
+            fail = srv.attempts <= srv.fail_first
+            if not fail:
+                srv.received.append({"path": self.path, "body": json.loads(raw or b"null")})
+        self.send_response(500 if fail else 204)
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/received":
+            self.send_error(404)
+            return
+        with self.server.lock:
+            raw = json.dumps(self.server.received).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int = 8767, host: str = "127.0.0.1", background: bool = False,
+          fail_first: int = 0) -> ThreadingHTTPServer:
+    """Spustí server; s background=True beží v daemon vlákne. Prijaté telá sú v srv.received."""
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.received, srv.attempts, srv.fail_first, srv.lock = [], 0, fail_first, threading.Lock()
+    if background:
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    else:
+        srv.serve_forever()
+    return srv
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Lokálny príjemca webhookov")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8767)
+    ap.add_argument("--fail-first", type=int, default=0)
+    args = ap.parse_args()
+    print(f"Webhook sink on http://{args.host}:{args.port}/ (GET /received)")
+    serve(args.port, args.host, fail_first=args.fail_first)
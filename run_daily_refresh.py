@@ -53,6 +53,14 @@ try:
         print("ERROR: Ingest AGSI failed", file=sys.stderr)
         sys.exit(1)
     
+    # 1a. Diery v EU histórii (nekritické)
+    if not hit(f"{base_url}/api/refill-gaps?entity=eu", "Refill gaps", max_retries=1):
+        print("WARNING: Refill gaps failed, continuing", file=sys.stderr)
+
+    # 1b. LNG terminály (ALSI) – nekritické, pri chybe pokračujeme
+    if not hit(f"{base_url}/api/backfill-alsi", "Backfill ALSI", max_retries=1):
+        print("WARNING: Backfill ALSI failed, continuing", file=sys.stderr)
+
     # 2. Recompute deltas
     if not hit(f"{base_url}/api/recompute-deltas?days=7", "Recompute deltas"):
         print("ERROR: Recompute deltas failed", file=sys.stderr)